@@ -0,0 +1,154 @@
+import os
+import glob
+import json
+import pyarrow as pa
+import pyarrow.dataset as ds
+import esquema
+
+# Diretório padrão do dataset filtrado, particionado por ano e por UF:
+# enem_filtrado/NU_ANO=2019/SG_UF_PROVA=SP/2019-0-0.parquet
+RAIZ_DATASET = 'enem_filtrado'
+
+COLUNAS_PARTICAO = ['NU_ANO', 'SG_UF_PROVA']
+PARTICIONAMENTO = ds.partitioning(pa.schema([('NU_ANO', pa.int16()), ('SG_UF_PROVA', pa.string())]), flavor='hive')
+
+# Cada coluna de cada arquivo é comprimida separadamente; as categorias
+# (UF, Q006, Q025) são gravadas com codificação de dicionário
+COMPRESSAO = 'zstd'
+
+# Linhas de cada grupo de linhas dos arquivos Parquet. Cada grupo guarda mínimo, máximo e nulos
+# de cada coluna, e o pyarrow pula os grupos que não alcançam o filtro de `ler_dataset(notas=...)`
+LINHAS_POR_GRUPO = 64 * 1024
+
+def partes(raiz, nome):
+    """
+    Lista os arquivos gravados por `escrever_dataset` com o prefixo `nome`, em todas as partições.
+    """
+    return glob.glob(os.path.join(raiz, '**', f'{nome}-*.parquet'), recursive=True)
+
+def apagar_partes(raiz, nome):
+    """
+    Apaga os arquivos gravados por `escrever_dataset` com o prefixo `nome`, em todas as partições.
+    """
+    for caminho in partes(raiz, nome):
+        os.remove(caminho)
+
+def escrever_dataset(df, raiz=RAIZ_DATASET, nome='parte', bloco=0):
+    """
+    Acrescenta `df` ao dataset em `raiz`, um arquivo Parquet por partição (NU_ANO, SG_UF_PROVA).
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dados filtrados, com as colunas NU_ANO e SG_UF_PROVA.
+    raiz : str
+        Diretório do dataset.
+    nome : str
+        Prefixo dos arquivos gravados, normalmente o ano. `apagar_partes` usa o mesmo prefixo.
+    bloco : int
+        Número do bloco, para que blocos do mesmo ano não sobrescrevam uns aos outros.
+    """
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    tabela = tabela.set_column(tabela.schema.get_field_index('SG_UF_PROVA'), 'SG_UF_PROVA',
+                               tabela.column('SG_UF_PROVA').cast(pa.string()))
+    formato = ds.ParquetFileFormat()
+    ds.write_dataset(tabela, raiz, format=formato, partitioning=PARTICIONAMENTO,
+                     basename_template=f'{nome}-{bloco}-{{i}}.parquet',
+                     existing_data_behavior='overwrite_or_ignore', max_rows_per_group=LINHAS_POR_GRUPO,
+                     file_options=formato.make_write_options(compression=COMPRESSAO))
+
+def _caminho_versoes(raiz, nome):
+    # O prefixo '_' faz o pyarrow ignorar o arquivo ao descobrir o dataset
+    return os.path.join(raiz, f'_derivadas_{nome}.json')
+
+def gravar_versoes(versoes, raiz=RAIZ_DATASET, nome='parte'):
+    """
+    Grava as versões das colunas derivadas (veja `derivadas.adicionar_derivadas`) das linhas escritas com o prefixo `nome`.
+    """
+    os.makedirs(raiz, exist_ok=True)
+    with open(_caminho_versoes(raiz, nome), 'w') as file:
+        json.dump(versoes, file)
+
+def apagar_versoes(raiz=RAIZ_DATASET, nome='parte'):
+    """
+    Apaga as versões gravadas com o prefixo `nome`, se houver.
+    """
+    if os.path.exists(_caminho_versoes(raiz, nome)):
+        os.remove(_caminho_versoes(raiz, nome))
+
+def ler_versoes(raiz=RAIZ_DATASET):
+    """
+    Lê as versões das colunas derivadas do dataset inteiro.
+
+    Uma coluna só entra no resultado se todos os anos a gravaram com a mesma versão; com anos
+    filtrados antes e depois de uma mudança de fórmula, ela é recalculada por `analise`.
+    """
+    arquivos = []
+    for caminho in sorted(glob.glob(_caminho_versoes(raiz, '*'))):
+        with open(caminho) as file:
+            arquivos.append(json.load(file))
+    if not arquivos:
+        return {}
+    return {coluna: versao for coluna, versao in arquivos[0].items()
+            if all(outro.get(coluna) == versao for outro in arquivos[1:])}
+
+def abrir_dataset(raiz=RAIZ_DATASET):
+    """
+    Abre o dataset em `raiz` sem ler nenhum dado.
+    """
+    return ds.dataset(raiz, format='parquet', partitioning=PARTICIONAMENTO)
+
+def ler_dataset(raiz=RAIZ_DATASET, colunas=None, anos=None, ufs=None, notas=None):
+    """
+    Lê do dataset filtrado apenas as colunas e partições pedidas.
+
+    Os filtros por ano e UF são resolvidos pelos nomes dos diretórios, então arquivos de
+    outras partições nem são abertos.
+
+    Parameters
+    ----------
+    raiz : str
+        Diretório do dataset.
+    colunas : list, optional
+        Colunas a ler. Se omitido, lê todas.
+    anos : list, optional
+        Anos a ler. Se omitido, lê todos.
+    ufs : list, optional
+        UFs a ler. Se omitido, lê todas.
+    notas : dict, optional
+        Coluna -> (mínimo, máximo), inclusivos; None deixa o lado aberto. Só as linhas com as
+        notas nas faixas são lidas, e os grupos de linhas cujas estatísticas não alcançam a
+        faixa nem são descomprimidos.
+
+    Returns
+    -------
+    pd.DataFrame
+        Os dados lidos, com os tipos de `esquema.ESQUEMA`. As versões das colunas derivadas
+        lidas ficam em `attrs['versoes_derivadas']`.
+
+    Examples
+    --------
+    >>> df_sp = ler_dataset(ufs=['SP'], colunas=['NU_ANO', 'SG_UF_PROVA', 'NU_NOTA_MT'])  # doctest: +SKIP
+    """
+    filtro = None
+    if anos is not None:
+        filtro = ds.field('NU_ANO').isin(list(anos))
+    if ufs is not None:
+        filtro_ufs = ds.field('SG_UF_PROVA').isin([uf.upper() for uf in ufs])
+        filtro = filtro_ufs if filtro is None else filtro & filtro_ufs
+    for coluna, (minimo, maximo) in (notas or {}).items():
+        if minimo is not None:
+            filtro = ds.field(coluna) >= minimo if filtro is None else filtro & (ds.field(coluna) >= minimo)
+        if maximo is not None:
+            filtro = ds.field(coluna) <= maximo if filtro is None else filtro & (ds.field(coluna) <= maximo)
+
+    dataset = abrir_dataset(raiz)
+    if colunas is None:
+        # As colunas de partição ficam no fim do schema do dataset; volta à ordem original
+        colunas = [coluna for coluna in esquema.ESQUEMA if coluna in dataset.schema.names]
+        colunas += [coluna for coluna in dataset.schema.names if coluna not in colunas]
+
+    tabela = dataset.to_table(columns=colunas, filter=filtro)
+    df = esquema.aplicar_esquema(tabela.to_pandas())
+    df.attrs['versoes_derivadas'] = {coluna: versao for coluna, versao in ler_versoes(raiz).items() if coluna in df.columns}
+    return df
@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import filter
+import dados_sinteticos
+import filter_main
+import ingestao
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'modulo_analise'))
+import medicao
+
+# Mede linhas por segundo da filtragem de um único ano gerado, com 1, 2, 4, ... processos,
+# e das regras de remoção e verificação aplicadas a DataFrames já em memória.
+# Uso: python benchmark_filtragem.py [linhas]
+#      python benchmark_filtragem.py predicados [linhas ...]
+
+def main(n_linhas=1_000_000):
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'MICRODADOS_ENEM_2019.csv')
+        dados_sinteticos.gravar_microdados(dados_sinteticos.gerar_microdados(n_linhas, colunas_extras=40), caminho)
+        print(f"{n_linhas:,} linhas, {os.path.getsize(caminho) / 1024 ** 2:.0f} MB, {os.cpu_count()} núcleos")
+
+        processos = 1
+        base = None
+        while processos <= (os.cpu_count() or 1):
+            duracao = medicao.medir(f"{processos} processo(s)",
+                            lambda: filter_main.filtragem(caminho, '2019', filter_main.rows_to_remove,
+                                                          filter_main.check_entries_dict, processos=processos,
+                                                          raiz=os.path.join(diretorio, 'enem_filtrado')), n_linhas)
+            base = base or duracao
+            print(f"{'':<32} aceleração {base / duracao:.2f}x")
+            processos *= 2
+
+def predicados(tamanhos=(1_000_000, 10_000_000)):
+    for n_linhas in tamanhos:
+        df = dados_sinteticos.gerar_microdados(n_linhas).astype(ingestao.TIPOS_COLUNAS)
+        df = df[list(filter_main.check_entries_dict)]
+        print(f"{n_linhas:,} linhas")
+
+        def funcoes():
+            filtrado = filter.remover_linhas(df, filter_main.rows_to_remove)
+            filter.checa_entradas(filtrado, filter_main.check_entries_dict)
+
+        plano = filter.PlanoFiltragem(filter_main.rows_to_remove, filter_main.check_entries_dict)
+        antes = medicao.medir("remover_linhas + checa_entradas", funcoes, n_linhas)
+        depois = medicao.medir("PlanoFiltragem", lambda: plano.aplicar(df), n_linhas)
+        print(f"{'':<32} aceleração {antes / depois:.2f}x")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'predicados':
+        predicados([int(n) for n in sys.argv[2:]] or (1_000_000, 10_000_000))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
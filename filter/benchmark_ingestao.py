@@ -0,0 +1,28 @@
+import os
+import sys
+import tempfile
+import pandas as pd
+import dados_sinteticos
+import ingestao
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'modulo_analise'))
+import medicao
+
+# Mede linhas por segundo de cada forma de ler um ano de microdados gerado.
+# Uso: python benchmark_ingestao.py [linhas]
+
+def main(n_linhas=1_000_000):
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'MICRODADOS_ENEM_2019.csv')
+        dados_sinteticos.gravar_microdados(dados_sinteticos.gerar_microdados(n_linhas, colunas_extras=40), caminho)
+        colunas = list(ingestao.TIPOS_COLUNAS)
+        print(f"{n_linhas:,} linhas, {os.path.getsize(caminho) / 1024 ** 2:.0f} MB")
+
+        medicao.medir("python + unicode_escape (antigo)",
+              lambda: pd.read_csv(caminho, encoding='unicode_escape', engine='python', sep=';'), n_linhas)
+        for motor in ingestao.MOTORES:
+            medicao.medir(f"{motor}, todas as colunas", lambda: ingestao.ler_microdados(caminho, motor=motor), n_linhas)
+            medicao.medir(f"{motor}, colunas do projeto", lambda: ingestao.ler_microdados(caminho, colunas, motor=motor), n_linhas)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import cache_colunar
+import dados_sinteticos
+import esquema
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'modulo_analise'))
+import medicao
+
+# Compara consultas por faixa de nota no cache colunar: varredura completa, mapas de zona na
+# ordem original e mapas de zona com as linhas ordenadas pela nota consultada.
+# Uso: python benchmark_zonas.py [linhas]
+
+CONSULTAS = {
+    'MT >= 900': {'NU_NOTA_MT': (900, None)},
+    'MT >= 800': {'NU_NOTA_MT': (800, None)},
+    'redação = 1000': {'NU_NOTA_REDACAO': (1000, 1000)},
+}
+
+def medir(descricao, funcao):
+    # Recuado sob o nome da consulta
+    return medicao.medir(f"  {descricao}", funcao, repeticoes=5)
+
+def varrer(ano, raiz, notas):
+    df = cache_colunar.carregar_ano(ano, raiz)
+    mascara = True
+    for coluna, (minimo, maximo) in notas.items():
+        if minimo is not None:
+            mascara = mascara & (df[coluna] >= minimo)
+        if maximo is not None:
+            mascara = mascara & (df[coluna] <= maximo)
+    return df[mascara]
+
+def main(n_linhas=3_000_000):
+    df = dados_sinteticos.gerar_microdados(n_linhas)
+    df = esquema.aplicar_esquema(df[df['IN_TREINEIRO'] == 0][[coluna for coluna in esquema.ESQUEMA]])
+    with tempfile.TemporaryDirectory() as raiz:
+        cache_colunar.construir_cache(df, 2019, raiz)
+        cache_colunar.construir_cache(df, 2020, raiz, ordenar_por='NU_NOTA_MT')
+        cache_colunar.construir_cache(df, 2021, raiz, ordenar_por='NU_NOTA_REDACAO')
+        print(f"{len(df):,} linhas, blocos de {cache_colunar.LINHAS_POR_ZONA} linhas")
+
+        for descricao, notas in CONSULTAS.items():
+            print(descricao)
+            base = medir("varredura completa", lambda: varrer(2019, raiz, notas))
+            ordenado = 2021 if 'NU_NOTA_REDACAO' in notas else 2020
+            for rotulo, ano in (("zonas, ordem original", 2019), ("zonas, ordenado pela nota", ordenado)):
+                metadados = cache_colunar.ler_metadados(ano, raiz)
+                candidatos = cache_colunar.blocos_candidatos(metadados, notas)
+                duracao = medir(rotulo, lambda: cache_colunar.consultar(ano, notas, raiz))
+                print(f"  {'':<30} {candidatos.sum()}/{len(candidatos)} blocos lidos, aceleração {base / duracao:.1f}x")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000)
@@ -0,0 +1,287 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import armazenamento
+
+# Diretório padrão do cache: cache_enem/<ano>/<coluna>.bin e cache_enem/<ano>/metadados.json
+RAIZ_CACHE = 'cache_enem'
+
+VERSAO_CACHE = 2
+
+# Linhas de cada bloco dos mapas de zona: para cada bloco e cada coluna de nota, o cabeçalho
+# guarda mínimo, máximo e nulos, e consultas por faixa de nota pulam os blocos que não a alcançam
+LINHAS_POR_ZONA = 8192
+
+# Acima desta fração de blocos candidatos, `consultar` compara as colunas inteiras
+FRACAO_VARREDURA = 0.25
+
+def _caminho(raiz, ano, arquivo):
+    return os.path.join(raiz, str(ano), arquivo)
+
+def _mapas_de_zona(valores, linhas_por_zona):
+    # Mínimo, máximo e nulos de cada bloco; None onde o bloco só tem nulos
+    inicios = np.arange(0, len(valores), linhas_por_zona)
+    if not len(inicios):
+        return {'min': [], 'max': [], 'nulos': []}
+    nulos = np.add.reduceat(np.isnan(valores), inicios)
+    # fmin/fmax ignoram NaN, a não ser que o bloco inteiro seja NaN
+    minimos = np.fmin.reduceat(valores, inicios)
+    maximos = np.fmax.reduceat(valores, inicios)
+    para_json = lambda array: [None if np.isnan(valor) else float(str(valor)) for valor in array]
+    return {'min': para_json(minimos), 'max': para_json(maximos), 'nulos': nulos.tolist()}
+
+def construir_cache(df, ano, raiz=RAIZ_CACHE, ordenar_por=None, linhas_por_zona=LINHAS_POR_ZONA):
+    """
+    Grava cada coluna de `df` como um arquivo binário little-endian, mais um cabeçalho JSON com tipos e categorias.
+
+    Colunas categóricas são gravadas como os códigos, e as inteiras anuláveis como os valores
+    mais um arquivo `<coluna>.mask.bin` com a máscara de ausentes. Para as colunas NU_NOTA_*, o
+    cabeçalho também guarda os mapas de zona usados por `consultar`, e as versões das colunas
+    derivadas (`df.attrs['versoes_derivadas']`) voltam nos DataFrames carregados. O ano só
+    substitui o cache anterior depois de gravado por inteiro.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Os dados filtrados de um ano, de preferência já com os tipos de `esquema.ESQUEMA`.
+    ano : int
+        Ano dos dados; nome do subdiretório do cache.
+    raiz : str
+        Diretório do cache.
+    ordenar_por : str, optional
+        Coluna pela qual as linhas são ordenadas antes de gravar. Agrupar as notas faz as
+        consultas por faixa dessa coluna pularem quase todos os blocos.
+    linhas_por_zona : int
+        Linhas de cada bloco dos mapas de zona.
+    """
+    if ordenar_por is not None:
+        df = df.sort_values(ordenar_por, kind='stable', ignore_index=True)
+
+    # O ano é montado num diretório temporário e só então posto no lugar do anterior: uma
+    # interrupção no meio nunca deixa um cabeçalho válido sobre arquivos de outra construção
+    os.makedirs(raiz, exist_ok=True)
+    temporario = tempfile.mkdtemp(prefix=f'.{ano}-', dir=raiz)
+    try:
+        _gravar_colunas(df, temporario, linhas_por_zona, ordenar_por)
+    except BaseException:
+        shutil.rmtree(temporario, ignore_errors=True)
+        raise
+    destino = os.path.join(raiz, str(ano))
+    if os.path.exists(destino):
+        # os.replace não sobrescreve um diretório com conteúdo; o anterior sai do caminho antes
+        antigo = tempfile.mkdtemp(prefix=f'.{ano}-antigo-', dir=raiz)
+        os.replace(destino, os.path.join(antigo, str(ano)))
+        os.replace(temporario, destino)
+        shutil.rmtree(antigo, ignore_errors=True)
+    else:
+        os.replace(temporario, destino)
+
+def _gravar_colunas(df, diretorio, linhas_por_zona, ordenar_por):
+    metadados = {'versao': VERSAO_CACHE, 'linhas': len(df), 'colunas': {},
+                 'linhas_por_zona': linhas_por_zona, 'ordenado_por': ordenar_por, 'zonas': {},
+                 'versoes_derivadas': df.attrs.get('versoes_derivadas', {})}
+
+    for coluna in df.columns:
+        serie = df[coluna]
+        info = {}
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.array.codes
+            info['categorias'] = serie.cat.categories.tolist()
+        elif isinstance(serie.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(serie.dtype):
+            valores = serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0)
+            serie.isna().to_numpy().tofile(os.path.join(diretorio, f'{coluna}.mask.bin'))
+            info['anulavel'] = True
+        else:
+            valores = serie.to_numpy()
+            if valores.dtype == object:
+                raise TypeError(f"A coluna '{coluna}' não tem um tipo de tamanho fixo; aplique esquema.aplicar_esquema antes.")
+        tipo = valores.dtype.newbyteorder('<')
+        np.ascontiguousarray(valores, dtype=tipo).tofile(os.path.join(diretorio, f'{coluna}.bin'))
+        info['tipo'] = tipo.str
+        metadados['colunas'][coluna] = info
+        if coluna.startswith('NU_NOTA_') and valores.dtype.kind == 'f':
+            metadados['zonas'][coluna] = _mapas_de_zona(valores, linhas_por_zona)
+
+    # O cabeçalho é gravado por último: sem ele o ano não é considerado em cache
+    with open(os.path.join(diretorio, 'metadados.json'), 'w') as file:
+        json.dump(metadados, file)
+
+def construir_cache_do_dataset(anos, raiz_dataset=armazenamento.RAIZ_DATASET, raiz=RAIZ_CACHE, ordenar_por=None):
+    """
+    Constrói o cache de cada ano em `anos` a partir do dataset Parquet filtrado.
+    """
+    for ano in anos:
+        construir_cache(armazenamento.ler_dataset(raiz_dataset, anos=[ano]), ano, raiz, ordenar_por)
+
+def ler_metadados(ano, raiz=RAIZ_CACHE):
+    """
+    Lê o cabeçalho do cache de `ano`.
+
+    Raises
+    ------
+    FileNotFoundError
+        Se o ano não estiver em cache.
+    """
+    caminho = _caminho(raiz, ano, 'metadados.json')
+    if not os.path.exists(caminho):
+        raise FileNotFoundError(f"O ano {ano} não está em cache em '{raiz}'. Use construir_cache_do_dataset.")
+    with open(caminho) as file:
+        return json.load(file)
+
+def _mapear(caminho, tipo, linhas):
+    # np.memmap não aceita arquivos vazios. O resultado é visto como ndarray
+    # comum, que continua apontando para o arquivo mapeado
+    if linhas == 0:
+        return np.empty(0, dtype=tipo)
+    return np.asarray(np.memmap(caminho, dtype=tipo, mode='r', shape=(linhas,)))
+
+def carregar_ano(ano, raiz=RAIZ_CACHE, colunas=None):
+    """
+    Abre o cache de um ano como um DataFrame cujas colunas apontam direto para os arquivos mapeados em memória.
+
+    Nada é copiado nem lido de antemão: as páginas são carregadas pelo sistema operacional à medida
+    que são usadas, e processos que abrem o mesmo cache compartilham o cache de páginas.
+
+    Parameters
+    ----------
+    ano : int
+        Ano a carregar.
+    raiz : str
+        Diretório do cache.
+    colunas : list, optional
+        Colunas a carregar. Se omitido, carrega todas.
+
+    Returns
+    -------
+    pd.DataFrame
+        Os dados do ano, somente leitura, com os mesmos tipos de quando o cache foi construído.
+    """
+    metadados = ler_metadados(ano, raiz)
+    colunas = list(metadados['colunas']) if colunas is None else colunas
+    return _montar(_mapear_colunas(ano, raiz, colunas, metadados), metadados, colunas)
+
+def _mapear_colunas(ano, raiz, colunas, metadados):
+    # Coluna -> (valores, máscara de ausentes ou None), ainda como arrays mapeados
+    linhas = metadados['linhas']
+    brutos = {}
+    for coluna in colunas:
+        if coluna not in metadados['colunas']:
+            raise KeyError(f"A coluna '{coluna}' não está no cache do ano {ano}.")
+        info = metadados['colunas'][coluna]
+        valores = _mapear(_caminho(raiz, ano, f'{coluna}.bin'), np.dtype(info['tipo']), linhas)
+        mascara = None
+        if info.get('anulavel'):
+            mascara = _mapear(_caminho(raiz, ano, f'{coluna}.mask.bin'), np.dtype(bool), linhas)
+        brutos[coluna] = (valores, mascara)
+    return brutos
+
+def _montar(brutos, metadados, colunas, indice=None):
+    dados = {}
+    for coluna in colunas:
+        info = metadados['colunas'][coluna]
+        valores, mascara = brutos[coluna]
+        if 'categorias' in info:
+            dados[coluna] = pd.Categorical.from_codes(valores, dtype=pd.CategoricalDtype(info['categorias']), validate=False)
+        elif info.get('anulavel'):
+            dados[coluna] = pd.arrays.IntegerArray(valores, mascara)
+        else:
+            dados[coluna] = valores
+    df = pd.DataFrame(dados, index=indice, columns=colunas, copy=False)
+    df.attrs['versoes_derivadas'] = {coluna: versao for coluna, versao in metadados.get('versoes_derivadas', {}).items()
+                                     if coluna in colunas}
+    return df
+
+def carregar(anos, raiz=RAIZ_CACHE, colunas=None):
+    """
+    Carrega vários anos do cache num só DataFrame. Ao contrário de `carregar_ano`, a concatenação copia os dados.
+    """
+    return pd.concat([carregar_ano(ano, raiz, colunas) for ano in anos], ignore_index=True)
+
+def blocos_candidatos(metadados, notas):
+    """
+    Marca os blocos dos mapas de zona que podem ter linhas com todas as `notas` nas faixas pedidas.
+
+    Parameters
+    ----------
+    metadados : dict
+        Cabeçalho do cache, de `ler_metadados`.
+    notas : dict
+        Coluna -> (mínimo, máximo), inclusivos; None deixa o lado aberto.
+
+    Returns
+    -------
+    np.ndarray
+        Máscara booleana com um valor por bloco.
+    """
+    blocos = -(-metadados['linhas'] // metadados['linhas_por_zona'])
+    candidatos = np.ones(blocos, dtype=bool)
+    for coluna, (minimo, maximo) in notas.items():
+        if coluna not in metadados.get('zonas', {}):
+            raise KeyError(f"A coluna '{coluna}' não tem mapas de zona neste cache; reconstrua-o com construir_cache.")
+        zona = metadados['zonas'][coluna]
+        # Blocos só de nulos não têm mínimo nem máximo e nunca satisfazem uma faixa
+        minimos = np.array([np.nan if valor is None else valor for valor in zona['min']], dtype=float)
+        maximos = np.array([np.nan if valor is None else valor for valor in zona['max']], dtype=float)
+        if minimo is not None:
+            candidatos &= maximos >= minimo
+        if maximo is not None:
+            candidatos &= minimos <= maximo
+        candidatos &= ~np.isnan(minimos)
+    return candidatos
+
+def consultar(ano, notas, raiz=RAIZ_CACHE, colunas=None):
+    """
+    Carrega do cache de `ano` apenas as linhas com cada nota de `notas` dentro da faixa pedida.
+
+    Os mapas de zona descartam os blocos cujo mínimo e máximo não alcançam a faixa, e só as
+    linhas dos blocos restantes são lidas e comparadas.
+
+    Parameters
+    ----------
+    ano : int
+        Ano a consultar.
+    notas : dict
+        Coluna NU_NOTA_* -> (mínimo, máximo), inclusivos; None deixa o lado aberto. Para uma
+        igualdade, use o mesmo valor nos dois lados, como {'NU_NOTA_REDACAO': (1000, 1000)}.
+    raiz : str
+        Diretório do cache.
+    colunas : list, optional
+        Colunas do resultado. Se omitido, todas.
+
+    Returns
+    -------
+    pd.DataFrame
+        As linhas que satisfazem todas as faixas, na ordem do cache e com os índices de linha dele.
+    """
+    metadados = ler_metadados(ano, raiz)
+    colunas = list(metadados['colunas']) if colunas is None else colunas
+    brutos = _mapear_colunas(ano, raiz, list(dict.fromkeys(list(notas) + colunas)), metadados)
+    linhas_por_zona = metadados['linhas_por_zona']
+
+    candidatos = blocos_candidatos(metadados, notas)
+    if candidatos.mean() > FRACAO_VARREDURA:
+        # Com a maior parte dos blocos candidatos, comparar as colunas inteiras sai mais barato
+        posicoes = np.arange(metadados['linhas'])
+    else:
+        blocos = np.flatnonzero(candidatos)
+        posicoes = (blocos[:, None] * linhas_por_zona + np.arange(linhas_por_zona)).ravel()
+        posicoes = posicoes[posicoes < metadados['linhas']]
+
+    manter = np.ones(len(posicoes), dtype=bool)
+    for coluna, (minimo, maximo) in notas.items():
+        valores = brutos[coluna][0][posicoes]
+        if minimo is not None:
+            manter &= valores >= minimo
+        if maximo is not None:
+            manter &= valores <= maximo
+    posicoes = posicoes[manter]
+
+    selecionados = {coluna: (valores[posicoes], None if mascara is None else mascara[posicoes])
+                    for coluna, (valores, mascara) in brutos.items() if coluna in colunas}
+    return _montar(selecionados, metadados, colunas, pd.Index(posicoes))
+
+if __name__ == '__main__':
+    construir_cache_do_dataset(range(2019, 2023))
@@ -0,0 +1,146 @@
+import os
+import glob
+import json
+import numpy as np
+import pandas as pd
+import armazenamento
+
+# Colunas que não são de ponto flutuante e têm até este número de valores distintos têm os
+# valores guardados no catálogo; nas demais (as notas), só o mínimo e o máximo
+LIMITE_DISTINTOS = 64
+
+def _json(valor):
+    # Converte escalares do numpy/pandas para tipos do JSON
+    if pd.isna(valor):
+        return None
+    if isinstance(valor, np.floating):
+        # str() dá a representação mais curta no tipo original: 239.7 em vez de 239.6999969482422
+        return float(str(valor))
+    return valor.item() if hasattr(valor, 'item') else valor
+
+def _resumir_coluna(serie):
+    nulos = int(serie.isna().sum())
+    valores = serie.dropna()
+    distintos = valores.unique()
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        distintos = sorted(distintos.tolist())
+        minimo, maximo = (distintos[0], distintos[-1]) if distintos else (None, None)
+    else:
+        discreta = not pd.api.types.is_float_dtype(serie.dtype) and len(distintos) <= LIMITE_DISTINTOS
+        distintos = sorted(_json(valor) for valor in distintos) if discreta else None
+        minimo, maximo = (_json(valores.min()), _json(valores.max())) if len(valores) else (None, None)
+    if distintos is not None and len(distintos) > LIMITE_DISTINTOS:
+        distintos = None
+    return {'distintos': distintos, 'nulos': nulos, 'min': minimo, 'max': maximo}
+
+def resumir(df):
+    """
+    Resume cada coluna de `df` em cada partição (NU_ANO, SG_UF_PROVA): linhas, nulos, mínimo, máximo e valores distintos.
+
+    Returns
+    -------
+    dict
+        {ano: {uf: {'linhas': n, 'colunas': {coluna: {'distintos', 'nulos', 'min', 'max'}}}}}, com
+        'distintos' igual a None nas colunas de ponto flutuante e nas com mais de `LIMITE_DISTINTOS` valores.
+    """
+    particoes = {}
+    for (ano, uf), grupo in df.groupby(armazenamento.COLUNAS_PARTICAO, observed=True):
+        particoes.setdefault(int(ano), {})[str(uf)] = {
+            'linhas': len(grupo),
+            'colunas': {coluna: _resumir_coluna(grupo[coluna]) for coluna in df.columns}}
+    return particoes
+
+def _combinar_colunas(a, b):
+    if a['distintos'] is None or b['distintos'] is None:
+        distintos = None
+    else:
+        distintos = sorted(set(a['distintos']) | set(b['distintos']))
+        distintos = distintos if len(distintos) <= LIMITE_DISTINTOS else None
+    minimos = [valor for valor in (a['min'], b['min']) if valor is not None]
+    maximos = [valor for valor in (a['max'], b['max']) if valor is not None]
+    return {'distintos': distintos, 'nulos': a['nulos'] + b['nulos'],
+            'min': min(minimos) if minimos else None, 'max': max(maximos) if maximos else None}
+
+def _combinar_particao(a, b):
+    colunas = dict(a['colunas'])
+    for coluna, resumo in b['colunas'].items():
+        colunas[coluna] = _combinar_colunas(colunas[coluna], resumo) if coluna in colunas else resumo
+    return {'linhas': a['linhas'] + b['linhas'], 'colunas': colunas}
+
+def combinar(particoes, outras):
+    """
+    Soma dois resultados de `resumir`, por exemplo de blocos diferentes do mesmo ano.
+    """
+    combinado = {ano: dict(ufs) for ano, ufs in particoes.items()}
+    for ano, ufs in outras.items():
+        for uf, resumo in ufs.items():
+            atual = combinado.setdefault(ano, {}).get(uf)
+            combinado[ano][uf] = resumo if atual is None else _combinar_particao(atual, resumo)
+    return combinado
+
+def _caminho(raiz, nome):
+    # O prefixo '_' faz o pyarrow ignorar o arquivo ao descobrir o dataset
+    return os.path.join(raiz, f'_catalogo_{nome}.json')
+
+def gravar(particoes, raiz=armazenamento.RAIZ_DATASET, nome='parte'):
+    """
+    Grava o catálogo das partições escritas com o prefixo `nome` na raiz do dataset.
+    """
+    os.makedirs(raiz, exist_ok=True)
+    with open(_caminho(raiz, nome), 'w') as file:
+        json.dump(particoes, file)
+
+def apagar(raiz=armazenamento.RAIZ_DATASET, nome='parte'):
+    """
+    Apaga o catálogo gravado com o prefixo `nome`, se houver.
+    """
+    if os.path.exists(_caminho(raiz, nome)):
+        os.remove(_caminho(raiz, nome))
+
+def construir_catalogo_do_dataset(raiz=armazenamento.RAIZ_DATASET, anos=None):
+    """
+    Constrói o catálogo de um dataset já gravado, um ano de cada vez.
+    """
+    dataset = armazenamento.abrir_dataset(raiz)
+    if anos is None:
+        anos = sorted(set(dataset.to_table(columns=['NU_ANO']).column('NU_ANO').to_pylist()))
+    for ano in anos:
+        gravar(resumir(armazenamento.ler_dataset(raiz, anos=[ano])), raiz, str(ano))
+
+def carregar_catalogo(raiz=armazenamento.RAIZ_DATASET):
+    """
+    Lê e junta os catálogos gravados na raiz do dataset.
+
+    O resultado é um dicionário comum, que `analise` usa para validar anos, UFs e colunas sem
+    percorrer os dados.
+
+    Returns
+    -------
+    dict
+        'linhas': total de linhas; 'colunas': o resumo de cada coluna no dataset inteiro;
+        'particoes': o resumo de cada coluna em cada ano e UF, como em `resumir`;
+        'versoes_derivadas': as versões das colunas derivadas, de `armazenamento.ler_versoes`.
+
+    Raises
+    ------
+    FileNotFoundError
+        Se não houver catálogo em `raiz`.
+    """
+    caminhos = sorted(glob.glob(_caminho(raiz, '*')))
+    if not caminhos:
+        raise FileNotFoundError(f"Nenhum catálogo em '{raiz}'. Use construir_catalogo_do_dataset.")
+
+    particoes = {}
+    for caminho in caminhos:
+        with open(caminho) as file:
+            particoes = combinar(particoes, {int(ano): ufs for ano, ufs in json.load(file).items()})
+
+    total = None
+    for ufs in particoes.values():
+        for resumo in ufs.values():
+            total = resumo if total is None else _combinar_particao(total, resumo)
+    return {'linhas': total['linhas'], 'colunas': total['colunas'], 'particoes': particoes,
+            'versoes_derivadas': armazenamento.ler_versoes(raiz)}
+
+if __name__ == '__main__':
+    construir_catalogo_do_dataset()
@@ -0,0 +1,181 @@
+import os
+import glob
+import numpy as np
+import pandas as pd
+import armazenamento
+import filter
+
+# Dimensões do cubo: cada célula é uma combinação observada destes valores
+DIMENSOES = ['NU_ANO', 'SG_UF_PROVA', 'TP_COR_RACA', 'Q005', 'Q006', 'Q025']
+
+# Colunas das regras de remoção (filter_main.rows_to_remove). No cubo com regras, gravado com
+# as linhas válidas antes da remoção, elas também são dimensões, e `aplicar_regras` remove as
+# células depois, com qualquer combinação de regras
+DIMENSOES_REGRAS = ['IN_TREINEIRO', 'TP_PRESENCA_CN', 'TP_PRESENCA_CH', 'TP_PRESENCA_LC', 'TP_PRESENCA_MT']
+
+NOTAS = ['NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']
+
+# Cada nota e a média do participante ('media', como em analise.media) têm, em cada célula, a
+# quantidade de valores presentes (n_), a soma (soma_) e a soma dos quadrados (soma2_)
+MEDIDAS = NOTAS + ['media']
+COLUNAS_MEDIDAS = (['linhas'] + [f'{prefixo}_{medida}' for medida in MEDIDAS for prefixo in ('n', 'soma', 'soma2')]
+                   + ['n_redacao_1000'])
+
+def dimensoes(cubo):
+    """
+    Retorna as colunas de `cubo` que são dimensões, na ordem do cubo.
+    """
+    return [coluna for coluna in cubo.columns if coluna not in COLUNAS_MEDIDAS]
+
+def construir_cubo(df, dimensoes=DIMENSOES):
+    """
+    Agrega `df` em um cubo com contagem, soma e soma dos quadrados de cada nota e da média do participante.
+
+    Uma célula guarda, para uma combinação de `dimensoes`, a quantidade de linhas ('linhas'), as
+    medidas de cada coluna de `MEDIDAS` e quantas redações tiraram 1000 ('n_redacao_1000'). Médias
+    e variâncias de qualquer agrupamento pelas dimensões saem somando as células, e cubos de blocos
+    diferentes se juntam com `combinar`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dados filtrados, com as colunas de `dimensoes` e de `NOTAS`.
+    dimensoes : list
+        Colunas que identificam as células. Valores ausentes (a Q005) formam células próprias.
+
+    Returns
+    -------
+    pd.DataFrame
+        Uma linha por célula observada, ordenada pelas dimensões, com as colunas de `dimensoes`
+        seguidas das de `COLUNAS_MEDIDAS`.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'NU_ANO': [2019, 2019, 2020], 'NU_NOTA_CN': [500.0, 700.0, None],
+    ...                    'NU_NOTA_CH': 600.0, 'NU_NOTA_LC': 600.0, 'NU_NOTA_MT': 600.0, 'NU_NOTA_REDACAO': 1000.0})
+    >>> construir_cubo(df, ['NU_ANO'])[['NU_ANO', 'linhas', 'n_NU_NOTA_CN', 'soma_NU_NOTA_CN', 'n_redacao_1000']]
+       NU_ANO  linhas  n_NU_NOTA_CN  soma_NU_NOTA_CN  n_redacao_1000
+    0    2019       2             2           1200.0               2
+    1    2020       1             0              0.0               1
+    """
+    grupos = df.groupby(list(dimensoes), observed=True, dropna=False, sort=True)
+    # Cada linha recebe o número da sua célula, e cada medida é somada por célula com bincount
+    codigos = grupos.ngroup().to_numpy()
+    cubo = grupos.size().rename('linhas').reset_index()
+    celulas = len(cubo)
+
+    notas = df[NOTAS].astype('float64')
+    valores = notas.assign(media=notas.mean(axis=1))
+    for medida in MEDIDAS:
+        coluna = valores[medida].to_numpy()
+        presente = ~np.isnan(coluna)
+        coluna = np.where(presente, coluna, 0.0)
+        cubo[f'n_{medida}'] = np.bincount(codigos, weights=presente, minlength=celulas).astype(np.int64)
+        cubo[f'soma_{medida}'] = np.bincount(codigos, weights=coluna, minlength=celulas)
+        cubo[f'soma2_{medida}'] = np.bincount(codigos, weights=coluna * coluna, minlength=celulas)
+    cubo['n_redacao_1000'] = np.bincount(codigos, weights=valores['NU_NOTA_REDACAO'].to_numpy() == 1000,
+                                         minlength=celulas).astype(np.int64)
+    cubo['linhas'] = cubo['linhas'].astype(np.int64)
+    return cubo[list(dimensoes) + COLUNAS_MEDIDAS]
+
+def aplicar_regras(cubo, dict_remover):
+    """
+    Remove de um cubo com regras as células que `filter.remover_linhas` removeria das linhas, e junta as que sobram.
+
+    Como as colunas das regras são dimensões, remover células dá o mesmo que remover os
+    participantes antes de agregar, sem reler os microdados.
+
+    Parameters
+    ----------
+    cubo : pd.DataFrame
+        Cubo com as colunas de `DIMENSOES_REGRAS` como dimensões, de `carregar_cubo(regras=True)`.
+    dict_remover : dict
+        Linhas a remover, no formato de `filter.remover_linhas`. Só pode usar colunas de `DIMENSOES_REGRAS`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Um cubo só com as dimensões de `DIMENSOES`, como o gravado pela filtragem com essas regras.
+
+    Raises
+    ------
+    ValueError
+        Se alguma regra usar uma coluna que não é dimensão do cubo com regras.
+
+    Examples
+    --------
+    >>> cubo_regras = carregar_cubo(regras=True)  # doctest: +SKIP
+    >>> com_treineiros = aplicar_regras(cubo_regras, {'TP_PRESENCA_CN': [0, 2], 'TP_PRESENCA_CH': [0, 2]})  # doctest: +SKIP
+    """
+    fora = [coluna for coluna in dict_remover if coluna not in DIMENSOES_REGRAS or coluna not in cubo.columns]
+    if fora:
+        raise ValueError(f"As regras usam colunas que não são dimensões do cubo com regras: {fora}.")
+    restante = filter.remover_linhas(cubo, dict_remover)
+    return combinar([restante.drop(columns=[coluna for coluna in DIMENSOES_REGRAS if coluna in cubo.columns])])
+
+def combinar(cubos):
+    """
+    Junta cubos com as mesmas dimensões, somando as medidas das células que se repetem.
+    """
+    cubos = [cubo for cubo in cubos if cubo is not None]
+    juntos = pd.concat(cubos, ignore_index=True)
+    return juntos.groupby(dimensoes(juntos), observed=True, dropna=False, sort=True)[COLUNAS_MEDIDAS].sum().reset_index()
+
+def _caminho(raiz, nome, regras=False):
+    # O prefixo '_' faz o pyarrow ignorar o arquivo ao descobrir o dataset
+    return os.path.join(raiz, f"{'_cubo-regras' if regras else '_cubo'}_{nome}.parquet")
+
+def gravar(cubo, raiz=armazenamento.RAIZ_DATASET, nome='parte', regras=False):
+    """
+    Grava o cubo das linhas escritas com o prefixo `nome` na raiz do dataset. Com `regras`, grava o cubo com regras.
+    """
+    os.makedirs(raiz, exist_ok=True)
+    cubo.to_parquet(_caminho(raiz, nome, regras), index=False, compression=armazenamento.COMPRESSAO)
+
+def apagar(raiz=armazenamento.RAIZ_DATASET, nome='parte', regras=False):
+    """
+    Apaga o cubo gravado com o prefixo `nome`, se houver.
+    """
+    if os.path.exists(_caminho(raiz, nome, regras)):
+        os.remove(_caminho(raiz, nome, regras))
+
+def existe(raiz=armazenamento.RAIZ_DATASET, nome='parte', regras=False):
+    """
+    Diz se há um cubo gravado com o prefixo `nome`.
+    """
+    return os.path.exists(_caminho(raiz, nome, regras))
+
+def construir_cubo_do_dataset(raiz=armazenamento.RAIZ_DATASET, anos=None):
+    """
+    Constrói o cubo de um dataset já gravado, um ano de cada vez.
+
+    O cubo com regras não pode ser construído assim: as linhas removidas pelas regras não estão
+    no dataset, e só a filtragem com `cubo_regras=True` o grava.
+    """
+    if anos is None:
+        dataset = armazenamento.abrir_dataset(raiz)
+        anos = sorted(set(dataset.to_table(columns=['NU_ANO']).column('NU_ANO').to_pylist()))
+    for ano in anos:
+        gravar(construir_cubo(armazenamento.ler_dataset(raiz, colunas=DIMENSOES + NOTAS, anos=[ano])), raiz, str(ano))
+
+def carregar_cubo(raiz=armazenamento.RAIZ_DATASET, regras=False):
+    """
+    Lê e junta os cubos gravados na raiz do dataset.
+
+    O resultado é um DataFrame comum, que as funções `*_cubo` de `analise` agregam em
+    milissegundos, sem percorrer os dados. Com `regras`, lê o cubo com regras, que deve passar
+    por `aplicar_regras` antes de ir para `analise`.
+
+    Raises
+    ------
+    FileNotFoundError
+        Se não houver cubo em `raiz`.
+    """
+    caminhos = sorted(glob.glob(_caminho(raiz, '*', regras)))
+    if not caminhos:
+        raise FileNotFoundError(f"Nenhum cubo{' com regras' if regras else ''} em '{raiz}'. "
+                                f"Use {'filter_main.py --cubo-regras' if regras else 'construir_cubo_do_dataset'}.")
+    return combinar([pd.read_parquet(caminho) for caminho in caminhos])
+
+if __name__ == '__main__':
+    construir_cubo_do_dataset()
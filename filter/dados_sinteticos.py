@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Participantes por UF em 2019, em milhares, usados como pesos do sorteio
+PESOS_UFS = {"AC": 37, "AL": 94, "AP": 42, "AM": 129, "BA": 398, "CE": 290, "DF": 86, "ES": 94, "GO": 168,
+             "MA": 200, "MT": 100, "MS": 69, "MG": 538, "PA": 289, "PB": 137, "PR": 222, "PE": 290, "PI": 118,
+             "RJ": 336, "RN": 110, "RS": 222, "RO": 55, "RR": 16, "SC": 112, "SP": 858, "SE": 70, "TO": 46}
+
+LETRAS_Q006 = list('ABCDEFGHIJKLMNOPQ')
+
+def gerar_microdados(n_linhas, ano=2019, semente=0, colunas_extras=0):
+    """
+    Gera um DataFrame com o formato dos microdados brutos do INEP, para testes e benchmarks.
+
+    As distribuições imitam as reais de forma grosseira: cerca de 10% de treineiros, um quarto
+    de ausentes em cada dia de prova, notas ausentes para quem faltou e algumas redações nota 1000.
+
+    Parameters
+    ----------
+    n_linhas : int
+        Quantidade de participantes.
+    ano : int
+        Valor da coluna NU_ANO.
+    semente : int
+        Semente do gerador aleatório.
+    colunas_extras : int
+        Quantidade de colunas numéricas a mais, para imitar a largura do arquivo real.
+
+    Returns
+    -------
+    pd.DataFrame
+        Os microdados gerados.
+    """
+    gerador = np.random.default_rng(semente)
+    ufs = list(PESOS_UFS)
+    pesos = np.array(list(PESOS_UFS.values()), dtype=float)
+
+    # A presença é decidida por dia: CH e LC no primeiro, CN e MT no segundo
+    presenca_dia1 = gerador.choice([0, 1, 2], size=n_linhas, p=[0.25, 0.745, 0.005])
+    presenca_dia2 = np.where(presenca_dia1 == 1, gerador.choice([0, 1, 2], size=n_linhas, p=[0.06, 0.935, 0.005]), 0)
+
+    df = pd.DataFrame({
+        'NU_INSCRICAO': np.arange(n_linhas, dtype=np.int64) + ano * 10 ** 8,
+        'NU_ANO': np.full(n_linhas, ano),
+        'TP_COR_RACA': gerador.choice(7, size=n_linhas, p=[0.02, 0.35, 0.12, 0.45, 0.03, 0.005, 0.025]),
+        'IN_TREINEIRO': (gerador.random(n_linhas) < 0.1).astype(int),
+        'SG_UF_PROVA': np.array(ufs)[gerador.choice(len(ufs), size=n_linhas, p=pesos / pesos.sum())],
+        'TP_PRESENCA_CN': presenca_dia2,
+        'TP_PRESENCA_CH': presenca_dia1,
+        'TP_PRESENCA_LC': presenca_dia1,
+        'TP_PRESENCA_MT': presenca_dia2,
+    })
+
+    for coluna, presenca, media, desvio in [('NU_NOTA_CN', presenca_dia2, 480, 75), ('NU_NOTA_CH', presenca_dia1, 510, 80),
+                                            ('NU_NOTA_LC', presenca_dia1, 520, 60), ('NU_NOTA_MT', presenca_dia2, 520, 105)]:
+        notas = np.round(np.clip(gerador.normal(media, desvio, n_linhas), 0, 1000), 1)
+        df[coluna] = np.where(presenca == 1, notas, np.nan)
+
+    redacao = np.clip(np.round(gerador.normal(580, 180, n_linhas) / 20) * 20, 0, 1000)
+    df['NU_NOTA_REDACAO'] = np.where(presenca_dia1 == 1, redacao, np.nan)
+
+    df['Q005'] = np.clip(np.round(gerador.gamma(4, 1, n_linhas)), 1, 20).astype(int)
+    pesos_renda = np.array([3, 30, 18, 12, 8, 6, 6, 4, 3, 2, 1.5, 1.2, 1, 1.2, 1, 1, 1], dtype=float)
+    df['Q006'] = np.array(LETRAS_Q006)[gerador.choice(len(LETRAS_Q006), size=n_linhas, p=pesos_renda / pesos_renda.sum())]
+    df['Q025'] = np.where(gerador.random(n_linhas) < 0.18, 'A', 'B')
+
+    for indice in range(colunas_extras):
+        df[f'CO_EXTRA_{indice}'] = gerador.integers(0, 10 ** 6, n_linhas)
+
+    return df
+
+def gravar_microdados(df, caminho):
+    """
+    Grava `df` como o INEP grava os microdados: separado por ';' e em Latin-1.
+    """
+    df.to_csv(caminho, sep=';', index=False, encoding='latin-1')
@@ -1,6 +1,10 @@
 import os
-import requests
+import sys
+import json
 import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
 from tqdm import tqdm
 
 # URLs of the ZIP files to download
@@ -17,33 +21,281 @@ files_to_extract = ["DADOS/MICRODADOS_ENEM_2019.csv", "DADOS/MICRODADOS_ENEM_202
 # Directory where the script is located
 script_directory = os.path.dirname(os.path.realpath(__file__))
 
+# Size of each HTTP Range segment and of each read from the socket
+SEGMENT_SIZE = 32 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+
+# Maximum number of simultaneous HTTP connections, shared by all files
+MAX_CONNECTIONS = 8
+
 # Disable SSL certificate verification
 requests.packages.urllib3.disable_warnings()
 
-def download_and_extract_zips():
-    for zip_url, file_to_extract in zip(zip_urls, files_to_extract):
-        # Get the filename from the URL
-        zip_filename = os.path.basename(zip_url)
-        
-        # Download the ZIP file with SSL certificate verification disabled
-        response = requests.get(zip_url, stream=True, verify=False)
-        zip_path = os.path.join(script_directory, zip_filename)
-        
-        # Get the file size from the response headers
+
+class RangeNotSupportedError(Exception):
+    pass
+
+
+def probe(url, verify=False, timeout=30):
+    """
+    Asks the server for the first byte of the file to find its size and whether it accepts Range requests.
+
+    Parameters
+    ----------
+    url : str
+        URL of the file.
+    verify : bool
+        Whether to verify the SSL certificate.
+    timeout : float
+        Timeout of the request, in seconds.
+
+    Returns
+    -------
+    tuple of (int, bool)
+        Size of the file in bytes (0 if unknown) and whether Range requests are supported.
+    """
+    with requests.get(url, headers={'Range': 'bytes=0-0'}, stream=True, verify=verify, timeout=timeout) as response:
+        response.raise_for_status()
+        content_range = response.headers.get('content-range', '')
+        if response.status_code == 206 and '/' in content_range:
+            total = content_range.rsplit('/', 1)[1]
+            if total.isdigit():
+                return int(total), True
+        return int(response.headers.get('content-length', 0)), False
+
+
+def split_segments(file_size, segment_size=SEGMENT_SIZE):
+    """
+    Splits a file of `file_size` bytes into inclusive (start, end) byte ranges.
+
+    Examples
+    --------
+    >>> split_segments(10, 4)
+    [(0, 3), (4, 7), (8, 9)]
+    """
+    return [(start, min(start + segment_size, file_size) - 1) for start in range(0, file_size, segment_size)]
+
+
+class Journal:
+    """
+    Records which segments of a download are already on disk, so an interrupted run resumes where it stopped.
+
+    The journal is a small JSON file next to the partial download. It is rewritten atomically
+    each time a segment finishes, and discarded if the URL, the size or the segmentation changed.
+    """
+
+    def __init__(self, path, url, file_size, segment_size):
+        self.path = path
+        self.url = url
+        self.file_size = file_size
+        self.segment_size = segment_size
+        self.done = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path) as file:
+                state = json.load(file)
+            if (state.get('url'), state.get('file_size'), state.get('segment_size')) == (url, file_size, segment_size):
+                self.done = set(state.get('done', []))
+
+    def mark_done(self, index):
+        with self._lock:
+            self.done.add(index)
+            state = {'url': self.url, 'file_size': self.file_size,
+                     'segment_size': self.segment_size, 'done': sorted(self.done)}
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump(state, file)
+            os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _fetch_segment(url, part_path, start, end, bar, verify, retries, timeout):
+    # Downloads the bytes [start, end] into the partial file; after a dropped
+    # connection the next attempt continues from the last byte received
+    position = start
+    for attempt in range(retries + 1):
+        try:
+            headers = {'Range': f'bytes={position}-{end}'}
+            with requests.get(url, headers=headers, stream=True, verify=verify, timeout=timeout) as response:
+                if response.status_code != 206:
+                    raise RangeNotSupportedError(f"Server answered {response.status_code} to a Range request for {url}")
+                with open(part_path, 'r+b') as file:
+                    file.seek(position)
+                    for data in response.iter_content(chunk_size=CHUNK_SIZE):
+                        file.write(data)
+                        position += len(data)
+                        bar.update(len(data))
+            if position == end + 1:
+                return
+            raise requests.exceptions.ChunkedEncodingError(f"Segment {start}-{end} of {url} ended early")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+
+
+def _download_single_stream(url, dest_path, verify, timeout, position=0):
+    # Fallback for servers without Range support: one plain streamed GET, no resume
+    part_path = dest_path + '.part'
+    with requests.get(url, stream=True, verify=verify, timeout=timeout) as response:
+        response.raise_for_status()
         file_size = int(response.headers.get('content-length', 0))
-        
-        # Create a progress bar using tqdm
-        with open(zip_path, 'wb') as file, tqdm(
-                total=file_size, unit='B', unit_scale=True, unit_divisor=1024) as bar:
-            for data in response.iter_content(chunk_size=1024):
+        with open(part_path, 'wb') as file, tqdm(
+                total=file_size, unit='B', unit_scale=True, unit_divisor=1024,
+                desc=os.path.basename(dest_path), position=position) as bar:
+            for data in response.iter_content(chunk_size=CHUNK_SIZE):
                 file.write(data)
                 bar.update(len(data))
+    os.replace(part_path, dest_path)
+    return dest_path
+
+
+def download_files(jobs, max_connections=MAX_CONNECTIONS, segment_size=SEGMENT_SIZE,
+                   retries=3, verify=False, timeout=60):
+    """
+    Downloads several files at once, each one split into HTTP Range segments fetched concurrently.
+
+    All segments of all files share one pool of `max_connections` connections. Finished segments
+    are recorded in a journal (`<dest>.journal`), so running the function again after an interruption
+    only fetches what is missing. Files whose server refuses Range requests are downloaded with a
+    single plain GET.
+
+    Parameters
+    ----------
+    jobs : list of tuple
+        Pairs (url, dest_path).
+    max_connections : int
+        Maximum number of simultaneous HTTP connections.
+    segment_size : int
+        Size of each Range segment, in bytes.
+    retries : int
+        How many times a segment is retried after a dropped connection.
+    verify : bool
+        Whether to verify SSL certificates.
+    timeout : float
+        Timeout of each request, in seconds.
+
+    Returns
+    -------
+    list of str
+        The destination paths, in the same order as `jobs`.
+    """
+    if max_connections < 1:
+        raise ValueError("max_connections must be at least 1.")
+
+    fallback = []
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_connections) as executor:
+        files = {}
+        futures = {}
+
+        for position, (url, dest_path) in enumerate(jobs):
+            if os.path.exists(dest_path) and not os.path.exists(dest_path + '.journal'):
+                continue
+
+            file_size, accepts_ranges = probe(url, verify=verify, timeout=timeout)
+            if not accepts_ranges or file_size == 0:
+                fallback.append((position, url, dest_path))
+                continue
+
+            part_path = dest_path + '.part'
+            journal = Journal(dest_path + '.journal', url, file_size, segment_size)
+            if not journal.done or not os.path.exists(part_path) or os.path.getsize(part_path) != file_size:
+                journal.done = set()
+                with open(part_path, 'wb') as file:
+                    file.truncate(file_size)
+
+            segments = split_segments(file_size, segment_size)
+            already = sum(end - start + 1 for index, (start, end) in enumerate(segments) if index in journal.done)
+            bar = tqdm(total=file_size, initial=already, unit='B', unit_scale=True, unit_divisor=1024,
+                       desc=os.path.basename(dest_path), position=position)
+            files[dest_path] = (position, journal, part_path, bar)
+
+            for index, (start, end) in enumerate(segments):
+                if index not in journal.done:
+                    future = executor.submit(_fetch_segment, url, part_path, start, end, bar, verify, retries, timeout)
+                    futures[future] = (dest_path, index)
+
+        # Every finished segment is journaled as soon as it completes, even if
+        # another segment (or another file) fails
+        for future in as_completed(futures):
+            dest_path, index = futures[future]
+            try:
+                future.result()
+            except Exception as error:
+                errors.setdefault(dest_path, error)
+            else:
+                files[dest_path][1].mark_done(index)
+
+    for dest_path, (position, journal, part_path, bar) in files.items():
+        bar.close()
+        error = errors.get(dest_path)
+        if isinstance(error, RangeNotSupportedError):
+            journal.remove()
+            fallback.append((position, journal.url, dest_path))
+            del errors[dest_path]
+        elif error is None:
+            os.replace(part_path, dest_path)
+            journal.remove()
+
+    for position, url, dest_path in fallback:
+        _download_single_stream(url, dest_path, verify, timeout, position=position)
+
+    if errors:
+        raise next(iter(errors.values()))
+
+    return [dest_path for _, dest_path in jobs]
+
+
+def download_file(url, dest_path, **kwargs):
+    """
+    Downloads one file with `download_files`. Keyword arguments are passed along.
+    """
+    return download_files([(url, dest_path)], **kwargs)[0]
+
+
+def download_and_extract_zips(urls=None, members=None, directory=script_directory,
+                              max_connections=MAX_CONNECTIONS, segment_size=SEGMENT_SIZE, extract=True):
+    """
+    Downloads all the INEP ZIPs concurrently and extracts the microdata CSV of each one.
+
+    With `extract=False` only the ZIPs are kept; `filter_main.filtragem` reads the CSV
+    straight out of them, so the ~3 GB CSVs never touch the disk.
+
+    Parameters
+    ----------
+    urls : list of str, optional
+        URLs of the ZIP files. Defaults to `zip_urls`.
+    members : list of str, optional
+        Member of each ZIP to extract. Defaults to `files_to_extract`.
+    directory : str
+        Where the ZIPs are saved and the CSVs extracted.
+    max_connections : int
+        Maximum number of simultaneous HTTP connections, across all files.
+    segment_size : int
+        Size of each Range segment, in bytes.
+    extract : bool
+        Whether to extract the CSV members after downloading.
+    """
+    urls = zip_urls if urls is None else urls
+    members = files_to_extract if members is None else members
+
+    jobs = [(zip_url, os.path.join(directory, os.path.basename(zip_url))) for zip_url in urls]
+    zip_paths = download_files(jobs, max_connections=max_connections, segment_size=segment_size)
+    if not extract:
+        print("Downloaded " + ", ".join(os.path.basename(zip_path) for zip_path in zip_paths))
+        return
 
+    for zip_path, file_to_extract in zip(zip_paths, members):
         # Extract the specific file from the ZIP
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extract(file_to_extract, script_directory)
+            zip_ref.extract(file_to_extract, directory)
 
         print(f"Downloaded and extracted {file_to_extract}")
 
 if __name__ == "__main__":
-    download_and_extract_zips()
+    download_and_extract_zips(extract='--no-extract' not in sys.argv)
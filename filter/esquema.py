@@ -0,0 +1,94 @@
+import pandas as pd
+
+# Em ordem alfabética, para que agrupamentos pela categoria saiam na mesma ordem que com texto
+UFS = ["AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO",
+       "MA", "MG", "MS", "MT", "PA", "PB", "PE", "PI", "PR",
+       "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO"]
+
+LETRAS_Q006 = list('ABCDEFGHIJKLMNOPQ')
+
+# Tipo mais estreito de cada coluna de check_entries_dict. UF e letras dos questionários
+# viram categorias (códigos de 1 byte e um dicionário com os rótulos), as notas float32
+# (que distingue todas as notas de uma casa decimal entre 0 e 1000 e mantém o NaN) e os inteiros
+# pequenos o menor inteiro que cabe no domínio. A Q005 pode estar ausente, por isso é anulável
+ESQUEMA = {
+    'NU_ANO': 'int16',
+    'TP_COR_RACA': 'uint8',
+    'IN_TREINEIRO': 'uint8',
+    'SG_UF_PROVA': pd.CategoricalDtype(UFS),
+    'TP_PRESENCA_CN': 'uint8',
+    'TP_PRESENCA_CH': 'uint8',
+    'TP_PRESENCA_LC': 'uint8',
+    'TP_PRESENCA_MT': 'uint8',
+    'NU_NOTA_CN': 'float32',
+    'NU_NOTA_CH': 'float32',
+    'NU_NOTA_LC': 'float32',
+    'NU_NOTA_MT': 'float32',
+    'NU_NOTA_REDACAO': 'float32',
+    'Q005': 'UInt8',
+    'Q006': pd.CategoricalDtype(LETRAS_Q006),
+    'Q025': pd.CategoricalDtype(['A', 'B']),
+}
+
+REGIOES = ['Centro-Oeste', 'Nordeste', 'Norte', 'Sudeste', 'Sul']
+
+# Tipos das colunas derivadas acrescentadas pela filtragem (veja modulo_analise/derivadas.py). A média fica em
+# float32, como as notas, e a renda em float64, como calculada por analise
+ESQUEMA_DERIVADAS = {
+    'media': 'float32',
+    'Renda_Per_Capita': 'float64',
+    'Região': pd.CategoricalDtype(REGIOES),
+}
+
+def aplicar_esquema(df):
+    """
+    Converte as colunas de `df` que estão em `ESQUEMA` ou em `ESQUEMA_DERIVADAS` para o tipo compacto delas.
+
+    Os valores já devem ter passado por `filter.checa_entradas`: numa coluna categórica,
+    um valor fora das categorias viraria NaN.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        O DataFrame a converter. As demais colunas ficam como estão.
+
+    Returns
+    -------
+    pd.DataFrame
+        Um novo DataFrame com os tipos compactos.
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'NU_ANO': [2019, 2020], 'SG_UF_PROVA': ['SP', 'RJ'], 'Outra': [1, 2]})
+    >>> aplicar_esquema(df).dtypes.astype(str).tolist()
+    ['int16', 'category', 'int64']
+    """
+    return df.astype({coluna: tipo for coluna, tipo in {**ESQUEMA, **ESQUEMA_DERIVADAS}.items() if coluna in df.columns})
+
+def bytes_por_linha(df):
+    """
+    Retorna uma Series com quantos bytes cada coluna de `df` ocupa por linha, incluindo os dicionários das categorias.
+    """
+    return df.memory_usage(index=False, deep=True) / max(len(df), 1)
+
+def relatorio_memoria(df):
+    """
+    Compara os bytes por linha de cada coluna de `df` antes e depois de `aplicar_esquema`.
+
+    Returns
+    -------
+    pd.DataFrame
+        Colunas 'antes' e 'depois' com os bytes por linha, e uma última linha 'TOTAL'.
+    """
+    relatorio = pd.DataFrame({'antes': bytes_por_linha(df), 'depois': bytes_por_linha(aplicar_esquema(df))})
+    relatorio.loc['TOTAL'] = relatorio.sum()
+    return relatorio
+
+if __name__ == '__main__':
+    import dados_sinteticos
+    import ingestao
+
+    # Relatório de memória para um ano gerado, com os tipos que a leitura do CSV produz
+    df = dados_sinteticos.gerar_microdados(1_000_000)
+    df = df[list(ESQUEMA)].astype(ingestao.TIPOS_COLUNAS)
+    print(relatorio_memoria(df).round(2))
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def remover_linhas(df, dict_remover):
@@ -52,7 +53,26 @@ def remover_linhas(df, dict_remover):
     return df
 
 class InvalidEntryError(Exception):
-    pass
+    """
+    Entradas fora das válidas. `relatorio`, quando presente, tem o resumo de todas as colunas verificadas.
+    """
+
+    def __init__(self, mensagem, relatorio=None):
+        super().__init__(mensagem)
+        self.relatorio = relatorio
+
+# Quantas entradas inválidas a mensagem de InvalidEntryError lista, e quantos índices o relatório guarda por coluna
+LIMITE_MENSAGEM = 20
+TAMANHO_AMOSTRA = 10
+
+POLITICAS = ('falhar', 'descartar', 'quarentena')
+
+def _mensagem_invalidas(column_name, entradas_invalidas):
+    # Lista até LIMITE_MENSAGEM entradas, para não montar uma string do tamanho da coluna
+    mensagem = f"Entradas inválidas encontradas na coluna '{column_name}': {entradas_invalidas[:LIMITE_MENSAGEM].tolist()}"
+    if len(entradas_invalidas) > LIMITE_MENSAGEM:
+        mensagem += f" e mais {len(entradas_invalidas) - LIMITE_MENSAGEM}"
+    return mensagem
 
 def checa_entradas(df, column_entry_dict):
     """
@@ -70,7 +90,8 @@ def checa_entradas(df, column_entry_dict):
     Raises
     ------
     InvalidEntryError
-        Se algum valor não-NaN em uma coluna estiver fora do intervalo de entradas válidas.
+        Se algum valor não-NaN em uma coluna estiver fora do intervalo de entradas válidas. A mensagem
+        lista no máximo `LIMITE_MENSAGEM` entradas; use `relatorio_entradas` para ver todas as colunas.
 
     Examples
     --------
@@ -108,4 +129,209 @@ def checa_entradas(df, column_entry_dict):
             raise ValueError(f"Tipo de entrada inválido para a coluna '{column_name}'")
     
         if not entradas_invalidas.empty:
-            raise InvalidEntryError(f"Entradas inválidas encontradas na coluna '{column_name}': {entradas_invalidas.tolist()}")
+            raise InvalidEntryError(_mensagem_invalidas(column_name, entradas_invalidas))
+
+# Maior domínio de inteiros (máximo - mínimo + 1) compilado em tabela de consulta
+TAMANHO_MAXIMO_TABELA = 4096
+
+def _tabela_de_consulta(valores):
+    # Tabela booleana indexada por (valor - mínimo), ou None se os valores não forem inteiros próximos
+    if not valores or not all(isinstance(valor, (int, np.integer)) and not isinstance(valor, bool) for valor in valores):
+        return None
+    minimo, maximo = min(valores), max(valores)
+    if maximo - minimo >= TAMANHO_MAXIMO_TABELA:
+        return None
+    tabela = np.zeros(maximo - minimo + 1, dtype=bool)
+    tabela[np.asarray(valores, dtype=np.int64) - minimo] = True
+    return minimo, tabela
+
+def _pertence(coluna, valores, tabela):
+    # Equivalente a coluna.isin(valores), com a tabela de consulta quando a coluna é de inteiros
+    if tabela is not None and coluna.dtype.kind in 'iu':
+        minimo, tabela = tabela
+        # Ausentes (Int64 anulável) viram minimo - 1, fora da tabela, e como em isin não pertencem
+        deslocado = coluna.to_numpy(dtype=np.int64, na_value=minimo - 1) - minimo
+        return np.take(tabela, deslocado, mode='clip') & (deslocado >= 0) & (deslocado < len(tabela))
+    return coluna.isin(valores).to_numpy(dtype=bool)
+
+class PlanoFiltragem:
+    """
+    `remover_linhas` seguida de `checa_entradas`, compiladas numa só passada sobre o DataFrame.
+
+    Cada regra vira um teste vetorizado (uma tabela de consulta valor -> sim/não para listas de
+    inteiros pequenos, como TP_PRESENCA_* e IN_TREINEIRO, comparações para intervalos e `isin`
+    para o resto). Todas são combinadas numa única máscara, e o DataFrame é copiado uma vez só, no fim.
+
+    Parameters
+    ----------
+    dict_remover : dict
+        Linhas a remover, no formato de `remover_linhas`.
+    column_entry_dict : dict
+        Entradas válidas por coluna, no formato de `checa_entradas`.
+
+    Raises
+    ------
+    ValueError
+        Se o tipo das entradas válidas de alguma coluna não for lista nem tupla (mínimo, máximo).
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'IN_TREINEIRO': [0, 1, 0], 'Nota': [10.0, 20.0, None]})
+    >>> plano = PlanoFiltragem({'IN_TREINEIRO': 1}, {'Nota': (0.0, 1000.0)})
+    >>> plano.aplicar(df)
+       IN_TREINEIRO  Nota
+    0             0  10.0
+    2             0   NaN
+    """
+
+    def __init__(self, dict_remover, column_entry_dict):
+        self.remocoes = []
+        for coluna, valores in dict_remover.items():
+            if not isinstance(valores, list):
+                valores = [valores]
+            self.remocoes.append((coluna, valores, _tabela_de_consulta(valores)))
+
+        self.verificacoes = []
+        for column_name, entry_range in column_entry_dict.items():
+            if isinstance(entry_range, list):
+                self.verificacoes.append((column_name, entry_range, _tabela_de_consulta(entry_range)))
+            elif isinstance(entry_range, tuple) and len(entry_range) == 2:
+                self.verificacoes.append((column_name, entry_range, None))
+            else:
+                raise ValueError(f"Tipo de entrada inválido para a coluna '{column_name}'")
+
+    def _invalidas(self, coluna, entry_range, tabela):
+        if isinstance(entry_range, tuple):
+            min_value, max_value = entry_range
+            return ((coluna < min_value) | (coluna > max_value)).to_numpy(dtype=bool, na_value=False)
+        return coluna.notna().to_numpy() & ~_pertence(coluna, entry_range, tabela)
+
+    def _mascara_remocao(self, df):
+        manter = np.ones(len(df), dtype=bool)
+        for coluna, valores, tabela in self.remocoes:
+            manter &= ~_pertence(df[coluna], valores, tabela)
+        return manter
+
+    def separar(self, df, amostra=TAMANHO_AMOSTRA):
+        """
+        Remove as linhas de `dict_remover` e separa as que sobraram em válidas e inválidas, verificando todas as colunas.
+
+        Returns
+        -------
+        tuple
+            As linhas válidas; as inválidas, com uma coluna 'COLUNAS_INVALIDAS' com os nomes das
+            colunas violadas separados por ';'; e o relatório de `relatorio_entradas`.
+        """
+        manter = self._mascara_remocao(df)
+        relatorio = {}
+        mascaras = {}
+        for column_name, entry_range, tabela in self.verificacoes:
+            invalidas = self._invalidas(df[column_name], entry_range, tabela) & manter
+            relatorio[column_name] = _resumir_invalidas(df, column_name, invalidas, amostra)
+            if relatorio[column_name]['invalidas']:
+                mascaras[column_name] = invalidas
+
+        alguma_invalida = np.zeros(len(df), dtype=bool)
+        for invalidas in mascaras.values():
+            alguma_invalida |= invalidas
+
+        rejeitadas = df[alguma_invalida]
+        motivos = pd.Series('', index=rejeitadas.index, dtype=object)
+        for column_name, invalidas in mascaras.items():
+            motivos += np.where(invalidas[alguma_invalida], column_name + ';', '')
+        rejeitadas = rejeitadas.assign(COLUNAS_INVALIDAS=motivos.str.rstrip(';'))
+
+        return df[manter & ~alguma_invalida], rejeitadas, relatorio
+
+    def aplicar(self, df, politica='falhar'):
+        """
+        Remove as linhas de `dict_remover` e verifica as entradas das linhas que sobraram.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            O DataFrame a filtrar.
+        politica : {'falhar', 'descartar', 'quarentena'}
+            O que fazer com linhas inválidas: 'falhar' lança `InvalidEntryError`; 'descartar' e
+            'quarentena' as removem do resultado (para guardá-las, use `separar`).
+
+        Returns
+        -------
+        pd.DataFrame
+            Com 'falhar', o mesmo resultado de `remover_linhas(df, dict_remover)`.
+
+        Raises
+        ------
+        InvalidEntryError
+            Com 'falhar', nas mesmas condições e com a mesma mensagem de `checa_entradas`, e com o
+            relatório de todas as colunas em `relatorio`.
+        """
+        if politica not in POLITICAS:
+            raise ValueError(f"Política inválida: '{politica}'. Use uma de {POLITICAS}.")
+
+        if politica != 'falhar':
+            return self.separar(df)[0]
+
+        manter = self._mascara_remocao(df)
+        for column_name, entry_range, tabela in self.verificacoes:
+            invalidas = self._invalidas(df[column_name], entry_range, tabela) & manter
+            if invalidas.any():
+                raise InvalidEntryError(_mensagem_invalidas(column_name, df[column_name][invalidas]),
+                                        self.separar(df)[2])
+
+        return df[manter]
+
+def _resumir_invalidas(df, column_name, invalidas, amostra):
+    quantidade = int(invalidas.sum())
+    if not quantidade:
+        return {'invalidas': 0, 'valores': {}, 'amostra': []}
+    contagens = df[column_name][invalidas].value_counts(dropna=False)
+    contagens = contagens[contagens > 0]
+    return {'invalidas': quantidade,
+            'valores': dict(zip(contagens.index.tolist(), contagens.tolist())),
+            'amostra': df.index[invalidas][:amostra].tolist()}
+
+def relatorio_entradas(df, column_entry_dict, amostra=TAMANHO_AMOSTRA):
+    """
+    Verifica todas as colunas de `column_entry_dict` numa só passada e resume as entradas inválidas, sem lançar exceção.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        O DataFrame de entrada.
+    column_entry_dict : dict
+        Entradas válidas por coluna, no formato de `checa_entradas`.
+    amostra : int
+        Quantos índices de linhas inválidas guardar por coluna.
+
+    Returns
+    -------
+    dict
+        Para cada coluna, um dicionário com 'invalidas' (quantidade de linhas), 'valores' (cada
+        valor inválido distinto e quantas vezes aparece) e 'amostra' (até `amostra` índices).
+
+    Examples
+    --------
+    >>> df = pd.DataFrame({'Coluna1': ['A', 'X', 'X', 'B'], 'Coluna2': [1.5, 2.0, 3.7, 999.9]})
+    >>> relatorio = relatorio_entradas(df, {'Coluna1': ['A', 'B'], 'Coluna2': (0.0, 10.0)})
+    >>> relatorio['Coluna1']
+    {'invalidas': 2, 'valores': {'X': 2}, 'amostra': [1, 2]}
+    >>> relatorio['Coluna2']['invalidas']
+    1
+    """
+    return PlanoFiltragem({}, column_entry_dict).separar(df, amostra)[2]
+
+def combinar_relatorios(relatorio, outro, amostra=TAMANHO_AMOSTRA):
+    """
+    Soma dois relatórios de `relatorio_entradas`, por exemplo de blocos diferentes do mesmo arquivo.
+    """
+    combinado = {}
+    for coluna in list(relatorio) + [coluna for coluna in outro if coluna not in relatorio]:
+        a = relatorio.get(coluna, {'invalidas': 0, 'valores': {}, 'amostra': []})
+        b = outro.get(coluna, {'invalidas': 0, 'valores': {}, 'amostra': []})
+        valores = dict(a['valores'])
+        for valor, contagem in b['valores'].items():
+            valores[valor] = valores.get(valor, 0) + contagem
+        combinado[coluna] = {'invalidas': a['invalidas'] + b['invalidas'], 'valores': valores,
+                             'amostra': (a['amostra'] + b['amostra'])[:amostra]}
+    return combinado
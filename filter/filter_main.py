@@ -1,36 +1,440 @@
+import os
+import sys
+import json
+import time
+import argparse
+import zipfile
+from collections import deque
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import filter
+import ingestao
+import esquema
+import armazenamento
+import catalogo
+import cubo
+import cache_colunar
+import manifesto
+# As colunas derivadas são calculadas pelas mesmas fórmulas de analise, em modulo_analise/derivadas.py.
+# O resto de filter a obtém daqui (`from filter_main import derivadas`), sem depender do sys.path
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'modulo_analise'))
+import derivadas
 
-# Função que executa a filtragem em cada DataFrame
-def filtragem(df, name, remove_dict, check_dict):
+# Memória que a leitura de um arquivo de microdados pode ocupar, em bytes
+ORCAMENTO_MEMORIA = 1024 ** 3
+
+# Memória que a filtragem de todos os anos em paralelo pode ocupar, e o mínimo por processo
+ORCAMENTO_MEMORIA_TOTAL = 3 * 1024 ** 3
+ORCAMENTO_MINIMO = 256 * 1024 ** 2
+
+# Quantas vezes o tamanho de um bloco em memória cabe no pico da filtragem dele:
+# o bloco lido, as cópias feitas por remover_linhas e o buffer do to_csv
+FATOR_PICO = 4
+
+# Linhas lidas para estimar quanto cada linha ocupa em memória
+LINHAS_AMOSTRA = 1000
+
+# Colunas usadas apenas na filtragem, removidas do arquivo final
+colunas_descartadas = ['IN_TREINEIRO', 'TP_PRESENCA_CN', 'TP_PRESENCA_CH', 'TP_PRESENCA_LC', 'TP_PRESENCA_MT']
+
+@contextmanager
+def abrir_microdados(fonte, membro=None):
+    """
+    Abre o CSV de microdados para leitura binária, seja ele um arquivo solto ou um membro de um ZIP do INEP.
+
+    No caso do ZIP, o membro é lido como um fluxo descomprimido, sem ser extraído para o disco.
+
+    Parameters
+    ----------
+    fonte : str
+        Caminho de um arquivo .csv ou .zip.
+    membro : str, optional
+        Nome do CSV dentro do ZIP. Se omitido, usa o único `MICRODADOS_ENEM_<ano>.csv` do arquivo.
+
+    Yields
+    ------
+    file object
+        Fluxo binário com o conteúdo do CSV.
+    """
+    if not zipfile.is_zipfile(fonte):
+        with open(fonte, 'rb') as fluxo:
+            yield fluxo
+        return
+
+    with zipfile.ZipFile(fonte, 'r') as zip_ref:
+        if membro is None:
+            candidatos = [nome for nome in zip_ref.namelist()
+                          if os.path.basename(nome).startswith('MICRODADOS_ENEM_') and nome.lower().endswith('.csv')]
+            if len(candidatos) != 1:
+                raise ValueError(f"Não foi possível identificar o CSV de microdados em '{fonte}': {candidatos}")
+            membro = candidatos[0]
+        with zip_ref.open(membro) as fluxo:
+            yield fluxo
+
+def estimar_bytes_por_linha(fonte, colunas, membro=None, amostra=LINHAS_AMOSTRA):
+    """
+    Estima quantos bytes cada linha de `colunas` ocupa em memória, lendo apenas as primeiras `amostra` linhas.
+    """
+    with abrir_microdados(fonte, membro) as fluxo:
+        df = next(iter(ingestao.ler_microdados(fluxo, colunas, tamanho_bloco=amostra)))
+    return df.memory_usage(index=True, deep=True).sum() / max(len(df), 1)
+
+def linhas_por_bloco(orcamento_memoria, bytes_por_linha, fator_pico=FATOR_PICO):
+    """
+    Calcula quantas linhas ler de cada vez para que o pico de memória fique dentro do orçamento.
+
+    Examples
+    --------
+    >>> linhas_por_bloco(1000, 10, fator_pico=4)
+    25
+    """
+    return max(1, int(orcamento_memoria // (bytes_por_linha * fator_pico)))
+
+def ler_em_blocos(fonte, colunas=None, membro=None, tamanho_bloco=None, orcamento_memoria=ORCAMENTO_MEMORIA, motor='c'):
+    """
+    Lê os microdados de `fonte` em DataFrames, mantendo apenas `colunas`.
+
+    Se `tamanho_bloco` não for dado, ele é calculado a partir de `orcamento_memoria`, de modo que
+    a memória usada depende do orçamento e não do tamanho do arquivo. `motor` é o parser de
+    `ingestao.ler_csv`.
+    """
+    if tamanho_bloco is None:
+        tamanho_bloco = linhas_por_bloco(orcamento_memoria, estimar_bytes_por_linha(fonte, colunas, membro))
+
+    with abrir_microdados(fonte, membro) as fluxo:
+        yield from ingestao.ler_microdados(fluxo, colunas, motor, tamanho_bloco)
+
+def _filtrar_intervalo(caminho, cabecalho, inicio, fim, remove_dict, check_dict, motor, politica, cubo_regras):
+    # Executado em um processo do pool: lê e filtra um pedaço do arquivo, e só o resultado filtrado
+    # volta, junto com a quantidade de linhas lidas
+    bloco = ingestao.ler_intervalo(caminho, cabecalho, inicio, fim, list(check_dict.keys()), motor)
+    return len(bloco), separar_bloco(bloco, remove_dict, check_dict, politica, cubo_regras)
+
+def _deslocar(resultado, deslocamento):
+    # Cada intervalo é lido com um índice que começa em 0. Soma a ele as linhas dos intervalos
+    # anteriores, para que o índice e as amostras do relatório sejam as posições no arquivo, como
+    # na leitura sequencial
+    filtrado, rejeitadas, relatorio, cubo_bloco = resultado
+    filtrado.index = filtrado.index + deslocamento
+    if rejeitadas is not None:
+        rejeitadas.index = rejeitadas.index + deslocamento
+        for resumo in relatorio.values():
+            resumo['amostra'] = [linha + deslocamento for linha in resumo['amostra']]
+    return filtrado, rejeitadas, relatorio, cubo_bloco
+
+def filtrar_em_paralelo(caminho, remove_dict, check_dict, processos, orcamento_memoria=ORCAMENTO_MEMORIA, motor='c',
+                        politica='falhar', cubo_regras=False):
+    """
+    Lê e filtra um único CSV de microdados em `processos` processos, cada um com um intervalo de bytes do arquivo.
+
+    Os intervalos são alinhados às quebras de linha por `ingestao.intervalos_de_linhas` e
+    dimensionados para que os processos juntos fiquem dentro de `orcamento_memoria`. No máximo
+    dois intervalos por processo ficam em andamento ao mesmo tempo.
+
+    Yields
+    ------
+    tuple
+        O resultado de `separar_bloco` para cada intervalo, na mesma ordem das linhas do arquivo e
+        com o índice contando as linhas desde o início do arquivo.
+    """
+    tamanho_intervalo = max(1, orcamento_memoria // (processos * FATOR_PICO))
+    cabecalho, intervalos = ingestao.intervalos_de_linhas(caminho, tamanho_intervalo)
+
+    linhas_anteriores = 0
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        pendentes = deque()
+        for inicio, fim in intervalos:
+            pendentes.append(executor.submit(_filtrar_intervalo, caminho, cabecalho, inicio, fim,
+                                             remove_dict, check_dict, motor, politica, cubo_regras))
+            if len(pendentes) >= 2 * processos:
+                linhas, resultado = pendentes.popleft().result()
+                yield _deslocar(resultado, linhas_anteriores)
+                linhas_anteriores += linhas
+        while pendentes:
+            linhas, resultado = pendentes.popleft().result()
+            yield _deslocar(resultado, linhas_anteriores)
+            linhas_anteriores += linhas
+
+def separar_bloco(df, remove_dict, check_dict, politica='falhar', cubo_regras=False):
+    """
+    Filtra um bloco como `filtrar_bloco` e devolve também as linhas inválidas e o relatório de validação.
+
+    Com `cubo_regras`, também agrega as linhas válidas do bloco antes das regras de `remove_dict`,
+    com as colunas das regras como dimensões (veja `cubo.aplicar_regras`).
+
+    O bloco filtrado já sai com as colunas de `derivadas.adicionar_derivadas` (em modulo_analise),
+    nos tipos de `esquema.ESQUEMA_DERIVADAS`.
+
+    Returns
+    -------
+    tuple
+        O bloco filtrado; as linhas inválidas (veja `filter.PlanoFiltragem.separar`) e o relatório
+        de `filter.relatorio_entradas`, ou None e None com a política 'falhar'; e o cubo com
+        regras do bloco, ou None.
+    """
     # Remove colunas indesejadas
-    maintain_list = check_dict.keys()
+    maintain_list = list(check_dict.keys())
     df = df[maintain_list]
 
-    # Remove linhas com valores indesejados, por exemplo, treineiros do ENEM
-    df = filter.remover_linhas(df, remove_dict)
+    cubo_bloco = None
+    if cubo_regras:
+        # As linhas que seriam removidas também entram, desde que as entradas delas sejam válidas
+        validas = filter.PlanoFiltragem({}, check_dict).separar(df)[0]
+        cubo_bloco = cubo.construir_cubo(esquema.aplicar_esquema(validas), cubo.DIMENSOES + cubo.DIMENSOES_REGRAS)
 
-    # Verifica se as colunas têm a entrada correta
-    filter.checa_entradas(df, check_dict)
+    # Remove linhas com valores indesejados, por exemplo, treineiros do ENEM, e verifica se as
+    # colunas têm a entrada correta, numa só passada (equivale a remover_linhas + checa_entradas)
+    plano = filter.PlanoFiltragem(remove_dict, check_dict)
+    if politica == 'falhar':
+        df, rejeitadas, relatorio = plano.aplicar(df), None, None
+    else:
+        df, rejeitadas, relatorio = plano.separar(df)
 
-    # Remove colunas que não serão mais usadas
-    df = df.drop(columns=['IN_TREINEIRO', 'TP_PRESENCA_CN', 'TP_PRESENCA_CH', 'TP_PRESENCA_LC', 'TP_PRESENCA_MT'])
-    
-    # Cria arquivo CSV com o DataFrame filtrado
-    df.to_csv(f'{name}_filtrado.csv', index=False)
+    # Remove colunas que não serão mais usadas, converte as demais para os tipos compactos e
+    # acrescenta a média, a renda per capita e a região, para que as análises não as recalculem
+    df = esquema.aplicar_esquema(derivadas.adicionar_derivadas(df.drop(columns=colunas_descartadas)))
+    return df, rejeitadas, relatorio, cubo_bloco
+
+def filtrar_bloco(df, remove_dict, check_dict, politica='falhar'):
+    return separar_bloco(df, remove_dict, check_dict, politica)[0]
+
+# Função que executa a filtragem em cada DataFrame
+def filtragem(df, name, remove_dict, check_dict, membro=None, tamanho_bloco=None, orcamento_memoria=ORCAMENTO_MEMORIA,
+              motor='c', formato='parquet', raiz=armazenamento.RAIZ_DATASET, processos=1, politica='falhar',
+              cubo_regras=False):
+    """
+    Filtra os microdados de um ano e grava o resultado no dataset Parquet particionado ou em `<name>_filtrado.csv`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame or str
+        Os microdados já carregados, ou o caminho do CSV ou do ZIP do INEP. Quando é um caminho,
+        o arquivo é lido e filtrado bloco a bloco, só com as colunas de `check_dict`, e o CSV de
+        dentro do ZIP nunca é extraído.
+    name : str
+        Prefixo do arquivo de saída (CSV) ou dos arquivos de cada partição (Parquet).
+    remove_dict : dict
+        Linhas a remover, no formato de `filter.remover_linhas`.
+    check_dict : dict
+        Colunas mantidas e suas entradas válidas, no formato de `filter.checa_entradas`.
+    membro : str, optional
+        Nome do CSV dentro do ZIP.
+    tamanho_bloco : int, optional
+        Quantidade de linhas lidas de cada vez. Se omitido, é calculado a partir de `orcamento_memoria`.
+    orcamento_memoria : int
+        Memória, em bytes, que a leitura de um bloco e sua filtragem podem ocupar. Com `processos` > 1,
+        é a memória de todos os processos juntos, dividida entre eles por `filtrar_em_paralelo`.
+    motor : {'c', 'pyarrow'}
+        Parser usado na leitura do arquivo.
+    formato : {'parquet', 'csv'}
+        'parquet' grava em `raiz`, particionado por NU_ANO e SG_UF_PROVA, junto com o catálogo das
+        partições (veja `catalogo.carregar_catalogo`) e do cubo de agregados (veja `cubo.carregar_cubo`);
+        'csv' grava `<name>_filtrado.csv`.
+    raiz : str
+        Diretório do dataset Parquet.
+    processos : int
+        Com mais de um, um CSV solto é dividido em intervalos de bytes lidos e filtrados em
+        paralelo (veja `filtrar_em_paralelo`). O CSV dentro de um ZIP é sempre lido em sequência.
+    politica : {'falhar', 'descartar', 'quarentena'}
+        O que fazer com linhas de entradas inválidas. 'falhar' lança `filter.InvalidEntryError`;
+        'descartar' as remove; 'quarentena' as remove e as grava em `<name>_quarentena.csv`, com
+        a coluna COLUNAS_INVALIDAS. Com 'descartar' e 'quarentena', o relatório de validação de
+        todas as colunas é gravado em `<name>_validacao.json`.
+    cubo_regras : bool
+        Com 'parquet', grava também o cubo com regras: o cubo das linhas válidas antes da
+        remoção de `remove_dict`, com as colunas das regras como dimensões. Outras regras de
+        remoção são aplicadas depois com `cubo.aplicar_regras`, sem filtrar de novo.
+
+    Returns
+    -------
+    int
+        Quantidade de linhas gravadas.
+    """
+    if formato not in ('parquet', 'csv'):
+        raise ValueError(f"Formato de saída inválido: '{formato}'.")
+    if politica not in filter.POLITICAS:
+        raise ValueError(f"Política inválida: '{politica}'. Use uma de {filter.POLITICAS}.")
+
+    if isinstance(df, pd.DataFrame):
+        resultados = (separar_bloco(bloco, remove_dict, check_dict, politica, cubo_regras) for bloco in [df])
+    elif processos > 1 and not zipfile.is_zipfile(df):
+        resultados = filtrar_em_paralelo(df, remove_dict, check_dict, processos, orcamento_memoria, motor, politica,
+                                         cubo_regras)
+    else:
+        blocos = ler_em_blocos(df, list(check_dict.keys()), membro, tamanho_bloco, orcamento_memoria, motor)
+        resultados = (separar_bloco(bloco, remove_dict, check_dict, politica, cubo_regras) for bloco in blocos)
+
+    linhas = 0
+    relatorio = {}
+    with ExitStack() as arquivos:
+        if formato == 'parquet':
+            # Apaga o que uma execução anterior gravou para o mesmo nome antes de acrescentar os blocos
+            armazenamento.apagar_partes(raiz, name)
+            armazenamento.apagar_versoes(raiz, name)
+            catalogo.apagar(raiz, name)
+            cubo.apagar(raiz, name)
+            cubo.apagar(raiz, name, regras=True)
+            particoes = {}
+            versoes = None
+            cubo_ano = None
+            cubo_regras_ano = None
+        else:
+            # Cria arquivo CSV com o DataFrame filtrado, acrescentando um bloco de cada vez
+            saida = arquivos.enter_context(open(f'{name}_filtrado.csv', 'w', newline=''))
+        if politica == 'quarentena':
+            quarentena = arquivos.enter_context(open(f'{name}_quarentena.csv', 'w', newline=''))
+            em_quarentena = 0
+
+        for indice, (filtrado, rejeitadas, relatorio_bloco, cubo_regras_bloco) in enumerate(resultados):
+            if formato == 'parquet':
+                armazenamento.escrever_dataset(filtrado, raiz, name, indice)
+                versoes = filtrado.attrs.get('versoes_derivadas', {})
+                particoes = catalogo.combinar(particoes, catalogo.resumir(filtrado))
+                cubo_ano = cubo.combinar([cubo_ano, cubo.construir_cubo(filtrado)])
+                if cubo_regras_bloco is not None:
+                    cubo_regras_ano = cubo.combinar([cubo_regras_ano, cubo_regras_bloco])
+            else:
+                filtrado.to_csv(saida, index=False, header=indice == 0)
+            linhas += len(filtrado)
+
+            if relatorio_bloco is not None:
+                relatorio = filter.combinar_relatorios(relatorio, relatorio_bloco)
+            if politica == 'quarentena' and len(rejeitadas):
+                rejeitadas.to_csv(quarentena, index=False, header=em_quarentena == 0)
+                em_quarentena += len(rejeitadas)
+
+    if formato == 'parquet':
+        # Distintos, nulos, mínimo e máximo de cada coluna por partição, lidos por catalogo.carregar_catalogo
+        catalogo.gravar(particoes, raiz, name)
+        # Versões das fórmulas das colunas derivadas, lidas por armazenamento.ler_dataset
+        if versoes is not None:
+            armazenamento.gravar_versoes(versoes, raiz, name)
+        # Contagens e somas das notas por ano, UF, cor/raça, Q005, Q006 e Q025, lidas por cubo.carregar_cubo
+        if cubo_ano is not None:
+            cubo.gravar(cubo_ano, raiz, name)
+        if cubo_regras_ano is not None:
+            cubo.gravar(cubo_regras_ano, raiz, name, regras=True)
+    if politica != 'falhar':
+        with open(f'{name}_validacao.json', 'w') as file:
+            json.dump(relatorio, file, indent=2, ensure_ascii=False)
+    return linhas
+
+def _filtrar_ano(ano, fonte, remove_dict, check_dict, orcamento_memoria, kwargs):
+    # Executado em um processo do pool; o resultado e o erro voltam ao processo principal
+    inicio = time.perf_counter()
+    linhas = filtragem(fonte, str(ano), remove_dict, check_dict, orcamento_memoria=orcamento_memoria, **kwargs)
+    return linhas, time.perf_counter() - inicio
+
+def _saida_existe(ano, linhas, formato='parquet', raiz=armazenamento.RAIZ_DATASET, cubo_regras=False, **kwargs):
+    if formato == 'csv':
+        return os.path.exists(f'{ano}_filtrado.csv')
+    # O cubo com regras não depende das regras de remoção, mas só a filtragem o grava
+    if cubo_regras and not cubo.existe(raiz, str(ano), regras=True):
+        return False
+    return linhas == 0 or bool(armazenamento.partes(raiz, str(ano)))
+
+def _dividir_memoria(memoria_total, trabalhadores, anos, processos=1):
+    # Cada ano ocupa `processos` processos de leitura, e todos os anos juntos cabem em
+    # `memoria_total` com pelo menos ORCAMENTO_MINIMO para cada processo. O orçamento de um ano
+    # é repartido entre os processos dele por filtrar_em_paralelo
+    processos = max(1, processos)
+    trabalhadores = max(1, min(trabalhadores, anos, memoria_total // (ORCAMENTO_MINIMO * processos)))
+    return trabalhadores, memoria_total // trabalhadores
+
+def filtrar_anos(fontes, remove_dict, check_dict, trabalhadores=None, memoria_total=ORCAMENTO_MEMORIA_TOTAL,
+                 caminho_manifesto=None, **kwargs):
+    """
+    Executa `filtragem` para cada ano em um pool de processos, um ano por processo.
+
+    O número de processos é limitado pela memória. Cada ano recebe `memoria_total / trabalhadores`
+    como orçamento. Com `processos` > 1 (veja `filtragem`), o orçamento do ano é dividido entre
+    os `processos` processos que leem o CSV dele, então o pico de todos os anos juntos continua
+    em `memoria_total`. A quantidade de anos em paralelo é reduzida para que cada um desses
+    `trabalhadores * processos` processos tenha pelo menos `ORCAMENTO_MINIMO`, mas nunca abaixo
+    de um ano por vez. Um ano que falha não interrompe os outros.
+
+    Com `caminho_manifesto`, a execução é incremental: um ano cuja fonte, regras e formato de
+    saída são os mesmos registrados no manifesto, e cuja saída ainda existe, não é filtrado de
+    novo. Cada ano é registrado assim que termina, então uma execução interrompida recomeça
+    pelos anos que não chegaram a ser gravados.
+
+    Parameters
+    ----------
+    fontes : dict
+        Ano -> caminho do CSV ou ZIP dos microdados.
+    remove_dict : dict
+        Linhas a remover, no formato de `filter.remover_linhas`.
+    check_dict : dict
+        Colunas mantidas e suas entradas válidas, no formato de `filter.checa_entradas`.
+    trabalhadores : int, optional
+        Número máximo de processos. Se omitido, usa a quantidade de núcleos.
+    memoria_total : int
+        Memória, em bytes, que todos os processos juntos podem ocupar.
+    caminho_manifesto : str, optional
+        Arquivo do `manifesto.Manifesto`. Se omitido, todos os anos são filtrados.
+    **kwargs
+        Repassados a `filtragem` (motor, formato, raiz, ...).
+
+    Returns
+    -------
+    dict
+        Ano -> dicionário com 'status' ('ok', 'atualizado' ou 'erro'), 'linhas' e 'segundos', ou
+        'erro' com a mensagem.
+    """
+    resultados = {}
+    impressoes = {}
+    registro = None
+    if caminho_manifesto is not None:
+        registro = manifesto.Manifesto(caminho_manifesto)
+        regras = manifesto.impressao_regras(remove_dict, check_dict, colunas_descartadas,
+                                            kwargs.get('formato', 'parquet'), kwargs.get('politica', 'falhar'),
+                                            derivadas.VERSOES)
+        for ano, fonte in fontes.items():
+            try:
+                impressoes[ano] = manifesto.impressao_fonte(fonte)
+            except OSError:
+                # A filtragem do ano vai falhar e informar o erro
+                continue
+            entrada = registro.anos.get(ano)
+            if registro.atualizado(ano, impressoes[ano], regras) and _saida_existe(ano, entrada['linhas'], **kwargs):
+                resultados[ano] = {'status': 'atualizado', 'linhas': entrada['linhas'], 'segundos': 0.0}
+            else:
+                registro.invalidar(ano)
+        fontes = {ano: fonte for ano, fonte in fontes.items() if ano not in resultados}
+
+    if fontes:
+        trabalhadores, orcamento = _dividir_memoria(memoria_total, trabalhadores or os.cpu_count() or 1, len(fontes),
+                                                    kwargs.get('processos', 1))
+
+        with ProcessPoolExecutor(max_workers=trabalhadores) as executor:
+            futuros = {executor.submit(_filtrar_ano, ano, fonte, remove_dict, check_dict, orcamento, kwargs): ano
+                       for ano, fonte in fontes.items()}
+            for futuro in as_completed(futuros):
+                ano = futuros[futuro]
+                try:
+                    linhas, segundos = futuro.result()
+                    resultados[ano] = {'status': 'ok', 'linhas': linhas, 'segundos': segundos}
+                except Exception as erro:
+                    resultados[ano] = {'status': 'erro', 'erro': f'{type(erro).__name__}: {erro}'}
+                    continue
+                if registro is not None and ano in impressoes:
+                    registro.registrar(ano, impressoes[ano], regras, caminho=fontes[ano], linhas=linhas)
+
+    return dict(sorted(resultados.items()))
 
 # Cria variáveis de controle
-columns_to_maintain = ['NU_ANO', 'TP_COR_RACA', 'IN_TREINEIRO', 'SG_UF_PROVA', 'TP_PRESENCA_CN', 'TP_PRESENCA_CH', 
-                       'TP_PRESENCA_LC', 'TP_PRESENCA_MT', 'NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 
+columns_to_maintain = ['NU_ANO', 'TP_COR_RACA', 'IN_TREINEIRO', 'SG_UF_PROVA', 'TP_PRESENCA_CN', 'TP_PRESENCA_CH',
+                       'TP_PRESENCA_LC', 'TP_PRESENCA_MT', 'NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC',
                        'NU_NOTA_MT', 'NU_NOTA_REDACAO', 'Q005', 'Q006', 'Q025']
 
-ufs_brasil = ["AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", 
-              "MA", "MT", "MS", "MG", "PA", "PB", "PR", "PE", "PI", 
+ufs_brasil = ["AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO",
+              "MA", "MT", "MS", "MG", "PA", "PB", "PR", "PE", "PI",
               "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO"]
 
-columns_entries = [list(range(2019, 2023)), [0, 1, 2, 3, 4, 5, 6], [0, 1], ufs_brasil, 
-                   [0, 1, 2], [0, 1, 2], [0, 1, 2], [0, 1, 2], (0.0, 1000.0), (0.0, 1000.0), 
-                   (0.0, 1000.0), (0.0, 1000.0), (0.0, 1000.0), list(range(1, 21)), 
+columns_entries = [list(range(2019, 2023)), [0, 1, 2, 3, 4, 5, 6], [0, 1], ufs_brasil,
+                   [0, 1, 2], [0, 1, 2], [0, 1, 2], [0, 1, 2], (0.0, 1000.0), (0.0, 1000.0),
+                   (0.0, 1000.0), (0.0, 1000.0), (0.0, 1000.0), list(range(1, 21)),
                    ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'Q'], ['A', 'B']]
 
 # Crie um dicionário combinando as duas listas
@@ -46,7 +450,61 @@ rows_to_remove = {
     'TP_PRESENCA_MT': [0, 2]
 }
 
-# Lê os DataFrames a partir dos arquivos CSV e aplica operações de filtragem
-for year in range(2019, 2023):
-    df = pd.read_csv(fr"filter\DADOS\MICRODADOS_ENEM_{str(year)}.csv", encoding='unicode_escape', engine='python', sep=';')
-    filtragem(df, str(year), rows_to_remove, check_entries_dict)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Filtra os microdados do ENEM de 2019 a 2022.')
+    parser.add_argument('--memoria', type=int, default=ORCAMENTO_MEMORIA_TOTAL // 1024 ** 2,
+                        help='memória disponível para a filtragem de todos os anos juntos, em MB')
+    parser.add_argument('--trabalhadores', type=int, default=None,
+                        help='número máximo de anos filtrados ao mesmo tempo (padrão: núcleos da máquina)')
+    parser.add_argument('--processos-por-ano', type=int, default=1,
+                        help='processos que leem e filtram o CSV de um mesmo ano em paralelo (só para CSVs soltos)')
+    parser.add_argument('--politica', choices=filter.POLITICAS, default='falhar',
+                        help="linhas com entradas inválidas: 'falhar', 'descartar' ou 'quarentena' (grava <ano>_quarentena.csv)")
+    parser.add_argument('--motor', choices=ingestao.MOTORES, default='c', help='parser dos CSVs')
+    parser.add_argument('--formato', choices=['parquet', 'csv'], default='parquet',
+                        help=f"'parquet' grava o dataset particionado em {armazenamento.RAIZ_DATASET}/, 'csv' grava <ano>_filtrado.csv")
+    parser.add_argument('--cubo-regras', action='store_true',
+                        help='grava também o cubo com as colunas das regras de remoção como dimensões (veja cubo.aplicar_regras)')
+    parser.add_argument('--refazer', action='store_true',
+                        help=f'filtra todos os anos, mesmo os que {manifesto.CAMINHO_MANIFESTO} indica estarem atualizados')
+    args = parser.parse_args()
+
+    # Lê os microdados direto dos ZIPs baixados por download_module.py e aplica operações de filtragem
+    fontes = {}
+    for year in range(2019, 2023):
+        fonte = os.path.join('filter', f'microdados_enem_{year}.zip')
+        if not os.path.exists(fonte):
+            fonte = os.path.join('filter', 'DADOS', f'MICRODADOS_ENEM_{year}.csv')
+        fontes[year] = fonte
+
+    # Sem o manifesto, todos os anos são considerados desatualizados
+    if args.refazer and os.path.exists(manifesto.CAMINHO_MANIFESTO):
+        os.remove(manifesto.CAMINHO_MANIFESTO)
+
+    resultados = filtrar_anos(fontes, rows_to_remove, check_entries_dict, args.trabalhadores,
+                              args.memoria * 1024 ** 2, manifesto.CAMINHO_MANIFESTO, motor=args.motor,
+                              formato=args.formato, processos=args.processos_por_ano, politica=args.politica,
+                              cubo_regras=args.cubo_regras)
+    for year, resultado in resultados.items():
+        if resultado['status'] == 'ok':
+            print(f"{year}: {resultado['linhas']} linhas em {resultado['segundos']:.1f} s")
+        elif resultado['status'] == 'atualizado':
+            print(f"{year}: atualizado, {resultado['linhas']} linhas")
+        else:
+            print(f"{year}: falhou - {resultado['erro']}")
+
+    # Cache binário por coluna, para que os scripts de visualização carreguem os anos instantaneamente
+    if args.formato == 'parquet':
+        # Anos atualizados só são refeitos se o cache deles não chegou a ser construído
+        anos_cache = []
+        for year, resultado in resultados.items():
+            if resultado['status'] == 'ok':
+                anos_cache.append(year)
+            elif resultado['status'] == 'atualizado' and not os.path.exists(os.path.join(cache_colunar.RAIZ_CACHE, str(year), 'metadados.json')):
+                anos_cache.append(year)
+        cache_colunar.construir_cache_do_dataset(anos_cache)
+
+        # Anos atualizados filtrados antes de existir o cubo o ganham a partir do dataset já gravado
+        anos_sem_cubo = [year for year, resultado in resultados.items()
+                         if resultado['status'] == 'atualizado' and not cubo.existe(armazenamento.RAIZ_DATASET, str(year))]
+        cubo.construir_cubo_do_dataset(anos=anos_sem_cubo)
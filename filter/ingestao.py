@@ -0,0 +1,172 @@
+import io
+import os
+import pandas as pd
+import esquema
+
+# Os microdados do INEP são separados por ';' e codificados em Latin-1 (ISO-8859-1)
+SEPARADOR_MICRODADOS = ';'
+ENCODING_MICRODADOS = 'latin-1'
+
+# Os arquivos <ano>_filtrado.csv são gravados pelo pandas: separados por ',' e em UTF-8
+SEPARADOR_FILTRADO = ','
+ENCODING_FILTRADO = 'utf-8'
+
+MOTORES = ('c', 'pyarrow')
+
+# Tipo de cada coluna usada pelo projeto. As notas e a Q005 podem estar ausentes,
+# por isso são float e inteiro anulável
+TIPOS_COLUNAS = {
+    'NU_ANO': 'int64',
+    'TP_COR_RACA': 'int64',
+    'IN_TREINEIRO': 'int64',
+    'SG_UF_PROVA': 'str',
+    'TP_PRESENCA_CN': 'int64',
+    'TP_PRESENCA_CH': 'int64',
+    'TP_PRESENCA_LC': 'int64',
+    'TP_PRESENCA_MT': 'int64',
+    'NU_NOTA_CN': 'float64',
+    'NU_NOTA_CH': 'float64',
+    'NU_NOTA_LC': 'float64',
+    'NU_NOTA_MT': 'float64',
+    'NU_NOTA_REDACAO': 'float64',
+    'Q005': 'Int64',
+    'Q006': 'str',
+    'Q025': 'str',
+}
+
+def ler_csv(fonte, colunas=None, motor='c', sep=SEPARADOR_MICRODADOS, encoding=ENCODING_MICRODADOS,
+            tipos=None, tamanho_bloco=None):
+    """
+    Lê um CSV do projeto com o parser C ou o pyarrow, com tipos explícitos por coluna.
+
+    Parameters
+    ----------
+    fonte : str or file object
+        Caminho do CSV ou fluxo binário com o seu conteúdo.
+    colunas : list, optional
+        Colunas a ler. Se omitido, lê todas.
+    motor : {'c', 'pyarrow'}
+        Parser usado pelo pandas.
+    sep : str
+        Separador de campos.
+    encoding : str
+        Codificação do arquivo.
+    tipos : dict, optional
+        Tipo de cada coluna. Se omitido, usa `TIPOS_COLUNAS`; colunas fora dele são inferidas.
+    tamanho_bloco : int, optional
+        Se dado, retorna um iterador de DataFrames com até `tamanho_bloco` linhas.
+
+    Returns
+    -------
+    pd.DataFrame or iterator of pd.DataFrame
+        Os dados lidos.
+
+    Raises
+    ------
+    ValueError
+        Se o motor não for um dos de `MOTORES`.
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor de leitura inválido: '{motor}'. Use um de {MOTORES}.")
+
+    tipos = TIPOS_COLUNAS if tipos is None else tipos
+    if colunas is not None:
+        tipos = {coluna: tipo for coluna, tipo in tipos.items() if coluna in colunas}
+
+    if motor == 'pyarrow' and tamanho_bloco is not None:
+        return _ler_blocos_pyarrow(fonte, colunas, sep, encoding, tipos, tamanho_bloco)
+
+    return pd.read_csv(fonte, sep=sep, encoding=encoding, engine=motor, usecols=colunas,
+                       dtype=tipos, chunksize=tamanho_bloco)
+
+def _ler_blocos_pyarrow(fonte, colunas, sep, encoding, tipos, tamanho_bloco):
+    # O pandas não aceita chunksize com engine='pyarrow'; o leitor em fluxo do
+    # pyarrow lê blocos de bytes, que são reagrupados em blocos de linhas
+    import pyarrow as pa
+    from pyarrow import csv
+
+    tipos_arrow = {'int64': pa.int64(), 'Int64': pa.int64(), 'float64': pa.float64(), 'str': pa.string()}
+    opcoes_leitura = csv.ReadOptions(encoding=encoding)
+    opcoes_formato = csv.ParseOptions(delimiter=sep)
+    opcoes_conversao = csv.ConvertOptions(include_columns=colunas or [],
+                                          column_types={coluna: tipos_arrow[tipo] for coluna, tipo in tipos.items()})
+    leitor = csv.open_csv(fonte, read_options=opcoes_leitura, parse_options=opcoes_formato,
+                          convert_options=opcoes_conversao)
+
+    # Como no parser C, o índice de cada bloco continua o do anterior: é a posição da linha no arquivo
+    acumulados = []
+    linhas = 0
+    anteriores = 0
+    for lote in leitor:
+        acumulados.append(lote.to_pandas())
+        linhas += lote.num_rows
+        while linhas >= tamanho_bloco:
+            df = pd.concat(acumulados, ignore_index=True)
+            bloco = df.iloc[:tamanho_bloco].astype(tipos)
+            bloco.index = pd.RangeIndex(anteriores, anteriores + tamanho_bloco)
+            yield bloco
+            acumulados = [df.iloc[tamanho_bloco:]]
+            linhas -= tamanho_bloco
+            anteriores += tamanho_bloco
+    if linhas > 0:
+        bloco = pd.concat(acumulados, ignore_index=True).astype(tipos)
+        bloco.index = pd.RangeIndex(anteriores, anteriores + linhas)
+        yield bloco
+
+def ler_microdados(fonte, colunas=None, motor='c', tamanho_bloco=None):
+    """
+    Lê um arquivo MICRODADOS_ENEM_<ano>.csv do INEP. Veja `ler_csv`.
+    """
+    return ler_csv(fonte, colunas, motor, SEPARADOR_MICRODADOS, ENCODING_MICRODADOS, tamanho_bloco=tamanho_bloco)
+
+def intervalos_de_linhas(caminho, tamanho_intervalo):
+    """
+    Divide o CSV em `caminho` em intervalos de bytes de cerca de `tamanho_intervalo`, cada um começando e terminando numa quebra de linha.
+
+    Os microdados não têm quebras de linha dentro dos campos, então cada intervalo pode ser
+    interpretado sozinho, bastando acrescentar o cabeçalho antes dele.
+
+    Parameters
+    ----------
+    caminho : str
+        Caminho do CSV. Precisa ser um arquivo comum, pois é lido fora de ordem.
+    tamanho_intervalo : int
+        Tamanho aproximado de cada intervalo, em bytes.
+
+    Returns
+    -------
+    tuple
+        A linha de cabeçalho, em bytes, e a lista de intervalos `(inicio, fim)`, em ordem e sem sobreposição.
+    """
+    tamanho_arquivo = os.path.getsize(caminho)
+    with open(caminho, 'rb') as file:
+        cabecalho = file.readline()
+        limites = [file.tell()]
+        while limites[-1] < tamanho_arquivo:
+            proximo = limites[-1] + max(1, tamanho_intervalo)
+            if proximo >= tamanho_arquivo:
+                limites.append(tamanho_arquivo)
+                break
+            # Começa um byte antes para não pular a linha que começa exatamente em `proximo`
+            file.seek(proximo - 1)
+            file.readline()
+            limites.append(file.tell())
+    return cabecalho, list(zip(limites[:-1], limites[1:]))
+
+def ler_intervalo(caminho, cabecalho, inicio, fim, colunas=None, motor='c'):
+    """
+    Lê as linhas de microdados entre os bytes `inicio` e `fim` de `caminho`, como devolvidos por `intervalos_de_linhas`.
+    """
+    with open(caminho, 'rb') as file:
+        file.seek(inicio)
+        dados = file.read(fim - inicio)
+    return ler_microdados(io.BytesIO(cabecalho + dados), colunas, motor)
+
+def ler_filtrado(caminho, colunas=None, motor='c', compacto=True):
+    """
+    Lê um arquivo <ano>_filtrado.csv gravado por `filter_main.filtragem`. Veja `ler_csv`.
+
+    Com `compacto=True`, as colunas são convertidas para os tipos de `esquema.ESQUEMA`.
+    """
+    df = ler_csv(caminho, colunas, motor, SEPARADOR_FILTRADO, ENCODING_FILTRADO)
+    return esquema.aplicar_esquema(df) if compacto else df
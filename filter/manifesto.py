@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+
+# Arquivo padrão do manifesto, ao lado das saídas da filtragem
+CAMINHO_MANIFESTO = 'manifesto_filtragem.json'
+
+# Quantos bytes do início, do meio e do fim do arquivo de origem entram na impressão digital
+TAMANHO_AMOSTRA = 1024 ** 2
+
+def impressao_fonte(caminho, tamanho_amostra=TAMANHO_AMOSTRA):
+    """
+    Calcula uma impressão digital barata de um arquivo de microdados: o tamanho e o SHA-256 de três trechos dele.
+
+    Ler os gigabytes inteiros a cada execução custaria quase tanto quanto filtrar. Um ZIP baixado
+    de novo com o mesmo conteúdo mantém a impressão, mesmo com outra data de modificação.
+    """
+    tamanho = os.path.getsize(caminho)
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as file:
+        for inicio in sorted({0, max(0, tamanho // 2 - tamanho_amostra // 2), max(0, tamanho - tamanho_amostra)}):
+            file.seek(inicio)
+            resumo.update(file.read(tamanho_amostra))
+    return f'{tamanho}:{resumo.hexdigest()}'
+
+def impressao_regras(*regras):
+    """
+    Calcula o SHA-256 da representação das regras de filtragem (dicionários, formato de saída, ...).
+
+    A ordem das chaves conta, pois a ordem de `check_entries_dict` é a ordem das colunas da saída,
+    e listas e tuplas são diferenciadas, como em `filter.checa_entradas`.
+
+    Examples
+    --------
+    >>> impressao_regras({'IN_TREINEIRO': 1}) == impressao_regras({'IN_TREINEIRO': 1})
+    True
+    >>> impressao_regras({'NOTA': (0.0, 1000.0)}) == impressao_regras({'NOTA': [0.0, 1000.0]})
+    False
+    """
+    return hashlib.sha256(repr(regras).encode()).hexdigest()
+
+class Manifesto:
+    """
+    Registra, para cada ano já filtrado, a impressão digital da fonte e das regras usadas.
+
+    O manifesto é um arquivo JSON reescrito atomicamente a cada ano concluído. Um ano só é
+    registrado depois que a saída dele foi gravada por inteiro, então uma execução interrompida
+    recomeça pelos anos que ficaram sem registro.
+    """
+
+    def __init__(self, caminho=CAMINHO_MANIFESTO):
+        self.caminho = caminho
+        self.anos = {}
+        if os.path.exists(caminho):
+            with open(caminho) as file:
+                self.anos = {int(ano): entrada for ano, entrada in json.load(file).items()}
+
+    def atualizado(self, ano, fonte, regras):
+        """
+        Diz se o registro de `ano` tem as impressões `fonte` (de `impressao_fonte`) e `regras` (de `impressao_regras`).
+        """
+        entrada = self.anos.get(ano)
+        return entrada is not None and (entrada['fonte'], entrada['regras']) == (fonte, regras)
+
+    def registrar(self, ano, fonte, regras, **informacoes):
+        """
+        Registra `ano` como filtrado com as impressões `fonte` e `regras`. `informacoes` são guardadas junto.
+        """
+        self.anos[ano] = {'fonte': fonte, 'regras': regras, **informacoes}
+        self._gravar()
+
+    def invalidar(self, ano):
+        """
+        Remove o registro de `ano`, antes de a saída dele começar a ser reescrita.
+        """
+        if self.anos.pop(ano, None) is not None:
+            self._gravar()
+
+    def _gravar(self):
+        caminho_temporario = self.caminho + '.tmp'
+        with open(caminho_temporario, 'w') as file:
+            json.dump({str(ano): entrada for ano, entrada in sorted(self.anos.items())}, file, indent=2)
+        os.replace(caminho_temporario, self.caminho)
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import armazenamento
+import cache_colunar
+import dados_sinteticos
+import esquema
+import filter_main
+from filter_main import derivadas
+
+class TestArmazenamento(unittest.TestCase):
+
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        colunas = [coluna for coluna in esquema.ESQUEMA if not coluna.startswith(('IN_', 'TP_PRESENCA'))]
+        self.df = pd.concat([esquema.aplicar_esquema(dados_sinteticos.gerar_microdados(300, ano, semente=ano)[colunas])
+                             for ano in (2019, 2020)], ignore_index=True)
+        armazenamento.escrever_dataset(self.df, self.raiz, 'teste')
+
+    def tearDown(self):
+        shutil.rmtree(self.raiz)
+
+    def ordenar(self, df):
+        return df.sort_values(['NU_ANO', 'SG_UF_PROVA', 'NU_NOTA_REDACAO', 'NU_NOTA_MT'], ignore_index=True)
+
+    def test_ida_e_volta(self):
+        lido = armazenamento.ler_dataset(self.raiz)
+        self.assertEqual(list(lido.columns), list(self.df.columns))
+        pd.testing.assert_frame_equal(self.ordenar(lido), self.ordenar(self.df))
+
+    def test_le_so_as_particoes_pedidas(self):
+        dataset = armazenamento.abrir_dataset(self.raiz)
+        filtro = armazenamento.ds.field('SG_UF_PROVA') == 'SP'
+        arquivos = [fragmento.path for fragmento in dataset.get_fragments(filter=filtro)]
+        self.assertEqual(len(arquivos), 2)
+        self.assertTrue(all('SG_UF_PROVA=SP' in arquivo for arquivo in arquivos))
+
+        lido = armazenamento.ler_dataset(self.raiz, colunas=['NU_ANO', 'NU_NOTA_MT'], anos=[2020], ufs=['sp'])
+        esperado = self.df[(self.df['NU_ANO'] == 2020) & (self.df['SG_UF_PROVA'] == 'SP')]
+        self.assertEqual(list(lido.columns), ['NU_ANO', 'NU_NOTA_MT'])
+        self.assertEqual(sorted(lido['NU_NOTA_MT'].dropna()), sorted(esperado['NU_NOTA_MT'].dropna()))
+
+    def test_filtro_de_notas(self):
+        resultado = armazenamento.ler_dataset(self.raiz, notas={'NU_NOTA_MT': (600, None), 'NU_NOTA_CN': (None, 500)})
+        esperado = self.df[(self.df['NU_NOTA_MT'] >= 600) & (self.df['NU_NOTA_CN'] <= 500)]
+        self.assertEqual(len(resultado), len(esperado))
+        self.assertGreater(len(resultado), 0)
+
+    def test_apagar_partes(self):
+        armazenamento.apagar_partes(self.raiz, 'teste')
+        restantes = [arquivo for _, _, arquivos in os.walk(self.raiz) for arquivo in arquivos]
+        self.assertEqual(restantes, [])
+
+    def test_versoes_das_derivadas(self):
+        raiz = os.path.join(self.raiz, 'derivadas')
+        derivado = esquema.aplicar_esquema(derivadas.adicionar_derivadas(self.df[self.df['NU_ANO'] == 2019]))
+        self.assertEqual(derivado.attrs['versoes_derivadas'], derivadas.VERSOES)
+        armazenamento.escrever_dataset(derivado, raiz, '2019')
+        armazenamento.gravar_versoes(derivado.attrs['versoes_derivadas'], raiz, '2019')
+        lido = armazenamento.ler_dataset(raiz, colunas=['NU_ANO', 'media'])
+        self.assertEqual(lido.attrs['versoes_derivadas'], {'media': derivadas.VERSOES['media']})
+
+        cache = os.path.join(self.raiz, 'cache')
+        cache_colunar.construir_cache_do_dataset([2019], raiz, cache)
+        self.assertEqual(cache_colunar.carregar_ano(2019, cache).attrs['versoes_derivadas'], derivadas.VERSOES)
+
+        # Um ano filtrado com outra versão da média invalida a coluna para o dataset inteiro
+        armazenamento.gravar_versoes({**derivadas.VERSOES, 'media': 0}, raiz, '2020')
+        self.assertNotIn('media', armazenamento.ler_versoes(raiz))
+
+if __name__ == '__main__':
+    unittest.main()
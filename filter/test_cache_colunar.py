@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import cache_colunar
+import dados_sinteticos
+import esquema
+
+def vem_de_memmap(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return False
+
+class TestCacheColunar(unittest.TestCase):
+
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        colunas = [coluna for coluna in esquema.ESQUEMA if not coluna.startswith(('IN_', 'TP_PRESENCA'))]
+        df = dados_sinteticos.gerar_microdados(1000, 2020)[colunas]
+        df['Q005'] = df['Q005'].astype('Int64')
+        df.loc[3, 'Q005'] = None
+        self.df = esquema.aplicar_esquema(df)
+        cache_colunar.construir_cache(self.df, 2020, self.raiz)
+
+    def tearDown(self):
+        shutil.rmtree(self.raiz)
+
+    def test_ida_e_volta(self):
+        carregado = cache_colunar.carregar_ano(2020, self.raiz)
+        pd.testing.assert_frame_equal(carregado, self.df)
+        self.assertTrue(pd.isna(carregado.loc[3, 'Q005']))
+
+    def test_sem_copia(self):
+        carregado = cache_colunar.carregar_ano(2020, self.raiz, ['NU_NOTA_MT', 'SG_UF_PROVA', 'Q005'])
+        self.assertTrue(vem_de_memmap(carregado['NU_NOTA_MT'].to_numpy()))
+        self.assertTrue(vem_de_memmap(carregado['SG_UF_PROVA'].array.codes))
+        self.assertTrue(vem_de_memmap(carregado['Q005'].array._data))
+
+    def test_ano_fora_do_cache(self):
+        with self.assertRaises(FileNotFoundError):
+            cache_colunar.carregar_ano(2019, self.raiz)
+        with self.assertRaises(KeyError):
+            cache_colunar.carregar_ano(2020, self.raiz, ['NU_INSCRICAO'])
+
+    def test_reconstrucao_interrompida_mantem_o_anterior(self):
+        com_objeto = self.df.assign(NU_NOTA_MT=self.df['NU_NOTA_MT'] / 2, Q025=self.df['Q025'].astype(object))
+        with self.assertRaises(TypeError):
+            cache_colunar.construir_cache(com_objeto, 2020, self.raiz)
+        pd.testing.assert_frame_equal(cache_colunar.carregar_ano(2020, self.raiz), self.df)
+        self.assertEqual(os.listdir(self.raiz), ['2020'])
+
+        cache_colunar.construir_cache(self.df.iloc[:10], 2020, self.raiz)
+        pd.testing.assert_frame_equal(cache_colunar.carregar_ano(2020, self.raiz), self.df.iloc[:10])
+        self.assertEqual(os.listdir(self.raiz), ['2020'])
+
+    def test_consulta_pelos_mapas_de_zona(self):
+        cache_colunar.construir_cache(self.df, 2021, self.raiz, linhas_por_zona=64)
+        for notas in [{'NU_NOTA_MT': (700, None)}, {'NU_NOTA_REDACAO': (1000, 1000)},
+                      {'NU_NOTA_CN': (None, 400), 'NU_NOTA_CH': (500, 600)}]:
+            mascara = np.ones(len(self.df), dtype=bool)
+            for coluna, (minimo, maximo) in notas.items():
+                mascara &= (self.df[coluna] >= (minimo if minimo is not None else -np.inf)).to_numpy()
+                mascara &= (self.df[coluna] <= (maximo if maximo is not None else np.inf)).to_numpy()
+            resultado = cache_colunar.consultar(2021, notas, self.raiz, ['SG_UF_PROVA', 'NU_NOTA_MT'])
+            pd.testing.assert_frame_equal(resultado, self.df.loc[mascara, ['SG_UF_PROVA', 'NU_NOTA_MT']])
+
+        # Com as notas agrupadas, uma nota alta só alcança os últimos blocos
+        cache_colunar.construir_cache(self.df, 2022, self.raiz, ordenar_por='NU_NOTA_MT', linhas_por_zona=64)
+        metadados = cache_colunar.ler_metadados(2022, self.raiz)
+        candidatos = cache_colunar.blocos_candidatos(metadados, {'NU_NOTA_MT': (700, None)})
+        self.assertLessEqual(candidatos.sum(), -(-(self.df['NU_NOTA_MT'] >= 700).sum() // 64) + 1)
+        self.assertEqual(metadados['zonas']['NU_NOTA_MT']['nulos'][-1], 64 if len(self.df) % 64 == 0 else len(self.df) % 64)
+
+if __name__ == '__main__':
+    unittest.main()
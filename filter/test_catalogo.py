@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import armazenamento
+import catalogo
+import dados_sinteticos
+import esquema
+
+class TestCatalogo(unittest.TestCase):
+
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        colunas = [coluna for coluna in esquema.ESQUEMA if not coluna.startswith(('IN_', 'TP_PRESENCA'))]
+        self.df = pd.concat([esquema.aplicar_esquema(dados_sinteticos.gerar_microdados(400, ano, semente=ano)[colunas])
+                             for ano in (2019, 2020)], ignore_index=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.raiz)
+
+    def test_resumo_por_particao(self):
+        particoes = catalogo.resumir(self.df)
+        sp = self.df[(self.df['NU_ANO'] == 2019) & (self.df['SG_UF_PROVA'] == 'SP')]
+        resumo = particoes[2019]['SP']
+        self.assertEqual(resumo['linhas'], len(sp))
+        self.assertEqual(resumo['colunas']['SG_UF_PROVA']['distintos'], ['SP'])
+        self.assertEqual(resumo['colunas']['NU_NOTA_MT']['nulos'], int(sp['NU_NOTA_MT'].isna().sum()))
+        self.assertEqual(resumo['colunas']['NU_NOTA_MT']['max'], float(str(sp['NU_NOTA_MT'].max())))
+        self.assertIsNone(resumo['colunas']['NU_NOTA_MT']['distintos'])
+
+        # Resumir em blocos e combinar dá o mesmo que resumir tudo de uma vez
+        metade = len(self.df) // 2
+        em_blocos = catalogo.combinar(catalogo.resumir(self.df.iloc[:metade]), catalogo.resumir(self.df.iloc[metade:]))
+        self.assertEqual(em_blocos, particoes)
+
+    def test_catalogo_do_dataset(self):
+        armazenamento.escrever_dataset(self.df, self.raiz, 'teste')
+        catalogo.construir_catalogo_do_dataset(self.raiz)
+        resultado = catalogo.carregar_catalogo(self.raiz)
+        self.assertEqual(resultado['linhas'], len(self.df))
+        self.assertEqual(resultado['colunas']['NU_ANO']['distintos'], [2019, 2020])
+        self.assertEqual(set(resultado['colunas']['SG_UF_PROVA']['distintos']), set(self.df['SG_UF_PROVA']))
+        self.assertEqual(sorted(resultado['particoes']), [2019, 2020])
+
+        # Os arquivos do catálogo não atrapalham a leitura do dataset
+        self.assertEqual(len(armazenamento.ler_dataset(self.raiz)), len(self.df))
+
+    def test_sem_catalogo(self):
+        with self.assertRaises(FileNotFoundError):
+            catalogo.carregar_catalogo(os.path.join(self.raiz, 'vazio'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import armazenamento
+import cubo
+import dados_sinteticos
+import filter
+import esquema
+
+class TestCubo(unittest.TestCase):
+
+    def setUp(self):
+        self.raiz = tempfile.mkdtemp()
+        colunas = [coluna for coluna in esquema.ESQUEMA if not coluna.startswith(('IN_', 'TP_PRESENCA'))]
+        self.df = pd.concat([esquema.aplicar_esquema(dados_sinteticos.gerar_microdados(2000, ano, semente=ano)[colunas])
+                             for ano in (2019, 2020)], ignore_index=True)
+        # Alguns participantes sem a Q005, que formam células próprias
+        self.df.loc[::97, 'Q005'] = pd.NA
+
+    def tearDown(self):
+        shutil.rmtree(self.raiz)
+
+    def test_medidas_das_celulas(self):
+        resultado = cubo.construir_cubo(self.df)
+        self.assertEqual(resultado['linhas'].sum(), len(self.df))
+        self.assertEqual(resultado.loc[resultado['Q005'].isna(), 'linhas'].sum(), self.df['Q005'].isna().sum())
+        self.assertEqual(resultado['n_redacao_1000'].sum(), (self.df['NU_NOTA_REDACAO'] == 1000).sum())
+
+        notas = self.df[cubo.NOTAS].astype('float64')
+        for coluna, valores in notas.assign(media=notas.mean(axis=1)).items():
+            self.assertEqual(resultado[f'n_{coluna}'].sum(), valores.notna().sum())
+            self.assertAlmostEqual(resultado[f'soma_{coluna}'].sum(), valores.sum(), delta=1e-6 * valores.abs().sum())
+            self.assertAlmostEqual(resultado[f'soma2_{coluna}'].sum(), (valores ** 2).sum(), delta=1e-6 * (valores ** 2).sum())
+
+        celula = resultado.iloc[0]
+        linhas = self.df[np.logical_and.reduce([(self.df[dimensao] == celula[dimensao]).fillna(False).to_numpy()
+                                                for dimensao in cubo.DIMENSOES])]
+        self.assertEqual(celula['linhas'], len(linhas))
+        self.assertAlmostEqual(celula['soma_NU_NOTA_MT'], linhas['NU_NOTA_MT'].astype('float64').sum(), places=6)
+
+    def test_aplicar_regras(self):
+        df = esquema.aplicar_esquema(dados_sinteticos.gerar_microdados(3000)[list(esquema.ESQUEMA)])
+        cubo_regras = cubo.construir_cubo(df, cubo.DIMENSOES + cubo.DIMENSOES_REGRAS)
+        for regras in [{'IN_TREINEIRO': 1}, {'TP_PRESENCA_CN': [0, 2], 'TP_PRESENCA_MT': [0, 2]}, {}]:
+            esperado = cubo.construir_cubo(filter.remover_linhas(df, regras))
+            resultado = cubo.aplicar_regras(cubo_regras, regras)
+            pd.testing.assert_frame_equal(resultado[cubo.DIMENSOES], esperado[cubo.DIMENSOES])
+            pd.testing.assert_frame_equal(resultado[cubo.COLUNAS_MEDIDAS], esperado[cubo.COLUNAS_MEDIDAS])
+        with self.assertRaises(ValueError):
+            cubo.aplicar_regras(cubo_regras, {'Q025': 'A'})
+
+    def test_combinar_blocos(self):
+        inteiro = cubo.construir_cubo(self.df)
+        blocos = [cubo.construir_cubo(self.df.iloc[inicio:inicio + 700]) for inicio in range(0, len(self.df), 700)]
+        combinado = cubo.combinar(blocos)
+        pd.testing.assert_frame_equal(combinado[cubo.DIMENSOES], inteiro[cubo.DIMENSOES])
+        pd.testing.assert_frame_equal(combinado[cubo.COLUNAS_MEDIDAS], inteiro[cubo.COLUNAS_MEDIDAS])
+
+    def test_cubo_do_dataset(self):
+        armazenamento.escrever_dataset(self.df, self.raiz, 'teste')
+        cubo.construir_cubo_do_dataset(self.raiz)
+        self.assertTrue(cubo.existe(self.raiz, '2019'))
+        carregado = cubo.carregar_cubo(self.raiz)
+        self.assertEqual(carregado['linhas'].sum(), len(self.df))
+        self.assertEqual(sorted(carregado['NU_ANO'].unique()), [2019, 2020])
+        # O cubo fica fora dos dados do dataset
+        self.assertEqual(len(armazenamento.ler_dataset(self.raiz)), len(self.df))
+
+    def test_sem_cubo(self):
+        with self.assertRaises(FileNotFoundError):
+            cubo.carregar_cubo(self.raiz)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import download_module
+
+CONTEUDO = bytes(range(256)) * 400
+
+
+class ServidorFalso(BaseHTTPRequestHandler):
+    # Servidor local que imita o do INEP; `aceita_range` e `falhas` são definidos por teste
+    aceita_range = True
+    falhas = 0
+    pedidos = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        intervalo = self.headers.get('Range')
+        if intervalo is None or not self.aceita_range:
+            ServidorFalso.pedidos.append(None)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(CONTEUDO)))
+            self.end_headers()
+            self.wfile.write(CONTEUDO)
+            return
+
+        inicio, fim = (int(valor) for valor in intervalo.split('=')[1].split('-'))
+        ServidorFalso.pedidos.append((inicio, fim))
+        corpo = CONTEUDO[inicio:fim + 1]
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes {inicio}-{fim}/{len(CONTEUDO)}')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+
+        if ServidorFalso.falhas > 0 and len(corpo) > 1:
+            # Derruba a conexão no meio do segmento
+            ServidorFalso.falhas -= 1
+            self.wfile.write(corpo[:len(corpo) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        self.wfile.write(corpo)
+
+
+class TestDownloadModule(unittest.TestCase):
+
+    def setUp(self):
+        ServidorFalso.aceita_range = True
+        ServidorFalso.falhas = 0
+        ServidorFalso.pedidos = []
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), ServidorFalso)
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.servidor.server_port}/microdados.zip'
+        self.diretorio = tempfile.mkdtemp()
+        self.destino = os.path.join(self.diretorio, 'microdados.zip')
+
+    def tearDown(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        shutil.rmtree(self.diretorio)
+
+    def ler_destino(self):
+        with open(self.destino, 'rb') as file:
+            return file.read()
+
+    def test_download_em_segmentos(self):
+        download_module.download_file(self.url, self.destino, segment_size=10000, max_connections=4)
+        self.assertEqual(self.ler_destino(), CONTEUDO)
+        self.assertFalse(os.path.exists(self.destino + '.journal'))
+        self.assertFalse(os.path.exists(self.destino + '.part'))
+        self.assertEqual(len([pedido for pedido in ServidorFalso.pedidos if pedido != (0, 0)]), 11)
+
+    def test_servidor_sem_range(self):
+        ServidorFalso.aceita_range = False
+        download_module.download_file(self.url, self.destino, segment_size=10000)
+        self.assertEqual(self.ler_destino(), CONTEUDO)
+
+    def test_retoma_pelo_journal(self):
+        # Simula uma execução interrompida em que os dois primeiros segmentos já estavam no disco
+        with open(self.destino + '.part', 'wb') as file:
+            file.write(CONTEUDO[:20000])
+            file.truncate(len(CONTEUDO))
+        with open(self.destino + '.journal', 'w') as file:
+            json.dump({'url': self.url, 'file_size': len(CONTEUDO), 'segment_size': 10000, 'done': [0, 1]}, file)
+
+        download_module.download_file(self.url, self.destino, segment_size=10000)
+        self.assertEqual(self.ler_destino(), CONTEUDO)
+        self.assertNotIn((0, 9999), ServidorFalso.pedidos)
+        self.assertNotIn((10000, 19999), ServidorFalso.pedidos)
+
+    def test_conexao_derrubada_retoma_o_segmento(self):
+        ServidorFalso.falhas = 1
+        download_module.download_file(self.url, self.destino, segment_size=len(CONTEUDO), max_connections=1)
+        self.assertEqual(self.ler_destino(), CONTEUDO)
+        # Um pedido de sondagem, o segmento interrompido e a retomada dele
+        self.assertEqual(len(ServidorFalso.pedidos), 3)
+        self.assertEqual(ServidorFalso.pedidos[2][1], len(CONTEUDO) - 1)
+
+    def test_varios_arquivos_ao_mesmo_tempo(self):
+        destinos = [os.path.join(self.diretorio, f'{ano}.zip') for ano in range(2019, 2023)]
+        download_module.download_files([(self.url, destino) for destino in destinos],
+                                       segment_size=30000, max_connections=3)
+        for destino in destinos:
+            with open(destino, 'rb') as file:
+                self.assertEqual(file.read(), CONTEUDO)
+
+
+if __name__ == '__main__':
+    unittest.main()
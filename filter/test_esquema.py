@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+import pandas as pd
+import dados_sinteticos
+import esquema
+import ingestao
+
+class TestEsquema(unittest.TestCase):
+
+    def setUp(self):
+        df = dados_sinteticos.gerar_microdados(2000)
+        self.df = df[list(esquema.ESQUEMA)].astype(ingestao.TIPOS_COLUNAS)
+
+    def test_tipos_compactos(self):
+        compacto = esquema.aplicar_esquema(self.df)
+        self.assertEqual(compacto['SG_UF_PROVA'].cat.codes.dtype, np.int8)
+        self.assertEqual(compacto['NU_NOTA_MT'].dtype, np.float32)
+        self.assertEqual(compacto['NU_ANO'].dtype, np.int16)
+        self.assertEqual(compacto['Q005'].dtype, 'UInt8')
+
+    def test_valores_preservados(self):
+        compacto = esquema.aplicar_esquema(self.df)
+        for coluna in ['NU_NOTA_CN', 'NU_NOTA_MT', 'NU_NOTA_REDACAO']:
+            np.testing.assert_array_equal(np.round(compacto[coluna].astype('float64'), 1), self.df[coluna])
+        self.assertEqual(compacto['SG_UF_PROVA'].astype(str).tolist(), self.df['SG_UF_PROVA'].tolist())
+        self.assertTrue(compacto['Q006'].notna().all())
+
+    def test_relatorio_memoria(self):
+        relatorio = esquema.relatorio_memoria(self.df)
+        self.assertLess(relatorio.loc['TOTAL', 'depois'], relatorio.loc['TOTAL', 'antes'] / 3)
+        self.assertEqual(relatorio.loc['TP_COR_RACA', 'depois'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
+import warnings
 import pandas as pd
 import filter
+import filter_main
+import ingestao
+import dados_sinteticos
 
 class TestFilter(unittest.TestCase):
 
@@ -27,5 +31,69 @@ class TestFilter(unittest.TestCase):
             filter.checa_entradas(df, entradas_validas)
         self.assertEqual(str(context.exception), "Entradas inválidas encontradas na coluna 'Coluna1': ['X', 'E']")
 
+    def test_plano_igual_as_funcoes(self):
+        df = dados_sinteticos.gerar_microdados(2000).astype(ingestao.TIPOS_COLUNAS)
+        df = df[list(filter_main.check_entries_dict)]
+        esperado = filter.remover_linhas(df, filter_main.rows_to_remove)
+        filter.checa_entradas(esperado, filter_main.check_entries_dict)
+        resultado = filter.PlanoFiltragem(filter_main.rows_to_remove, filter_main.check_entries_dict).aplicar(df)
+        pd.testing.assert_frame_equal(resultado, esperado)
+
+    def test_plano_mesmo_erro(self):
+        df = pd.DataFrame({'Remover': [0, 1, 0, 7, 0], 'Coluna1': ['A', 'X', 'Y', 'A', 'Z'],
+                           'Coluna2': [1.5, 2.0, None, 3.7, 999.9]})
+        entradas_validas = {'Coluna2': (0.0, 100.0), 'Coluna1': ['A', 'B']}
+        plano = filter.PlanoFiltragem({'Remover': [1, 7]}, entradas_validas)
+        with self.assertRaises(filter.InvalidEntryError) as context:
+            plano.aplicar(df)
+        self.assertEqual(str(context.exception), "Entradas inválidas encontradas na coluna 'Coluna2': [999.9]")
+
+        # A linha removida com 'X' não é verificada, como em remover_linhas + checa_entradas
+        with self.assertRaises(filter.InvalidEntryError) as context:
+            filter.PlanoFiltragem({'Remover': [1, 7]}, {'Coluna1': ['A', 'B']}).aplicar(df)
+        self.assertEqual(str(context.exception), "Entradas inválidas encontradas na coluna 'Coluna1': ['Y', 'Z']")
+
+        with self.assertRaises(ValueError):
+            filter.PlanoFiltragem({}, {'Coluna2': "InvalidRange"})
+
+    def test_plano_com_inteiro_anulavel(self):
+        df = pd.DataFrame({'Q005': pd.array([3, None, 1, 25, None, 2], dtype='Int64'),
+                           'Remover': pd.array([0, 1, None, 0, 0, 0], dtype='Int64')})
+        plano = filter.PlanoFiltragem({'Remover': [1]}, {'Q005': list(range(1, 21))})
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            validas, invalidas, relatorio = plano.separar(df)
+        # Os ausentes não são removidos nem inválidos, como com isin
+        self.assertEqual(validas.index.tolist(), [0, 2, 4, 5])
+        self.assertEqual(invalidas.index.tolist(), [3])
+        self.assertEqual(relatorio['Q005']['invalidas'], 1)
+
+    def test_relatorio_todas_as_colunas(self):
+        df = pd.DataFrame({'Coluna1': ['A', 'X', 'X', 'B', 'Y'], 'Coluna2': [1.5, 2.0, None, 999.9, 5.5],
+                           'Coluna3': [1, 2, 3, 4, 5]})
+        entradas_validas = {'Coluna1': ['A', 'B'], 'Coluna2': (0.0, 10.0), 'Coluna3': [1, 2, 3, 4, 5]}
+        relatorio = filter.relatorio_entradas(df, entradas_validas, amostra=2)
+        self.assertEqual(relatorio['Coluna1'], {'invalidas': 3, 'valores': {'X': 2, 'Y': 1}, 'amostra': [1, 2]})
+        self.assertEqual(relatorio['Coluna2'], {'invalidas': 1, 'valores': {999.9: 1}, 'amostra': [3]})
+        self.assertEqual(relatorio['Coluna3']['invalidas'], 0)
+
+        combinado = filter.combinar_relatorios(relatorio, relatorio, amostra=3)
+        self.assertEqual(combinado['Coluna1'], {'invalidas': 6, 'valores': {'X': 4, 'Y': 2}, 'amostra': [1, 2, 1]})
+
+        plano = filter.PlanoFiltragem({}, entradas_validas)
+        validas, rejeitadas, _ = plano.separar(df)
+        self.assertEqual(validas.index.tolist(), [0])
+        self.assertEqual(rejeitadas['COLUNAS_INVALIDAS'].tolist(), ['Coluna1', 'Coluna1', 'Coluna2', 'Coluna1'])
+        pd.testing.assert_frame_equal(plano.aplicar(df, politica='descartar'), validas)
+        with self.assertRaises(filter.InvalidEntryError) as context:
+            plano.aplicar(df)
+        self.assertEqual(context.exception.relatorio['Coluna2']['invalidas'], 1)
+
+    def test_mensagem_limitada(self):
+        df = pd.DataFrame({'Coluna1': ['X'] * 1000})
+        with self.assertRaises(filter.InvalidEntryError) as context:
+            filter.checa_entradas(df, {'Coluna1': ['A']})
+        self.assertTrue(str(context.exception).endswith(" e mais 980"))
+
 if __name__ == '__main__':
     unittest.main()
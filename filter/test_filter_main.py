@@ -0,0 +1,215 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import zipfile
+import pandas as pd
+import filter
+import filter_main
+import armazenamento
+import catalogo
+import cubo
+import esquema
+from filter_main import derivadas
+
+LINHAS = [
+    # NU_INSCRICAO;NU_ANO;TP_COR_RACA;IN_TREINEIRO;SG_UF_PROVA;TP_PRESENCA_CN;TP_PRESENCA_CH;TP_PRESENCA_LC;TP_PRESENCA_MT;
+    # NU_NOTA_CN;NU_NOTA_CH;NU_NOTA_LC;NU_NOTA_MT;NU_NOTA_REDACAO;Q005;Q006;Q025
+    "1;2019;1;0;SP;1;1;1;1;500.1;600.2;550.3;700.4;880;3;C;B",
+    "2;2019;2;1;RJ;1;1;1;1;400.0;410.0;420.0;430.0;440;2;B;A",
+    "3;2019;3;0;MG;0;0;0;0;;;;;;4;D;B",
+    "4;2019;0;0;BA;1;1;1;1;610.5;620.5;630.5;640.5;1000;5;A;A",
+    "5;2019;4;0;AM;1;1;1;1;350.0;360.0;370.0;380.0;400;1;Q;B",
+]
+CABECALHO = ("NU_INSCRICAO;NU_ANO;TP_COR_RACA;IN_TREINEIRO;SG_UF_PROVA;TP_PRESENCA_CN;TP_PRESENCA_CH;"
+             "TP_PRESENCA_LC;TP_PRESENCA_MT;NU_NOTA_CN;NU_NOTA_CH;NU_NOTA_LC;NU_NOTA_MT;NU_NOTA_REDACAO;Q005;Q006;Q025")
+
+
+class TestFilterMain(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.csv = os.path.join(self.diretorio, 'MICRODADOS_ENEM_2019.csv')
+        with open(self.csv, 'w', encoding='latin-1') as file:
+            file.write('\n'.join([CABECALHO] + LINHAS) + '\n')
+        self.zip = os.path.join(self.diretorio, 'microdados_enem_2019.zip')
+        with zipfile.ZipFile(self.zip, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            zip_ref.write(self.csv, 'DADOS/MICRODADOS_ENEM_2019.csv')
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio)
+
+    def filtrar(self, fonte, nome, **kwargs):
+        prefixo = os.path.join(self.diretorio, nome)
+        filter_main.filtragem(fonte, prefixo, filter_main.rows_to_remove, filter_main.check_entries_dict,
+                              formato='csv', **kwargs)
+        return pd.read_csv(f'{prefixo}_filtrado.csv')
+
+    def test_zip_em_blocos_igual_ao_dataframe(self):
+        df = pd.read_csv(self.csv, sep=';')
+        esperado = self.filtrar(df, 'dataframe')
+        resultado = self.filtrar(self.zip, 'zip', tamanho_bloco=2)
+        pd.testing.assert_frame_equal(resultado, esperado)
+        self.assertEqual(resultado['SG_UF_PROVA'].tolist(), ['SP', 'BA', 'AM'])
+        self.assertNotIn('IN_TREINEIRO', resultado.columns)
+
+    def test_zip_nao_e_extraido(self):
+        self.filtrar(self.zip, 'zip')
+        with zipfile.ZipFile(self.zip) as zip_ref:
+            self.assertEqual(zip_ref.namelist(), ['DADOS/MICRODADOS_ENEM_2019.csv'])
+        self.assertFalse(os.path.exists(os.path.join(self.diretorio, 'DADOS')))
+
+    def test_orcamento_de_memoria_define_o_bloco(self):
+        bytes_por_linha = filter_main.estimar_bytes_por_linha(self.zip, list(filter_main.check_entries_dict))
+        self.assertGreater(bytes_por_linha, 0)
+        tamanho = filter_main.linhas_por_bloco(3 * bytes_por_linha * filter_main.FATOR_PICO, bytes_por_linha)
+        self.assertEqual(tamanho, 3)
+
+        blocos = list(filter_main.ler_em_blocos(self.zip, ['NU_ANO', 'Q025'], orcamento_memoria=1))
+        self.assertEqual(len(blocos), len(LINHAS))
+        self.assertEqual(list(blocos[0].columns), ['NU_ANO', 'Q025'])
+
+    def test_orcamento_pequeno_mesmo_resultado(self):
+        esperado = self.filtrar(self.zip, 'grande')
+        resultado = self.filtrar(self.zip, 'pequeno', orcamento_memoria=1)
+        pd.testing.assert_frame_equal(resultado, esperado)
+
+    def test_saida_parquet_igual_ao_csv(self):
+        esperado = esquema.aplicar_esquema(self.filtrar(self.zip, 'csv'))
+        raiz = os.path.join(self.diretorio, 'enem_filtrado')
+        for _ in range(2):
+            # A segunda execução substitui a primeira em vez de duplicar as linhas
+            filter_main.filtragem(self.zip, '2019', filter_main.rows_to_remove, filter_main.check_entries_dict,
+                                  tamanho_bloco=2, raiz=raiz)
+        resultado = armazenamento.ler_dataset(raiz).sort_values('NU_NOTA_CN', ignore_index=True)
+        pd.testing.assert_frame_equal(resultado, esperado.sort_values('NU_NOTA_CN', ignore_index=True))
+        self.assertTrue(os.path.isdir(os.path.join(raiz, 'NU_ANO=2019', 'SG_UF_PROVA=SP')))
+        self.assertEqual(catalogo.carregar_catalogo(raiz)['particoes'][2019]['SP']['linhas'], 1)
+        self.assertEqual(cubo.carregar_cubo(raiz)['linhas'].sum(), len(esperado))
+        self.assertEqual(resultado.attrs['versoes_derivadas'], derivadas.VERSOES)
+
+    def test_cubo_com_regras(self):
+        raiz = os.path.join(self.diretorio, 'enem_filtrado')
+        filter_main.filtragem(self.zip, '2019', filter_main.rows_to_remove, filter_main.check_entries_dict,
+                              tamanho_bloco=2, raiz=raiz, cubo_regras=True)
+        cubo_regras = cubo.carregar_cubo(raiz, regras=True)
+        self.assertEqual(cubo_regras['linhas'].sum(), len(LINHAS))
+
+        # As regras da filtragem, aplicadas ao cubo, dão o cubo gravado com os dados filtrados
+        pd.testing.assert_frame_equal(cubo.aplicar_regras(cubo_regras, filter_main.rows_to_remove), cubo.carregar_cubo(raiz))
+        # Mantendo os treineiros, a linha do RJ volta
+        regras = {coluna: valores for coluna, valores in filter_main.rows_to_remove.items() if coluna != 'IN_TREINEIRO'}
+        com_treineiros = cubo.aplicar_regras(cubo_regras, regras)
+        self.assertEqual(sorted(com_treineiros['SG_UF_PROVA'].astype(str)), ['AM', 'BA', 'RJ', 'SP'])
+
+    def test_csv_solto(self):
+        resultado = self.filtrar(self.csv, 'csv', tamanho_bloco=1)
+        self.assertEqual(len(resultado), 3)
+
+    def test_csv_em_intervalos_paralelos(self):
+        esperado = self.filtrar(self.csv, 'sequencial')
+        resultado = self.filtrar(self.csv, 'paralelo', processos=2, orcamento_memoria=1)
+        pd.testing.assert_frame_equal(resultado, esperado)
+
+    def test_politicas_de_validacao(self):
+        csv = os.path.join(self.diretorio, 'MICRODADOS_ENEM_2021.csv')
+        invalidas = ["6;2019;1;0;XX;1;1;1;1;500;500;500;500;500;3;Z;B", "7;2019;1;0;SP;1;1;1;1;500;500;500;500;500;3;Z;B"]
+        with open(csv, 'w', encoding='latin-1') as file:
+            file.write('\n'.join([CABECALHO] + LINHAS + invalidas) + '\n')
+
+        with self.assertRaises(filter.InvalidEntryError):
+            self.filtrar(csv, 'falhar')
+
+        esperado = self.filtrar(self.csv, 'valido')
+        prefixo = os.path.join(self.diretorio, 'quarentena')
+        resultado = self.filtrar(csv, 'quarentena', politica='quarentena', tamanho_bloco=4)
+        pd.testing.assert_frame_equal(resultado, esperado)
+
+        quarentena = pd.read_csv(f'{prefixo}_quarentena.csv')
+        self.assertEqual(quarentena['COLUNAS_INVALIDAS'].tolist(), ['SG_UF_PROVA;Q006', 'Q006'])
+        with open(f'{prefixo}_validacao.json') as file:
+            relatorio = json.load(file)
+        self.assertEqual(relatorio['Q006']['invalidas'], 2)
+        self.assertEqual(relatorio['Q006']['valores'], {'Z': 2})
+        self.assertEqual(relatorio['SG_UF_PROVA']['amostra'], [5])
+        self.assertEqual(relatorio['NU_NOTA_CN']['invalidas'], 0)
+
+        # Em intervalos paralelos, as amostras continuam sendo as posições das linhas no arquivo
+        paralelo = os.path.join(self.diretorio, 'quarentena_paralela')
+        resultado = self.filtrar(csv, 'quarentena_paralela', politica='quarentena', processos=3, orcamento_memoria=1)
+        pd.testing.assert_frame_equal(resultado, esperado)
+        with open(f'{paralelo}_validacao.json') as file:
+            relatorio = json.load(file)
+        self.assertEqual(relatorio['SG_UF_PROVA']['amostra'], [5])
+        self.assertEqual(relatorio['Q006']['amostra'], [5, 6])
+
+        # Os blocos do pyarrow também são numerados pela posição no arquivo
+        pyarrow = os.path.join(self.diretorio, 'quarentena_pyarrow')
+        resultado = self.filtrar(csv, 'quarentena_pyarrow', politica='quarentena', tamanho_bloco=3, motor='pyarrow')
+        pd.testing.assert_frame_equal(resultado, esperado)
+        with open(f'{pyarrow}_validacao.json') as file:
+            relatorio = json.load(file)
+        self.assertEqual(relatorio['SG_UF_PROVA']['amostra'], [5])
+        self.assertEqual(relatorio['Q006']['amostra'], [5, 6])
+        pd.testing.assert_frame_equal(pd.read_csv(f'{pyarrow}_quarentena.csv'), quarentena)
+
+    def test_memoria_dividida_entre_anos_e_processos(self):
+        minimo = filter_main.ORCAMENTO_MINIMO
+        self.assertEqual(filter_main._dividir_memoria(4 * minimo, 8, 4), (4, minimo))
+        # Com 2 processos por ano, só cabem 2 anos de cada vez, e cada processo fica com o mínimo
+        trabalhadores, orcamento = filter_main._dividir_memoria(4 * minimo, 8, 4, processos=2)
+        self.assertEqual((trabalhadores, orcamento), (2, 2 * minimo))
+        self.assertLessEqual(trabalhadores * orcamento, 4 * minimo)
+        self.assertEqual(filter_main._dividir_memoria(minimo, 8, 4, processos=4), (1, minimo))
+
+    def test_anos_em_paralelo_isola_falhas(self):
+        csv_2020 = os.path.join(self.diretorio, 'MICRODADOS_ENEM_2020.csv')
+        with open(csv_2020, 'w', encoding='latin-1') as file:
+            file.write('\n'.join([CABECALHO] + [linha.replace(';2019;', ';2020;') for linha in LINHAS]) + '\n')
+        fontes = {2019: self.zip, 2020: csv_2020, 2021: os.path.join(self.diretorio, 'nao_existe.csv')}
+        raiz = os.path.join(self.diretorio, 'enem_filtrado')
+
+        resultados = filter_main.filtrar_anos(fontes, filter_main.rows_to_remove, filter_main.check_entries_dict,
+                                              trabalhadores=3, memoria_total=3 * filter_main.ORCAMENTO_MINIMO,
+                                              raiz=raiz)
+        self.assertEqual(list(resultados), [2019, 2020, 2021])
+        self.assertEqual([resultados[ano]['status'] for ano in resultados], ['ok', 'ok', 'erro'])
+        self.assertEqual(resultados[2019]['linhas'], 3)
+        self.assertIn('FileNotFoundError', resultados[2021]['erro'])
+
+        resultado = armazenamento.ler_dataset(raiz)
+        self.assertEqual(resultado.groupby('NU_ANO').size().to_dict(), {2019: 3, 2020: 3})
+
+
+    def test_execucao_incremental(self):
+        csv_2020 = os.path.join(self.diretorio, 'MICRODADOS_ENEM_2020.csv')
+        with open(csv_2020, 'w', encoding='latin-1') as file:
+            file.write('\n'.join([CABECALHO] + [linha.replace(';2019;', ';2020;') for linha in LINHAS]) + '\n')
+        fontes = {2019: self.zip, 2020: csv_2020}
+        raiz = os.path.join(self.diretorio, 'enem_filtrado')
+        caminho_manifesto = os.path.join(self.diretorio, 'manifesto.json')
+
+        def executar(remove_dict=filter_main.rows_to_remove):
+            resultados = filter_main.filtrar_anos(fontes, remove_dict, filter_main.check_entries_dict,
+                                                  trabalhadores=1, caminho_manifesto=caminho_manifesto, raiz=raiz)
+            return {ano: resultado['status'] for ano, resultado in resultados.items()}
+
+        self.assertEqual(executar(), {2019: 'ok', 2020: 'ok'})
+        self.assertEqual(executar(), {2019: 'atualizado', 2020: 'atualizado'})
+
+        # Uma fonte nova só refaz o ano dela
+        with open(csv_2020, 'a', encoding='latin-1') as file:
+            file.write(LINHAS[0].replace(';2019;', ';2020;') + '\n')
+        self.assertEqual(executar(), {2019: 'atualizado', 2020: 'ok'})
+        self.assertEqual(len(armazenamento.ler_dataset(raiz, anos=[2020])), 4)
+
+        # Uma execução interrompida antes de registrar 2019, ou cuja saída sumiu, refaz só 2019
+        armazenamento.apagar_partes(raiz, '2019')
+        self.assertEqual(executar(), {2019: 'ok', 2020: 'atualizado'})
+
+        # Regras diferentes refazem todos os anos
+        self.assertEqual(executar({'IN_TREINEIRO': 1}), {2019: 'ok', 2020: 'ok'})
+
+if __name__ == '__main__':
+    unittest.main()
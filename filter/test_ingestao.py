@@ -0,0 +1,57 @@
+import io
+import os
+import tempfile
+import unittest
+import pandas as pd
+import dados_sinteticos
+import ingestao
+
+class TestIngestao(unittest.TestCase):
+
+    def setUp(self):
+        df = dados_sinteticos.gerar_microdados(500, colunas_extras=2)
+        df['NO_MUNICIPIO_PROVA'] = 'São Paulo'
+        buffer = io.BytesIO()
+        df.to_csv(buffer, sep=';', index=False, encoding='latin-1')
+        self.conteudo = buffer.getvalue()
+
+    def test_motores_iguais(self):
+        colunas = list(ingestao.TIPOS_COLUNAS)
+        c = ingestao.ler_microdados(io.BytesIO(self.conteudo), colunas, motor='c')
+        arrow = ingestao.ler_microdados(io.BytesIO(self.conteudo), colunas, motor='pyarrow')
+        pd.testing.assert_frame_equal(c, arrow)
+        self.assertEqual(c['NU_NOTA_MT'].dtype, 'float64')
+        self.assertEqual(c['Q005'].dtype, 'Int64')
+
+    def test_blocos_pyarrow(self):
+        colunas = ['NU_ANO', 'SG_UF_PROVA', 'NU_NOTA_REDACAO']
+        blocos = list(ingestao.ler_microdados(io.BytesIO(self.conteudo), colunas, motor='pyarrow', tamanho_bloco=120))
+        self.assertEqual([len(bloco) for bloco in blocos], [120, 120, 120, 120, 20])
+        inteiro = ingestao.ler_microdados(io.BytesIO(self.conteudo), colunas)
+        pd.testing.assert_frame_equal(pd.concat(blocos, ignore_index=True), inteiro)
+
+    def test_encoding_latin1(self):
+        for motor in ingestao.MOTORES:
+            df = ingestao.ler_microdados(io.BytesIO(self.conteudo), ['NO_MUNICIPIO_PROVA'], motor=motor)
+            self.assertEqual(df['NO_MUNICIPIO_PROVA'].iloc[0], 'São Paulo')
+
+    def test_intervalos_de_linhas(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'MICRODADOS_ENEM_2019.csv')
+            with open(caminho, 'wb') as file:
+                file.write(self.conteudo)
+            colunas = list(ingestao.TIPOS_COLUNAS)
+            inteiro = ingestao.ler_microdados(caminho, colunas)
+            for tamanho in (1, 997, 10 ** 9):
+                cabecalho, intervalos = ingestao.intervalos_de_linhas(caminho, tamanho)
+                self.assertTrue(cabecalho.startswith(b'NU_INSCRICAO;'))
+                partes = [ingestao.ler_intervalo(caminho, cabecalho, inicio, fim, colunas) for inicio, fim in intervalos]
+                pd.testing.assert_frame_equal(pd.concat(partes, ignore_index=True), inteiro)
+            self.assertEqual(len(ingestao.intervalos_de_linhas(caminho, 1)[1]), 500)
+
+    def test_motor_invalido(self):
+        with self.assertRaises(ValueError):
+            ingestao.ler_microdados(io.BytesIO(self.conteudo), motor='python')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+import manifesto
+
+class TestManifesto(unittest.TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp()
+        self.fonte = os.path.join(self.diretorio, 'MICRODADOS_ENEM_2019.csv')
+        with open(self.fonte, 'wb') as file:
+            file.write(b'NU_ANO;SG_UF_PROVA\n' + b'2019;SP\n' * 1000)
+        self.caminho = os.path.join(self.diretorio, 'manifesto.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.diretorio)
+
+    def test_impressao_da_fonte(self):
+        impressao = manifesto.impressao_fonte(self.fonte, tamanho_amostra=64)
+        os.utime(self.fonte, (0, 0))
+        self.assertEqual(manifesto.impressao_fonte(self.fonte, tamanho_amostra=64), impressao)
+
+        # Mesmo tamanho, conteúdo diferente no meio do arquivo
+        with open(self.fonte, 'r+b') as file:
+            file.seek(os.path.getsize(self.fonte) // 2)
+            file.write(b'XX')
+        self.assertNotEqual(manifesto.impressao_fonte(self.fonte, tamanho_amostra=64), impressao)
+
+    def test_registro_persistido(self):
+        impressao = manifesto.impressao_fonte(self.fonte)
+        regras = manifesto.impressao_regras({'IN_TREINEIRO': 1})
+        registro = manifesto.Manifesto(self.caminho)
+        self.assertFalse(registro.atualizado(2019, impressao, regras))
+        registro.registrar(2019, impressao, regras, linhas=10)
+
+        registro = manifesto.Manifesto(self.caminho)
+        self.assertTrue(registro.atualizado(2019, impressao, regras))
+        self.assertFalse(registro.atualizado(2019, impressao, manifesto.impressao_regras({'IN_TREINEIRO': [1, 2]})))
+        self.assertEqual(registro.anos[2019]['linhas'], 10)
+
+        registro.invalidar(2019)
+        self.assertFalse(manifesto.Manifesto(self.caminho).atualizado(2019, impressao, regras))
+
+if __name__ == '__main__':
+    unittest.main()
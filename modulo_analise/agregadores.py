@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+def _combinar_momentos(n_a, media_a, m2_a, n_b, media_b, m2_b):
+    # Fórmula de Chan et al. para juntar contagem, média e M2 (soma dos quadrados dos desvios)
+    # de duas partes. Ao contrário de somar x e x², não perde precisão quando a média é grande
+    # perto do desvio. Funciona com escalares e com arrays, grupo a grupo
+    n_a, n_b = np.asarray(n_a, dtype=np.int64), np.asarray(n_b, dtype=np.int64)
+    n = n_a + n_b
+    peso_b = np.divide(n_b, n, out=np.zeros(n.shape), where=n > 0)
+    delta = np.asarray(media_b, dtype=float) - np.asarray(media_a, dtype=float)
+    return n, media_a + delta * peso_b, m2_a + m2_b + delta * delta * n_a * peso_b
+
+class Momentos:
+    """
+    Contagem, média e variância de uma coluna, acumuladas bloco a bloco.
+
+    Cada bloco é resumido em (n, média, M2), com M2 a soma dos quadrados dos desvios em relação
+    à média do bloco, e dois resumos se juntam com `combinar`, em qualquer ordem: blocos de um
+    iterador, partições lidas separadamente ou resultados de processos diferentes. Valores
+    ausentes são ignorados, como em `pd.Series.mean`.
+
+    Parâmetros
+    ----------
+    n : int
+        Quantidade de valores.
+    media : float
+        Média dos valores.
+    m2 : float
+        Soma dos quadrados dos desvios em relação à média.
+
+    Exemplo
+    -------
+    >>> momentos = Momentos.de_valores([1.0, 2.0]).combinar(Momentos.de_valores([3.0, None]))
+    >>> momentos.n, momentos.media, momentos.variancia
+    (3, 2.0, 1.0)
+    """
+
+    def __init__(self, n: int = 0, media: float = 0.0, m2: float = 0.0):
+        self.n = n
+        self.media = media
+        self.m2 = m2
+
+    @classmethod
+    def de_valores(cls, valores) -> 'Momentos':
+        """
+        Resume um bloco de valores, em duas passadas: a média, e depois os desvios em relação a ela.
+        """
+        valores = pd.Series(valores, dtype='float64').dropna().to_numpy()
+        if not len(valores):
+            return cls()
+        media = valores.mean()
+        return cls(len(valores), float(media), float(((valores - media) ** 2).sum()))
+
+    def combinar(self, outro: 'Momentos') -> 'Momentos':
+        """
+        Retorna o resumo da união dos valores dos dois resumos.
+        """
+        n, media, m2 = _combinar_momentos(self.n, self.media, self.m2, outro.n, outro.media, outro.m2)
+        return Momentos(int(n), float(media), float(m2))
+
+    def atualizar(self, valores) -> 'Momentos':
+        """
+        Acrescenta um bloco de valores a este resumo e o retorna.
+        """
+        combinado = self.combinar(Momentos.de_valores(valores))
+        self.n, self.media, self.m2 = combinado.n, combinado.media, combinado.m2
+        return self
+
+    @property
+    def variancia(self) -> float:
+        """
+        Variância amostral (ddof=1), como em `pd.Series.var`; NaN com menos de dois valores.
+        """
+        return self.m2 / (self.n - 1) if self.n > 1 else float('nan')
+
+    def resultado(self) -> float:
+        """
+        A média acumulada, ou NaN se nenhum valor foi visto.
+        """
+        return self.media if self.n else float('nan')
+
+class MomentosPorGrupo:
+    """
+    `Momentos` de uma coluna para cada grupo, como um `groupby(por)[coluna]` acumulado bloco a bloco.
+
+    Parâmetros
+    ----------
+    tabela : pd.DataFrame, opcional
+        Colunas 'n', 'media' e 'm2', indexadas pelos grupos.
+
+    Exemplo
+    -------
+    >>> a = pd.DataFrame({'UF': ['SP', 'RJ'], 'nota': [500.0, 600.0]})
+    >>> b = pd.DataFrame({'UF': ['SP'], 'nota': [700.0]})
+    >>> resumo = MomentosPorGrupo.de_dataframe(a, ['UF'], 'nota').combinar(MomentosPorGrupo.de_dataframe(b, ['UF'], 'nota'))
+    >>> resumo.resultado().reset_index()
+       UF  n  media  variancia
+    0  RJ  1  600.0        NaN
+    1  SP  2  600.0    20000.0
+    """
+
+    def __init__(self, tabela: pd.DataFrame = None):
+        self.tabela = tabela
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, por: list, coluna: str) -> 'MomentosPorGrupo':
+        """
+        Resume `df[coluna]` em cada grupo de `por`. Grupos só com valores ausentes ficam com n igual a 0.
+        """
+        grupos = df[coluna].astype('float64').groupby([df[chave] for chave in por], observed=True)
+        n = grupos.count()
+        tabela = pd.DataFrame({'n': n.astype(np.int64), 'media': grupos.mean().fillna(0.0),
+                               'm2': (grupos.var(ddof=0) * n).fillna(0.0)})
+        return cls(tabela)
+
+    def combinar(self, outro: 'MomentosPorGrupo') -> 'MomentosPorGrupo':
+        """
+        Retorna o resumo da união dos dois resumos, grupo a grupo.
+        """
+        if self.tabela is None or outro.tabela is None:
+            return MomentosPorGrupo(outro.tabela if self.tabela is None else self.tabela)
+        indice = self.tabela.index.union(outro.tabela.index)
+        a = self.tabela.reindex(indice, fill_value=0)
+        b = outro.tabela.reindex(indice, fill_value=0)
+        n, media, m2 = _combinar_momentos(a['n'], a['media'], a['m2'], b['n'], b['media'], b['m2'])
+        return MomentosPorGrupo(pd.DataFrame({'n': n, 'media': media, 'm2': m2}, index=indice))
+
+    def atualizar(self, df: pd.DataFrame, por: list, coluna: str) -> 'MomentosPorGrupo':
+        """
+        Acrescenta um bloco a este resumo e o retorna.
+        """
+        self.tabela = self.combinar(MomentosPorGrupo.de_dataframe(df, por, coluna)).tabela
+        return self
+
+    def resultado(self) -> pd.DataFrame:
+        """
+        Quantidade, média e variância amostral de cada grupo, ordenados pelos grupos.
+        """
+        if self.tabela is None:
+            return pd.DataFrame(columns=['n', 'media', 'variancia'])
+        tabela = self.tabela.sort_index()
+        n = tabela['n']
+        return pd.DataFrame({'n': n, 'media': tabela['media'].where(n > 0),
+                             'variancia': (tabela['m2'] / (n - 1)).where(n > 1)})
+
+class Contagem:
+    """
+    Contagem de valores, como `value_counts`, acumulada bloco a bloco.
+
+    Exemplo
+    -------
+    >>> Contagem.de_valores(['A', 'B', 'A']).combinar(Contagem.de_valores(['B'])).resultado()
+    A    2
+    B    2
+    dtype: int64
+    """
+
+    def __init__(self, contagens: pd.Series = None):
+        self.contagens = pd.Series(dtype=np.int64) if contagens is None else contagens
+
+    @classmethod
+    def de_valores(cls, valores) -> 'Contagem':
+        """
+        Conta os valores de um bloco. Valores ausentes não são contados.
+        """
+        contagens = pd.Series(valores).value_counts(sort=False)
+        return cls(contagens[contagens > 0].rename(None).rename_axis(None))
+
+    def combinar(self, outro: 'Contagem') -> 'Contagem':
+        """
+        Retorna a soma das duas contagens.
+        """
+        if not len(self.contagens) or not len(outro.contagens):
+            return Contagem(outro.contagens if not len(self.contagens) else self.contagens)
+        return Contagem(self.contagens.add(outro.contagens, fill_value=0).astype(np.int64))
+
+    def atualizar(self, valores) -> 'Contagem':
+        """
+        Acrescenta a contagem de um bloco a esta e a retorna.
+        """
+        self.contagens = self.combinar(Contagem.de_valores(valores)).contagens
+        return self
+
+    def resultado(self) -> pd.Series:
+        """
+        A quantidade de cada valor, ordenada pelos valores.
+        """
+        return self.contagens.sort_index()
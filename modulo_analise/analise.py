@@ -1,13 +1,81 @@
+import numpy as np
 import pandas as pd
+import particoes
+import bitmap
+import consulta
+import agregadores
+import histogramas
+import derivadas
+# As fórmulas das colunas derivadas ficam em derivadas.py, o mesmo módulo que a filtragem usa para
+# gravá-las. Os nomes continuam disponíveis aqui
+from derivadas import (NOTAS, MAPEAMENTO_REGIOES, REGIAO_DA_UF, SALARIO_MINIMO, ANO_PADRAO_RENDA, LETRAS_Q006,
+                       LIMITES_Q006, LINHAS_POR_BLOCO, media_por_participante, faixas_de_renda, tabela_de_renda,
+                       renda_familiar, renda_per_capita)
+
+VERSOES_DERIVADAS = derivadas.VERSOES
+
+def _valores_presentes(df: pd.DataFrame, coluna: str, catalogo: dict = None) -> set:
+    # Com o catálogo, a consulta não depende do tamanho do DataFrame; sem ele, os valores
+    # distintos são obtidos de forma vetorizada
+    if catalogo is None and isinstance(df, consulta.Consulta):
+        catalogo = df.catalogo
+    if catalogo is not None:
+        resumo = catalogo['colunas'].get(coluna)
+        if resumo is not None and resumo['distintos'] is not None:
+            return set(resumo['distintos'])
+    return set(pd.unique(_coletar(df, [coluna])[coluna]))
+
+def _em_blocos(df) -> bool:
+    # Um iterável de DataFrames (uma lista, um gerador de partições...) é agregado bloco a bloco
+    return not isinstance(df, (pd.DataFrame, consulta.Consulta, str, bytes)) and hasattr(df, '__iter__')
+
+def _blocos(df, colunas: list):
+    for bloco in df:
+        if not set(colunas).issubset(bloco.columns):
+            raise ValueError(f"Cada bloco deve conter as colunas {colunas}.")
+        yield bloco
+
+def _grupos(por) -> list:
+    # `por` pode ser uma coluna ou uma lista delas
+    if por is None:
+        return []
+    return [por] if isinstance(por, str) else list(por)
+
+def _derivada(df, nome: str) -> bool:
+    # Diz se `df` já tem a coluna derivada `nome`, calculada com a fórmula atual. Numa consulta,
+    # a versão vem do catálogo do dataset
+    if isinstance(df, consulta.Consulta):
+        versoes = (df.catalogo or {}).get('versoes_derivadas', {})
+    elif isinstance(df, pd.DataFrame) and nome in df.columns:
+        versoes = df.attrs.get('versoes_derivadas', {})
+    else:
+        return False
+    return versoes.get(nome) == VERSOES_DERIVADAS[nome]
+
+def _carimbar(df: pd.DataFrame, nome: str) -> pd.DataFrame:
+    # Marca a coluna `nome` de `df` como calculada com a fórmula atual
+    df.attrs['versoes_derivadas'] = {**df.attrs.get('versoes_derivadas', {}), nome: VERSOES_DERIVADAS[nome]}
+    return df
+
+def _media(df: pd.DataFrame) -> pd.Series:
+    # A média gravada pela filtragem, se houver, ou a calculada agora
+    return df['media'] if _derivada(df, 'media') else media_por_participante(df)
+
+def _coletar(df, colunas: list) -> pd.DataFrame:
+    # Uma consulta preguiçosa só é executada aqui, lendo apenas as colunas que a função usa
+    if isinstance(df, consulta.Consulta):
+        return df.selecionar(colunas).coletar()
+    return df
 
-def separar_ufs_e_anos(df: pd.DataFrame, ufs: list, anos: list) -> pd.DataFrame:
+def separar_ufs_e_anos(df: pd.DataFrame, ufs: list, anos: list, catalogo: dict = None,
+                       indice: particoes.IndiceParticoes = None, bitmaps: bitmap.IndiceBitmap = None) -> pd.DataFrame:
     """
     Toma o DataFrame e o filtra por qualquer quantidade de estados e anos.
 
     Parâmetros
     ----------
-    df : pd.DataFrame
-        DataFrame original
+    df : pd.DataFrame ou consulta.Consulta
+        DataFrame original. Com uma consulta, os filtros são acrescentados ao plano dela.
     
     ufs : list
         Lista com estados que queira separar do DataFrame original. Os estados devem ser
@@ -15,11 +83,24 @@ def separar_ufs_e_anos(df: pd.DataFrame, ufs: list, anos: list) -> pd.DataFrame:
 
     anos : list
         Lista com anos que queira separar do DataFrame original.
+
+    catalogo : dict, opcional
+        Catálogo do dataset de onde `df` foi lido (`catalogo.carregar_catalogo`, do filter). Se
+        fornecido, os estados e anos são validados pelos valores distintos do catálogo, sem
+        percorrer o DataFrame.
+
+    indice : particoes.IndiceParticoes, opcional
+        Índice de `df`, agrupado por `particoes.ordenar`. Se fornecido, o resultado é montado
+        com fatias contíguas de `df`, em vez de uma máscara do tamanho dele.
+
+    bitmaps : bitmap.IndiceBitmap, opcional
+        Índice de bitmaps de `df`. Se fornecido (e `indice` não), as linhas são escolhidas
+        combinando os bitmaps de UF e ano.
     
     Retorna
     -------
-    pd.DataFrame
-        DataFrame filtrado pelos estados e anos escolhidos.
+    pd.DataFrame ou consulta.Consulta
+        DataFrame filtrado pelos estados e anos escolhidos, ou a consulta com os filtros.
 
     Raises
     ------
@@ -43,26 +124,53 @@ def separar_ufs_e_anos(df: pd.DataFrame, ufs: list, anos: list) -> pd.DataFrame:
     
     ufs = [uf.upper() for uf in ufs]
 
-    if 'SG_UF_PROVA' not in df.columns or 'NU_ANO' not in df.columns:
+    lazy = isinstance(df, consulta.Consulta)
+    if not lazy and ('SG_UF_PROVA' not in df.columns or 'NU_ANO' not in df.columns):
         raise ValueError("As colunas 'SG_UF_PROVA' e 'NU_ANO' devem estar presentes no DataFrame.")
-    if not set(ufs).issubset(df['SG_UF_PROVA']):
+    if indice is not None and catalogo is None:
+        ufs_presentes, anos_presentes = indice.ufs, indice.anos
+    elif bitmaps is not None and catalogo is None:
+        ufs_presentes, anos_presentes = bitmaps.valores('SG_UF_PROVA'), bitmaps.valores('NU_ANO')
+    else:
+        ufs_presentes = _valores_presentes(df, 'SG_UF_PROVA', catalogo)
+        anos_presentes = _valores_presentes(df, 'NU_ANO', catalogo)
+    if not set(ufs).issubset(ufs_presentes):
         raise ValueError("A entrada fornecida não contém estados válidos.")
-    if not set(anos).issubset(df['NU_ANO']):
+    if not set(anos).issubset(anos_presentes):
         raise ValueError("A entrada fornecida não contém anos válidos.")
 
+    if lazy:
+        return df.filtrar('SG_UF_PROVA', ufs).filtrar('NU_ANO', anos)
+    if indice is not None:
+        return indice.fatiar(df, ufs, anos)
+    if bitmaps is not None:
+        return bitmaps.selecionar(df, bitmaps.em('SG_UF_PROVA', ufs) & bitmaps.em('NU_ANO', anos))
     return df[(df['SG_UF_PROVA'].isin(ufs)) & (df['NU_ANO'].isin(anos))]
 
-def separar_regiao(df: pd.DataFrame, regiao: str) -> pd.DataFrame:
+def separar_regiao(df: pd.DataFrame, regiao: str, catalogo: dict = None,
+                   indice: particoes.IndiceParticoes = None, bitmaps: bitmap.IndiceBitmap = None) -> pd.DataFrame:
     """
     Toma o DataFrame e o filtra de acordo com a região escolhida
 
     Parâmetros
     ----------
-    df : pd.DataFrame
-        DataFrame original
+    df : pd.DataFrame ou consulta.Consulta
+        DataFrame original. Com uma consulta, o filtro é acrescentado ao plano dela.
     
     regiao : str
         Uma das cinco regiões brasileiras
+
+    catalogo : dict, opcional
+        Catálogo do dataset de onde `df` foi lido. Se fornecido, a região também precisa ter
+        ao menos um estado no catálogo.
+
+    indice : particoes.IndiceParticoes, opcional
+        Índice de `df`, agrupado por `particoes.ordenar`. Se fornecido, a região inteira é uma
+        única fatia contígua de `df`.
+
+    bitmaps : bitmap.IndiceBitmap, opcional
+        Índice de bitmaps de `df`. Se fornecido (e `indice` não), a região é a união dos
+        bitmaps dos seus estados.
     
     Retorna
     -------
@@ -72,7 +180,7 @@ def separar_regiao(df: pd.DataFrame, regiao: str) -> pd.DataFrame:
     Raises
     ------
     ValueError
-        Se a entrada fornecida não for uma região válida
+        Se a entrada fornecida não for uma região válida, ou se o catálogo não tiver estados dela
 
     Exemplo
     -------
@@ -87,34 +195,46 @@ def separar_regiao(df: pd.DataFrame, regiao: str) -> pd.DataFrame:
     
     regiao = regiao.lower()
     # Dicionário para mapear as UFs de cada região
-    regioes = {"norte": ["AM", "RR", "AP", "PA", "TO", "RO", "AC"],
-               "nordeste": ["MA", "PI", "CE", "RN", "PE", "PB", "SE", "AL", "BA"],
-               "centro_oeste": ["MT", "MS", "GO"],
-               "sudeste": ["SP", "RJ", "ES", "MG"],
-               "sul": ["PR", "SC", "RS"]}
+    regioes = particoes.REGIOES
 
-    if "SG_UF_PROVA" not in df.columns:
+    lazy = isinstance(df, consulta.Consulta)
+    if not lazy and "SG_UF_PROVA" not in df.columns:
         raise ValueError("A DataFrame fornecido não é tem a coluna 'SG_UF_PROVA'")
     if regiao not in regioes:
         raise ValueError("A entrada fornecida não é uma região válida")
+    if catalogo is not None and not set(regioes[regiao]) & _valores_presentes(df, 'SG_UF_PROVA', catalogo):
+        raise ValueError("O catálogo não contém nenhum estado da região fornecida")
     
+    if lazy:
+        return df.filtrar('SG_UF_PROVA', regioes[regiao])
+    if indice is not None:
+        return indice.fatiar(df, regioes[regiao])
+    if bitmaps is not None:
+        return bitmaps.selecionar(df, bitmaps.em('SG_UF_PROVA', regioes[regiao]))
+
     filtro = df["SG_UF_PROVA"].isin(regioes[regiao])
 
     return df.loc[filtro]
 
 def media(df : pd.DataFrame) -> pd.DataFrame:
     """
-    Calcula a média de colunas específicas e adiciona-a ao DataFrame.
+    Calcula a média de colunas específicas e retorna o DataFrame com ela.
+
+    Se `df` já tiver a coluna 'media' gravada pela filtragem com a versão atual da fórmula
+    (veja `VERSOES_DERIVADAS`), ele é retornado como está, sem recalcular a média.
 
     Parâmetros
     ----------
-    df: pd.DataFrame
-        O DataFrame que você deseja modificar.
+    df: pd.DataFrame ou consulta.Consulta
+        O DataFrame de origem, que não é modificado. Com uma consulta, a média vira uma coluna
+        derivada do plano, calculada só para as linhas que passarem pelos filtros, a não ser
+        que o catálogo da consulta indique que o dataset já a tem.
 
     Retorna
     -------
     pd.DataFrame: 
-        O DataFrame modificado com a nova coluna de médias.
+        Um novo DataFrame com as colunas de `df` e a coluna de médias. As colunas de `df` não são
+        copiadas. Para só as médias, use `media_por_participante`.
 
     Exemplo
     -------
@@ -133,13 +253,63 @@ def media(df : pd.DataFrame) -> pd.DataFrame:
     3          88          87          90          88               90   88.6
     4          92          88          85          92               87   88.8
     """
-    colunas_media = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
-    if not set(colunas_media).issubset(df.columns):
-        raise ValueError("O DataFrame deve conter as colunas necessárias para o cálculo da média.")
-        
-    df['media'] = df[colunas_media].mean(axis=1)
+    if _derivada(df, 'media'):
+        return df
+    if isinstance(df, consulta.Consulta):
+        return df.derivar('media', media_por_participante, NOTAS)
+    return _carimbar(df.assign(media=media_por_participante(df)), 'media')
 
-    return df
+def histogramas_de_notas(df, por: list = None, notas: list = None, exatas: bool = True) -> histogramas.Histogramas:
+    """
+    Monta os histogramas das notas de cada grupo, dos quais saem contagens por faixa de nota.
+
+    Os dados são percorridos uma única vez, e cada consulta posterior (`contar`) custa o mesmo,
+    qualquer que seja a faixa ou o tamanho dos dados.
+
+    Parâmetros
+    ----------
+    df : pd.DataFrame, consulta.Consulta ou iterável de DataFrames
+        Os participantes, com as colunas de `por` e de `notas`.
+    por : str ou list, opcional
+        Colunas de agrupamento; por padrão, ano e UF da prova.
+    notas : list, opcional
+        Colunas de nota; por padrão, todas as de `NOTAS`.
+    exatas : bool
+        Se False, as notas com mais de uma casa decimal são contadas à parte, em `fora`, em vez
+        de lançar ValueError.
+
+    Retorna
+    -------
+    histogramas.Histogramas
+        Um histograma por grupo e por nota, com uma posição por décimo de 0 a 1000.
+
+    Raises
+    ------
+    ValueError
+        Se faltarem colunas, ou se `exatas` e alguma nota não for um décimo exato.
+
+    Exemplo
+    -------
+    >>> df = pd.DataFrame({'NU_ANO': [2019, 2019, 2020], 'SG_UF_PROVA': ['SP', 'RJ', 'SP'],
+    ...                    'NU_NOTA_MT': [912.5, 640.0, 900.0]})
+    >>> histogramas_de_notas(df, por='SG_UF_PROVA', notas=['NU_NOTA_MT']).contar('NU_NOTA_MT', minimo=900)
+    SG_UF_PROVA
+    RJ    0
+    SP    2
+    Name: NU_NOTA_MT, dtype: int64
+    """
+    por = ['NU_ANO', 'SG_UF_PROVA'] if por is None else _grupos(por)
+    notas = NOTAS if notas is None else list(notas)
+    colunas = por + notas
+    resumo = histogramas.Histogramas()
+    if _em_blocos(df):
+        for bloco in _blocos(df, colunas):
+            resumo.atualizar(bloco, por, notas, exatas)
+        return resumo
+    df = _coletar(df, colunas)
+    if not set(colunas).issubset(df.columns):
+        raise ValueError(f"O DataFrame deve conter as colunas {colunas}.")
+    return resumo.atualizar(df, por, notas, exatas)
 
 def nota_1000_ano(df : pd.DataFrame, anos : list) -> pd.DataFrame:
     """
@@ -147,8 +317,10 @@ def nota_1000_ano(df : pd.DataFrame, anos : list) -> pd.DataFrame:
 
     Parâmetros
     ----------
-    df : pd.DataFrame
-    
+    df : pd.DataFrame, consulta.Consulta ou iterável de DataFrames
+        Com um iterável de blocos (partições, ou pedaços lidos com `chunksize`), os blocos são
+        contados um a um, sem juntá-los; o mesmo vale para as demais funções de agregação.
+
     ano : list
         Cada valor da lista deve ser um ano do qual você quer saber a nota 1000
     
@@ -175,15 +347,19 @@ def nota_1000_ano(df : pd.DataFrame, anos : list) -> pd.DataFrame:
     1    2021                         1
 
     """
-    if 'NU_NOTA_REDACAO' not in df.columns or 'NU_ANO' not in df.columns:
+    if isinstance(df, consulta.Consulta):
+        # Só as redações nota 1000 dos anos pedidos chegam a ser lidas
+        df = _coletar(df.filtrar('NU_ANO', anos).filtrar_faixa('NU_NOTA_REDACAO', 1000, 1000),
+                      ['NU_ANO', 'NU_NOTA_REDACAO'])
+    if isinstance(df, pd.DataFrame) and ('NU_NOTA_REDACAO' not in df.columns or 'NU_ANO' not in df.columns):
         raise ValueError("As colunas 'NU_NOTA_REDACAO' e 'NU_ANO' devem estar presentes no DataFrame.")
-    
-    resultados = []
-    for ano in anos:
-        ocorrencias = (df[df['NU_ANO'] == ano]['NU_NOTA_REDACAO'] == 1000).sum()
-        resultados.append({'NU_ANO': ano, 'Quantidade de notas 1000': ocorrencias})
 
-    return pd.DataFrame(resultados)
+    # Uma passada conta as redações de todos os anos, e a quantidade de notas 1000 é a última
+    # posição do histograma de cada ano. Como na comparação com 1000, uma redação fora dos
+    # décimos (950.55, 999.96) não é nota 1000, e fica em `fora` em vez de interromper a contagem
+    resumo = histogramas_de_notas(df, por='NU_ANO', notas=['NU_NOTA_REDACAO'], exatas=False)
+    contagens = resumo.contar('NU_NOTA_REDACAO', minimo=1000)
+    return pd.DataFrame([{'NU_ANO': ano, 'Quantidade de notas 1000': contagens.get(ano, 0)} for ano in anos])
 
 def renda_media_per_capita_familiar(df : pd.DataFrame, colunas_extras : list) -> pd.DataFrame:
     '''
@@ -191,7 +367,7 @@ def renda_media_per_capita_familiar(df : pd.DataFrame, colunas_extras : list) ->
 
     Parâmetros
     ----------
-    df : pd.DataFrame
+    df : pd.DataFrame ou consulta.Consulta
         DataFrame contendo a coluna "Q006" (letras) e a coluna "Q005" (números).
     colunas_extras : list
         Lista com o nome das colunas que você quer que permaneçam no novo DataFrame.
@@ -200,6 +376,8 @@ def renda_media_per_capita_familiar(df : pd.DataFrame, colunas_extras : list) ->
     -------
     pd.DataFrame
         Retorna um novo DataFrame com a coluna de renda per capita e as colunas citadas em colunas_extras.
+        `df` não é modificado, e a coluna 'Renda_Per_Capita' gravada pela filtragem é usada se
+        estiver na versão atual. Com uma consulta, retorna a consulta com a renda como coluna derivada.
 
     Raises
     ------
@@ -226,51 +404,33 @@ def renda_media_per_capita_familiar(df : pd.DataFrame, colunas_extras : list) ->
     3        436.625000            W
     
     '''
+    if isinstance(df, consulta.Consulta):
+        if not _derivada(df, 'Renda_Per_Capita'):
+            df = df.derivar('Renda_Per_Capita', renda_per_capita, ['Q006', 'Q005', 'NU_ANO'])
+        return df.selecionar(['Renda_Per_Capita'] + colunas_extras)
     try:
-        if 'Q006' not in df.columns or 'Q005' not in df.columns:
-            raise ValueError("O DataFrame deve conter as colunas 'Q006' e 'Q005'.")
-
-        valores_minimos_maximos = {
-            'A': (0, 0),
-            'B': (0, 998.00),
-            'C': (998.00, 1497.00),
-            'D': (1497.00, 1996.00),
-            'E': (1996.00, 2495.00),
-            'F': (2495.00, 2994.00),
-            'G': (2994.00, 3992.00),
-            'H': (3992.00, 4990.00),
-            'I': (4990.00, 5988.00),
-            'J': (5988.00, 6986.00),
-            'K': (6986.00, 7984.00),
-            'L': (7984.00, 8982.00),
-            'M': (8982.00, 9980.00),
-            'N': (9980.00, 11976.00),
-            'O': (11976.00, 14970.00),
-            'P': (14970.00, 19960.00),
-            'Q': (19961.00, 50000.00)
-        }
-    
-        valores_medios = {letra: sum(valores) / 2 for letra, valores in valores_minimos_maximos.items()}
-        df['Q006'] = df['Q006'].map(valores_medios.get)
-        df['Renda_Per_Capita'] = df['Q006'] / df['Q005']
-        df_renda_e_colunas_específicas = df[['Renda_Per_Capita'] + colunas_extras]
-    
-        return df_renda_e_colunas_específicas
+        # A renda gravada pela filtragem é reaproveitada se a fórmula não mudou desde então
+        renda = df['Renda_Per_Capita'] if _derivada(df, 'Renda_Per_Capita') else renda_per_capita(df)
+        return df[colunas_extras].assign(Renda_Per_Capita=renda)[['Renda_Per_Capita'] + colunas_extras]
 
     except KeyError as e:
         raise ValueError(f"Erro ao acessar coluna: {str(e)}")
     except TypeError as typeerro:
         raise TypeError(f"Erro ao acessar coluna: {str(typeerro)}")
                   
-def nota_unificada_por_estado_e_ano(df : pd.DataFrame) -> pd.DataFrame:
+def nota_unificada_por_estado_e_ano(df : pd.DataFrame, por : list = None) -> pd.DataFrame:
     """
     Calcula a média das notas por estado em um DataFrame, também separado por ano.
 
     Parâmetros
     ----------
-    df : pd.DataFrame 
+    df : pd.DataFrame, consulta.Consulta ou iterável de DataFrames
         O DataFrame contendo colunas de estados, anos e as médias de cada participante.
 
+    por : str ou list, opcional
+        Colunas pelas quais cada estado e ano também é separado, como 'TP_COR_RACA'. Os grupos
+        aparecem no resultado depois de "NU_ANO".
+
     Retorna
     -------
     pd.DataFrame
@@ -292,27 +452,41 @@ def nota_unificada_por_estado_e_ano(df : pd.DataFrame) -> pd.DataFrame:
     3          SP    2020            85.0
     4          SP    2021            88.0
     """
+    chaves = ['SG_UF_PROVA', 'NU_ANO'] + _grupos(por)
+    if isinstance(df, consulta.Consulta):
+        return df.agrupar(chaves, Nota_unificada=('media', 'mean')).coletar()
+    if _em_blocos(df):
+        grupos = agregadores.MomentosPorGrupo()
+        for bloco in _blocos(df, chaves + ['media']):
+            grupos.atualizar(bloco, chaves, 'media')
+        medias = grupos.resultado()['media'].reset_index()
+        medias.columns = chaves + ['Nota_unificada']
+        return medias
     try:
         if all(item not in ['SG_UF_PROVA', 'media', 'NU_ANO'] for item in df.columns):
             raise KeyError("Colunas 'SG_UF_PROVA', 'NU_ANO' e 'media' não encontradas no DataFrame.")
 
-        medias = df.groupby(['SG_UF_PROVA', 'NU_ANO'])['media'].mean().reset_index()
-        medias.columns = ['SG_UF_PROVA', 'NU_ANO', 'Nota_unificada']
+        medias = df.groupby(chaves, observed=True)['media'].mean().reset_index()
+        medias.columns = chaves + ['Nota_unificada']
 
         return medias
 
     except ValueError as e:
         print(f"Erro ao calcular a média unificada das notas por estado e ano: {str(e)}")
 
-def renda_unificada_por_estado(df : pd.DataFrame) -> pd.DataFrame:
+def renda_unificada_por_estado(df : pd.DataFrame, por : list = None) -> pd.DataFrame:
     '''
     Calcula a média unificada das rendas per capita familiar por estado.
 
     Parâmetros
     ----------
-    df : pd.DataFrame
+    df : pd.DataFrame, consulta.Consulta ou iterável de DataFrames
         DataFrame contendo as colunas "SG_UF_PROVA" (código do estado) e "Renda_Per_Capita" (média da renda per capita).
 
+    por : str ou list, opcional
+        Colunas pelas quais cada estado também é separado, como 'NU_ANO'. Todos os grupos saem de
+        um único groupby e aparecem no resultado depois de "SG_UF_PROVA".
+
     Retorna
     -------
     pd.DataFrame
@@ -336,32 +510,51 @@ def renda_unificada_por_estado(df : pd.DataFrame) -> pd.DataFrame:
     0            1            600.0
     1            2            700.0
     '''
+    chaves = ['SG_UF_PROVA'] + _grupos(por)
+    if isinstance(df, consulta.Consulta):
+        return df.agrupar(chaves, Renda_unificada=('Renda_Per_Capita', 'mean')).coletar()
+    if _em_blocos(df):
+        grupos = agregadores.MomentosPorGrupo()
+        for bloco in _blocos(df, chaves + ['Renda_Per_Capita']):
+            grupos.atualizar(bloco, chaves, 'Renda_Per_Capita')
+        renda = grupos.resultado()['media'].reset_index()
+        renda.columns = chaves + ['Renda_unificada']
+        return renda
     try:
         if 'SG_UF_PROVA' not in df.columns or 'Renda_Per_Capita' not in df.columns:
             raise ValueError("O DataFrame deve conter as colunas 'SG_UF_PROVA' e 'Renda_Per_Capita'.")
 
-        df_renda_unificada_por_estado = df.groupby('SG_UF_PROVA').agg({'Renda_Per_Capita': 'mean'}).reset_index()
+        df_renda_unificada_por_estado = df.groupby(chaves, observed=True).agg({'Renda_Per_Capita': 'mean'}).reset_index()
 
         df_renda_unificada_por_estado.rename(columns={'Renda_Per_Capita': 'Renda_unificada'}, inplace=True)
         
-        return df_renda_unificada_por_estado[['SG_UF_PROVA', 'Renda_unificada']]
+        return df_renda_unificada_por_estado[chaves + ['Renda_unificada']]
 
     except KeyError as e:
         raise ValueError(f"Erro ao acessar coluna: {str(e)}")
 
-def media_internet(df : pd.DataFrame) -> pd.DataFrame:
+def media_internet(df : pd.DataFrame, bitmaps : bitmap.IndiceBitmap = None, por : list = None) -> pd.DataFrame:
     """
     Calcula a média de colunas específicas para linhas com "A" e "B" na coluna "Q025" e retorna um DataFrame com a média dessas médias.
 
     Parâmetros
     ----------
-    df : pd.DataFrame 
+    df : pd.DataFrame, consulta.Consulta ou iterável de DataFrames
         O DataFrame que você deseja modificar.
 
+    bitmaps : bitmap.IndiceBitmap, opcional
+        Índice de bitmaps de `df`. Se fornecido, as linhas de cada resposta da Q025 são
+        escolhidas pelos bitmaps, e `df` não é modificado.
+
+    por : str ou list, opcional
+        Coluna ou colunas de agrupamento, como 'NU_ANO'. O resultado passa a ter uma linha por
+        grupo, todas calculadas de uma vez sobre os dados juntos, em vez de uma chamada por grupo.
+        Os bitmaps não são usados nesse caso.
+
     Retorna
     -------
     pd.DataFrame    
-        Um DataFrame com a média das colunas "media_A" e "media_B".
+        Um DataFrame com a média das colunas "media_A" e "media_B", precedidas das colunas de `por`.
 
     Raises
     ------
@@ -383,14 +576,47 @@ def media_internet(df : pd.DataFrame) -> pd.DataFrame:
     0                86.6                87.4
     """
     try:
+        colunas_media = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
+        por = _grupos(por)
+        if _em_blocos(df) and por:
+            grupos = {'A': agregadores.MomentosPorGrupo(), 'B': agregadores.MomentosPorGrupo()}
+            for bloco in _blocos(df, por + ['Q025'] + colunas_media):
+                linhas = bloco[por].assign(media_linha=_media(bloco))
+                for resposta, acumulado in grupos.items():
+                    acumulado.atualizar(linhas[bloco['Q025'] == resposta], por, 'media_linha')
+            return pd.DataFrame({'media_sem_internet': grupos['A'].resultado()['media'],
+                                 'media_com_internet': grupos['B'].resultado()['media']}).reset_index()
+        if _em_blocos(df):
+            # A média de cada resposta é acumulada bloco a bloco, sem juntar os blocos
+            momentos = {'A': agregadores.Momentos(), 'B': agregadores.Momentos()}
+            for bloco in _blocos(df, ['Q025'] + colunas_media):
+                for resposta, acumulado in momentos.items():
+                    acumulado.atualizar(_media(bloco)[bloco['Q025'] == resposta])
+            return pd.DataFrame({'media_sem_internet': [momentos['A'].resultado()],
+                                 'media_com_internet': [momentos['B'].resultado()]})
+        if isinstance(df, consulta.Consulta) and _derivada(df, 'media'):
+            # O dataset já tem a média de cada participante: lê só ela, e não as cinco notas
+            df = _carimbar(_coletar(df, por + ['Q025', 'media']), 'media')
+        else:
+            df = _coletar(df, por + ['Q025'] + colunas_media)
         if 'Q025' not in df.columns:
             raise ValueError("A coluna 'Q025' não está presente no DataFrame.")
+
+        if por:
+            # A média de cada participante é calculada uma vez, e a de cada grupo sai de um groupby por resposta
+            medias_linha = _media(df)
+            chaves = [df[coluna] for coluna in por]
+            return pd.DataFrame({nome: medias_linha.where(df['Q025'] == resposta).groupby(chaves, observed=True).mean()
+                                 for nome, resposta in [('media_sem_internet', 'A'), ('media_com_internet', 'B')]}).reset_index()
         
-        colunas_media = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
-        df['media_A'] = df[df['Q025'] == 'A'][colunas_media].mean(axis=1)
-        df['media_B'] = df[df['Q025'] == 'B'][colunas_media].mean(axis=1)
-        media_final = df[['media_A', 'media_B']].mean()
-        df_resultado = pd.DataFrame({'media_sem_internet': [media_final['media_A']], 'media_com_internet': [media_final['media_B']]})
+        if bitmaps is not None:
+            media_final = {resposta: bitmaps.selecionar(df[colunas_media], bitmaps.igual('Q025', resposta)).mean(axis=1).mean()
+                           for resposta in ['A', 'B']}
+            return pd.DataFrame({'media_sem_internet': [media_final['A']], 'media_com_internet': [media_final['B']]})
+
+        medias_linha = _media(df)
+        df_resultado = pd.DataFrame({'media_sem_internet': [medias_linha[df['Q025'] == 'A'].mean()],
+                                     'media_com_internet': [medias_linha[df['Q025'] == 'B'].mean()]})
 
         return df_resultado
 
@@ -403,7 +629,7 @@ def calcular_medias_regiao_ano(df : pd.DataFrame) -> pd.DataFrame:
 
     Parâmetros
     ----------
-    df : pd.DataFrame 
+    df : pd.DataFrame, consulta.Consulta ou iterável de DataFrames
         DataFrame contendo os dados das notas.
 
     Retorna
@@ -432,23 +658,26 @@ def calcular_medias_regiao_ano(df : pd.DataFrame) -> pd.DataFrame:
 
     try:
         required_columns = ['NU_ANO', 'SG_UF_PROVA', 'media']
+        if _em_blocos(df):
+            # A média de cada estado em cada ano é acumulada bloco a bloco, e o resto sai dela
+            grupos = agregadores.MomentosPorGrupo()
+            for bloco in _blocos(df, required_columns):
+                grupos.atualizar(bloco, ['NU_ANO', 'SG_UF_PROVA'], 'media')
+            estados = grupos.resultado()
+            somas = pd.DataFrame({'soma_media': (estados['n'] * estados['media']).fillna(0.0),
+                                  'n_media': estados['n']}).reset_index()
+            return calcular_medias_regiao_ano_cubo(somas)
+        df = _coletar(df, required_columns)
         if not all(col in df.columns for col in required_columns):
             raise ValueError("O DataFrame de entrada não contém todas as colunas necessárias.")
         
-        mapeamento_regioes = {
-            'Norte': ['AC', 'AM', 'AP', 'PA', 'RO', 'RR', 'TO'],
-            'Nordeste': ['AL', 'BA', 'CE', 'MA', 'PB', 'PE', 'PI', 'RN', 'SE'],
-            'Sudeste': ['ES', 'MG', 'RJ', 'SP'],
-            'Sul': ['PR', 'RS', 'SC'],
-            'Centro-Oeste': ['DF', 'GO', 'MT', 'MS']
-        }
-        df['Região'] = df['SG_UF_PROVA'].map({estado: regiao for regiao, estados in mapeamento_regioes.items() for estado in estados})
+        regioes = df['Região'] if _derivada(df, 'Região') else derivadas.regiao(df)
 
         # Calcular a média do Brasil por ano
-        media_brasil_ano = df.groupby(['NU_ANO', 'SG_UF_PROVA'])['media'].mean().groupby('NU_ANO').mean()
+        media_brasil_ano = df.groupby(['NU_ANO', 'SG_UF_PROVA'], observed=True)['media'].mean().groupby('NU_ANO').mean()
         media_brasil_ano = media_brasil_ano.reset_index()
         media_brasil_ano.rename(columns={'media': 'Média Brasil'}, inplace=True)
-        media_regiao_ano = df.groupby(['NU_ANO', 'Região'])['media'].mean().unstack()
+        media_regiao_ano = df['media'].groupby([df['NU_ANO'], regioes], observed=True).mean().unstack()
         result_df = pd.concat([media_regiao_ano, media_brasil_ano.set_index('NU_ANO')['Média Brasil']], axis=1)
 
         return result_df
@@ -456,15 +685,19 @@ def calcular_medias_regiao_ano(df : pd.DataFrame) -> pd.DataFrame:
     except ValueError as e:
         raise ValueError(f"Erro ao calcular as médias por ano e região: {str(e)}")
     
-def media_por_area_de_conhecimento(df : pd.DataFrame) -> pd.DataFrame:
+def media_por_area_de_conhecimento(df : pd.DataFrame, por : list = None) -> pd.DataFrame:
     """
     Calcula a média das notas por área de conhecimento e cria um DataFrame.
 
     Parâmetros
     ----------
-    df : pd.DataFrame
+    df : pd.DataFrame, consulta.Consulta ou iterável de DataFrames
         Um DataFrame contendo as notas por área de conhecimento.
 
+    por : str ou list, opcional
+        Coluna ou colunas de agrupamento, como 'NU_ANO'. O resultado passa a ter uma linha por
+        grupo, precedida das colunas de `por`, todas de um único groupby.
+
     Retorna
     -------
     pd.DataFrame
@@ -484,16 +717,187 @@ def media_por_area_de_conhecimento(df : pd.DataFrame) -> pd.DataFrame:
                CN     CH     LC          MT     RD
     0  683.333333  700.0  710.0  706.666667  790.0
     """
+    colunas_media = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
+    areas = ["CN", "CH", "LC", "MT", "RD"]
+    por = _grupos(por)
+    if isinstance(df, consulta.Consulta) and por:
+        return df.agrupar(por, **{area: (coluna, 'mean') for area, coluna in zip(areas, colunas_media)}).coletar()
+    if _em_blocos(df) and por:
+        grupos = {coluna: agregadores.MomentosPorGrupo() for coluna in colunas_media}
+        for bloco in _blocos(df, por + colunas_media):
+            for coluna, acumulado in grupos.items():
+                acumulado.atualizar(bloco, por, coluna)
+        return pd.DataFrame({area: grupos[coluna].resultado()['media'] for area, coluna in zip(areas, colunas_media)}).reset_index()
+    if _em_blocos(df):
+        momentos = {coluna: agregadores.Momentos() for coluna in colunas_media}
+        for bloco in _blocos(df, colunas_media):
+            for coluna, acumulado in momentos.items():
+                acumulado.atualizar(bloco[coluna])
+        return pd.DataFrame({area: [momentos[coluna].resultado()] for area, coluna in zip(areas, colunas_media)})
+    df = _coletar(df, por + colunas_media)
     if not isinstance(df, pd.DataFrame):
         raise ValueError("O parâmetro 'df' deve ser um DataFrame.")
     
-    colunas_media = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
 
-    for coluna in colunas_media:
+    for coluna in por + colunas_media:
         if coluna not in df.columns:
             raise ValueError(f"A coluna {coluna} não está presente no DataFrame.")
 
+    if por:
+        medias = df.groupby(por, observed=True)[colunas_media].mean().reset_index()
+        medias.columns = por + areas
+        return medias
+
     df = df[colunas_media].mean().to_frame().T
-    df.columns = ["CN", "CH", "LC", "MT", "RD"]
+    df.columns = areas
 
     return df
+
+#   Variantes sobre o cubo de agregados
+#
+#   O cubo (cubo.carregar_cubo, do filter) tem uma linha por combinação de NU_ANO, SG_UF_PROVA,
+#   TP_COR_RACA, Q005, Q006 e Q025, com a quantidade de linhas ('linhas') e, para cada nota e
+#   para a média do participante, a quantidade de valores (n_), a soma (soma_) e a soma dos
+#   quadrados (soma2_). Médias de qualquer agrupamento pelas dimensões saem somando as células,
+#   e separar_ufs_e_anos e separar_regiao também filtram o cubo.
+
+def _checar_cubo(cubo: pd.DataFrame, colunas: list):
+    if not set(colunas).issubset(cubo.columns):
+        raise ValueError(f"O cubo deve conter as colunas {colunas}.")
+
+def _media_do_cubo(cubo: pd.DataFrame, por: list, medida: str) -> pd.Series:
+    # Média de `medida` em cada grupo: soma das somas sobre soma das contagens das células
+    somas = cubo.groupby(por, observed=True)[[f'soma_{medida}', f'n_{medida}']].sum()
+    return somas[f'soma_{medida}'] / somas[f'n_{medida}']
+
+def nota_unificada_por_estado_e_ano_cubo(cubo: pd.DataFrame, por: list = None) -> pd.DataFrame:
+    """
+    Variante de `nota_unificada_por_estado_e_ano` que lê o cubo de agregados em vez dos participantes.
+
+    Parâmetros
+    ----------
+    cubo : pd.DataFrame
+        Cubo de agregados, possivelmente já filtrado por `separar_ufs_e_anos`.
+    por : str ou list, opcional
+        Dimensões do cubo pelas quais cada estado e ano também é separado.
+
+    Retorna
+    -------
+    pd.DataFrame
+        O mesmo resultado de `nota_unificada_por_estado_e_ano(media(df), por)` sobre os dados do cubo.
+
+    Raises
+    ------
+    ValueError
+        Se o cubo não tiver as colunas necessárias.
+
+    Exemplo
+    -------
+    >>> cubo = pd.DataFrame({'SG_UF_PROVA': ['MG', 'MG', 'SP'], 'NU_ANO': [2020, 2020, 2020],
+    ...                      'soma_media': [160.0, 90.0, 85.0], 'n_media': [2, 1, 1]})
+    >>> nota_unificada_por_estado_e_ano_cubo(cubo)
+      SG_UF_PROVA  NU_ANO  Nota_unificada
+    0          MG    2020       83.333333
+    1          SP    2020       85.000000
+    """
+    chaves = ['SG_UF_PROVA', 'NU_ANO'] + _grupos(por)
+    _checar_cubo(cubo, chaves + ['soma_media', 'n_media'])
+    medias = _media_do_cubo(cubo, chaves, 'media').reset_index()
+    medias.columns = chaves + ['Nota_unificada']
+    return medias
+
+def renda_unificada_por_estado_cubo(cubo: pd.DataFrame, por: list = None) -> pd.DataFrame:
+    """
+    Variante de `renda_unificada_por_estado` que lê o cubo de agregados em vez dos participantes.
+
+    A renda per capita depende só do ano, da Q006 e da Q005, que são dimensões do cubo: cada célula
+    entra na média com o peso da sua quantidade de linhas.
+
+    Retorna
+    -------
+    pd.DataFrame
+        O mesmo resultado de `renda_unificada_por_estado(renda_media_per_capita_familiar(df, ['SG_UF_PROVA']), por)`.
+
+    Raises
+    ------
+    ValueError
+        Se o cubo não tiver as colunas necessárias.
+    """
+    chaves = ['SG_UF_PROVA'] + _grupos(por)
+    _checar_cubo(cubo, chaves + ['NU_ANO', 'Q005', 'Q006', 'linhas'])
+    renda = renda_per_capita(cubo)
+    pesos = cubo['linhas'].where(renda.notna(), 0)
+    celulas = cubo[chaves].assign(soma_renda=renda.fillna(0) * pesos, n_renda=pesos)
+    resultado = _media_do_cubo(celulas, chaves, 'renda').reset_index()
+    resultado.columns = chaves + ['Renda_unificada']
+    return resultado
+
+def media_internet_cubo(cubo: pd.DataFrame, por: list = None) -> pd.DataFrame:
+    """
+    Variante de `media_internet` que lê o cubo de agregados em vez dos participantes. `por` são
+    dimensões do cubo, como em `media_internet`.
+
+    Raises
+    ------
+    ValueError
+        Se o cubo não tiver as colunas necessárias.
+    """
+    por = _grupos(por)
+    _checar_cubo(cubo, por + ['Q025', 'soma_media', 'n_media'])
+    if por:
+        return pd.DataFrame({nome: _media_do_cubo(cubo[cubo['Q025'] == resposta], por, 'media')
+                             for nome, resposta in [('media_sem_internet', 'A'), ('media_com_internet', 'B')]}).reset_index()
+    medias = _media_do_cubo(cubo, ['Q025'], 'media')
+    return pd.DataFrame({'media_sem_internet': [medias.get('A', float('nan'))],
+                         'media_com_internet': [medias.get('B', float('nan'))]})
+
+def calcular_medias_regiao_ano_cubo(cubo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Variante de `calcular_medias_regiao_ano` que lê o cubo de agregados em vez dos participantes.
+
+    Raises
+    ------
+    ValueError
+        Se o cubo não tiver as colunas necessárias.
+    """
+    _checar_cubo(cubo, ['NU_ANO', 'SG_UF_PROVA', 'soma_media', 'n_media'])
+    estados = cubo.groupby(['NU_ANO', 'SG_UF_PROVA'], observed=True)[['soma_media', 'n_media']].sum().reset_index()
+    estados['Região'] = derivadas.regiao(estados)
+
+    # A média do Brasil é a média das médias dos estados, como na versão sobre os participantes
+    media_brasil_ano = (estados['soma_media'] / estados['n_media']).groupby(estados['NU_ANO']).mean()
+    media_regiao_ano = _media_do_cubo(estados, ['NU_ANO', 'Região'], 'media').unstack()
+    return pd.concat([media_regiao_ano, media_brasil_ano.rename('Média Brasil')], axis=1)
+
+def media_por_area_de_conhecimento_cubo(cubo: pd.DataFrame, por: list = None) -> pd.DataFrame:
+    """
+    Variante de `media_por_area_de_conhecimento` que lê o cubo de agregados em vez dos
+    participantes. `por` são dimensões do cubo, como em `media_por_area_de_conhecimento`.
+
+    Raises
+    ------
+    ValueError
+        Se o cubo não tiver as colunas necessárias.
+    """
+    colunas_media = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
+    por = _grupos(por)
+    _checar_cubo(cubo, por + [f'{prefixo}_{coluna}' for coluna in colunas_media for prefixo in ('soma', 'n')])
+    if por:
+        return pd.DataFrame({area: _media_do_cubo(cubo, por, coluna)
+                             for area, coluna in zip(["CN", "CH", "LC", "MT", "RD"], colunas_media)}).reset_index()
+    medias = {area: cubo[f'soma_{coluna}'].sum() / cubo[f'n_{coluna}'].sum()
+              for area, coluna in zip(["CN", "CH", "LC", "MT", "RD"], colunas_media)}
+    return pd.DataFrame(medias, index=[0])
+
+def nota_1000_ano_cubo(cubo: pd.DataFrame, anos: list) -> pd.DataFrame:
+    """
+    Variante de `nota_1000_ano` que lê o cubo de agregados em vez dos participantes.
+
+    Raises
+    ------
+    ValueError
+        Se o cubo não tiver as colunas necessárias.
+    """
+    _checar_cubo(cubo, ['NU_ANO', 'n_redacao_1000'])
+    contagens = cubo.groupby('NU_ANO')['n_redacao_1000'].sum()
+    return pd.DataFrame([{'NU_ANO': ano, 'Quantidade de notas 1000': contagens.get(ano, 0)} for ano in anos])
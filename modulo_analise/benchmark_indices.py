@@ -0,0 +1,53 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import analise
+import bitmap
+import particoes
+import medicao
+
+# Compara as formas de filtrar um DataFrame com o formato dos dados filtrados: máscaras booleanas,
+# o índice de partições e os bitmaps.
+# Uso: python benchmark_indices.py [linhas]
+
+def medir(descricao, funcao):
+    return medicao.medir(descricao, funcao, repeticoes=5, largura=44)
+
+def gerar(n_linhas, semente=0):
+    gerador = np.random.default_rng(semente)
+    return pd.DataFrame({
+        'NU_ANO': gerador.choice(np.array([2019, 2020, 2021, 2022], dtype='int16'), n_linhas),
+        'SG_UF_PROVA': pd.Categorical(gerador.choice(particoes.ORDEM_UFS, n_linhas)),
+        'TP_COR_RACA': gerador.integers(0, 7, n_linhas).astype('uint8'),
+        'Q006': pd.Categorical(gerador.choice(list('ABCDEFGHIJKLMNOPQ'), n_linhas)),
+        'Q025': pd.Categorical(gerador.choice(['A', 'B'], n_linhas, p=[0.1, 0.9])),
+        'NU_NOTA_MT': gerador.uniform(300, 900, n_linhas).astype('float32'),
+    })
+
+def main(n_linhas=5_000_000):
+    df, indice = particoes.ordenar(gerar(n_linhas))
+    inicio = time.perf_counter()
+    bitmaps = bitmap.IndiceBitmap.construir(df)
+    print(f"{n_linhas:,} linhas, dados {df.memory_usage(deep=True).sum() / 1024 ** 2:.0f} MB, "
+          f"bitmaps {bitmaps.nbytes / 1024 ** 2:.1f} MB construídos em {time.perf_counter() - inicio:.2f} s")
+
+    medir("UF: máscara", lambda: analise.separar_ufs_e_anos(df, ['SP'], [2019, 2020, 2021, 2022]))
+    medir("UF: índice de partições", lambda: analise.separar_ufs_e_anos(df, ['SP'], [2019, 2020, 2021, 2022], indice=indice))
+    medir("UF: bitmaps", lambda: analise.separar_ufs_e_anos(df, ['SP'], [2019, 2020, 2021, 2022], bitmaps=bitmaps))
+    medir("região: máscara", lambda: analise.separar_regiao(df, 'nordeste'))
+    medir("região: índice de partições", lambda: analise.separar_regiao(df, 'nordeste', indice=indice))
+
+    medir("SP, 2020, sem internet: máscara",
+          lambda: df[(df['SG_UF_PROVA'] == 'SP') & (df['NU_ANO'] == 2020) & (df['Q025'] == 'A')])
+    medir("SP, 2020, sem internet: bitmaps",
+          lambda: bitmaps.selecionar(df, bitmaps.igual('SG_UF_PROVA', 'SP') & bitmaps.igual('NU_ANO', 2020)
+                                     & bitmaps.igual('Q025', 'A')))
+    medir("RR, renda Q, cor 5: máscara",
+          lambda: df[(df['SG_UF_PROVA'] == 'RR') & (df['Q006'] == 'Q') & (df['TP_COR_RACA'] == 5)])
+    medir("RR, renda Q, cor 5: bitmaps",
+          lambda: bitmaps.selecionar(df, bitmaps.igual('SG_UF_PROVA', 'RR') & bitmaps.igual('Q006', 'Q')
+                                     & bitmaps.igual('TP_COR_RACA', 5)))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000)
@@ -0,0 +1,242 @@
+import numpy as np
+import pandas as pd
+
+# As linhas são divididas em contêineres de 2^16 posições. Um contêiner com poucas linhas
+# marcadas guarda as posições (uint16); um com muitas, um mapa de 2^16 bits. Contêineres sem
+# nenhuma linha não são guardados, e os com todas as linhas marcadas (comuns em dados agrupados
+# por `particoes.ordenar`) apontam todos para o mesmo mapa `_CHEIO`
+BITS_CONTEINER = 16
+TAMANHO_CONTEINER = 1 << BITS_CONTEINER
+LIMITE_POSICOES = 4096
+
+_CHEIO = np.full(TAMANHO_CONTEINER // 64, ~np.uint64(0))
+_CHEIO.flags.writeable = False
+
+# Colunas de baixa cardinalidade indexadas por padrão
+COLUNAS_INDEXADAS = ['NU_ANO', 'SG_UF_PROVA', 'Q025', 'Q006', 'TP_COR_RACA']
+
+def _para_bits(conteiner: np.ndarray) -> np.ndarray:
+    if conteiner.dtype == np.uint64:
+        return conteiner
+    mascara = np.zeros(TAMANHO_CONTEINER, dtype=bool)
+    mascara[conteiner] = True
+    return np.packbits(mascara, bitorder='little').view(np.uint64)
+
+def _posicoes_dos_bits(bits: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(bits.view(np.uint8), bitorder='little')).astype(np.uint16)
+
+def _compactar(bits: np.ndarray):
+    # Volta para a lista de posições quando ela ocupa menos que o mapa de bits; None se vazio
+    quantidade = int(np.bitwise_count(bits).sum())
+    if quantidade == 0:
+        return None
+    if quantidade == TAMANHO_CONTEINER:
+        return _CHEIO
+    return _posicoes_dos_bits(bits) if quantidade < LIMITE_POSICOES else bits
+
+class Bitmap:
+    """
+    Conjunto de posições de linha comprimido, com interseção (`&`), união (`|`) e complemento (`~`).
+
+    Parâmetros
+    ----------
+    conteineres : dict
+        Número do contêiner -> posições (uint16) ou mapa de bits (1024 uint64) dentro dele.
+    tamanho : int
+        Quantidade de linhas da tabela indexada.
+    """
+
+    def __init__(self, conteineres: dict, tamanho: int):
+        self.conteineres = conteineres
+        self.tamanho = tamanho
+
+    @classmethod
+    def de_posicoes(cls, posicoes: np.ndarray, tamanho: int) -> 'Bitmap':
+        """
+        Constrói o bitmap a partir das posições marcadas, em ordem crescente.
+        """
+        posicoes = np.asarray(posicoes, dtype=np.int64)
+        numeros, inicios = np.unique(posicoes >> BITS_CONTEINER, return_index=True)
+        fins = np.r_[inicios[1:], len(posicoes)]
+        conteineres = {}
+        for numero, inicio, fim in zip(numeros.tolist(), inicios.tolist(), fins.tolist()):
+            baixas = (posicoes[inicio:fim] & (TAMANHO_CONTEINER - 1)).astype(np.uint16)
+            if len(baixas) == TAMANHO_CONTEINER:
+                conteineres[numero] = _CHEIO
+            else:
+                conteineres[numero] = baixas if len(baixas) < LIMITE_POSICOES else _para_bits(baixas)
+        return cls(conteineres, tamanho)
+
+    @classmethod
+    def de_mascara(cls, mascara) -> 'Bitmap':
+        """
+        Constrói o bitmap das posições verdadeiras de uma máscara booleana.
+        """
+        mascara = np.asarray(mascara, dtype=bool)
+        return cls.de_posicoes(np.flatnonzero(mascara), len(mascara))
+
+    def __and__(self, outro: 'Bitmap') -> 'Bitmap':
+        conteineres = {}
+        for numero in self.conteineres.keys() & outro.conteineres.keys():
+            a, b = self.conteineres[numero], outro.conteineres[numero]
+            if a is _CHEIO or b is _CHEIO:
+                resultado = b if a is _CHEIO else a
+            elif a.dtype == np.uint16 and b.dtype == np.uint16:
+                resultado = np.intersect1d(a, b, assume_unique=True)
+                resultado = resultado if len(resultado) else None
+            elif a.dtype == np.uint16 or b.dtype == np.uint16:
+                posicoes, bits = (a, b) if a.dtype == np.uint16 else (b, a)
+                marcadas = (bits[posicoes >> 6] >> (posicoes & 63).astype(np.uint64)) & np.uint64(1)
+                resultado = posicoes[marcadas.astype(bool)]
+                resultado = resultado if len(resultado) else None
+            else:
+                resultado = _compactar(a & b)
+            if resultado is not None:
+                conteineres[numero] = resultado
+        return Bitmap(conteineres, self.tamanho)
+
+    def __or__(self, outro: 'Bitmap') -> 'Bitmap':
+        conteineres = dict(self.conteineres)
+        for numero, b in outro.conteineres.items():
+            a = conteineres.get(numero)
+            if a is None or b is _CHEIO:
+                conteineres[numero] = b
+            elif a is _CHEIO:
+                continue
+            elif a.dtype == np.uint16 and b.dtype == np.uint16 and len(a) + len(b) < LIMITE_POSICOES:
+                conteineres[numero] = np.union1d(a, b)
+            else:
+                conteineres[numero] = _compactar(_para_bits(a) | _para_bits(b))
+        return Bitmap(conteineres, self.tamanho)
+
+    def __invert__(self) -> 'Bitmap':
+        conteineres = {}
+        total = -(-self.tamanho // TAMANHO_CONTEINER)
+        for numero in range(total):
+            atual = self.conteineres.get(numero)
+            bits = ~_para_bits(atual) if atual is not None else _CHEIO
+            sobra = (numero + 1) * TAMANHO_CONTEINER - self.tamanho
+            if sobra > 0:
+                # Desmarca as posições depois do fim da tabela, no último contêiner
+                fim = np.zeros(TAMANHO_CONTEINER, dtype=bool)
+                fim[:TAMANHO_CONTEINER - sobra] = True
+                bits = bits & np.packbits(fim, bitorder='little').view(np.uint64)
+            resultado = _compactar(bits)
+            if resultado is not None:
+                conteineres[numero] = resultado
+        return Bitmap(conteineres, self.tamanho)
+
+    def posicoes(self) -> np.ndarray:
+        """
+        Posições marcadas, em ordem crescente.
+        """
+        partes = [(_posicoes_dos_bits(c) if c.dtype == np.uint64 else c).astype(np.int64) + (numero << BITS_CONTEINER)
+                  for numero, c in sorted(self.conteineres.items())]
+        return np.concatenate(partes) if partes else np.empty(0, dtype=np.int64)
+
+    def contar(self) -> int:
+        """
+        Quantidade de posições marcadas, sem descomprimir.
+        """
+        return sum(int(np.bitwise_count(c).sum()) if c.dtype == np.uint64 else len(c)
+                   for c in self.conteineres.values())
+
+    def mascara(self) -> np.ndarray:
+        """
+        Máscara booleana com `tamanho` posições.
+        """
+        mascara = np.zeros(self.tamanho, dtype=bool)
+        mascara[self.posicoes()] = True
+        return mascara
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.conteineres.values() if c is not _CHEIO)
+
+class IndiceBitmap:
+    """
+    Um `Bitmap` por valor de cada coluna de baixa cardinalidade de um DataFrame.
+
+    Construído uma vez no carregamento, permite combinar predicados como "SP e 2020 e sem
+    internet" com operações sobre os bitmaps, sem comparar colunas inteiras, e só então
+    selecionar as linhas.
+
+    Parâmetros
+    ----------
+    bitmaps : dict
+        Coluna -> {valor: Bitmap}.
+    tamanho : int
+        Quantidade de linhas do DataFrame indexado.
+    """
+
+    def __init__(self, bitmaps: dict, tamanho: int):
+        self.bitmaps = bitmaps
+        self.tamanho = tamanho
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame, colunas: list = None) -> 'IndiceBitmap':
+        """
+        Indexa as `colunas` de `df` (por padrão, as de `COLUNAS_INDEXADAS` presentes nele).
+
+        Exemplo
+        -------
+        >>> df = pd.DataFrame({'SG_UF_PROVA': ['SP', 'RJ', 'SP'], 'Q025': ['A', 'A', 'B']})
+        >>> indice = IndiceBitmap.construir(df)
+        >>> (indice.igual('SG_UF_PROVA', 'SP') & indice.igual('Q025', 'A')).posicoes().tolist()
+        [0]
+        """
+        if colunas is None:
+            colunas = [coluna for coluna in COLUNAS_INDEXADAS if coluna in df.columns]
+        bitmaps = {}
+        for coluna in colunas:
+            codigos, valores = pd.factorize(df[coluna], sort=True)
+            # Uma ordenação estável agrupa as posições de cada valor, já em ordem crescente;
+            # com códigos de 16 bits, o numpy a faz por radix sort, em tempo linear
+            if len(valores) < np.iinfo(np.int16).max:
+                codigos = codigos.astype(np.int16)
+            ordem = np.argsort(codigos, kind='stable')
+            contagens = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+            inicio = int((codigos < 0).sum())
+            bitmaps[coluna] = {}
+            for valor, contagem in zip(valores.tolist(), contagens.tolist()):
+                bitmaps[coluna][valor] = Bitmap.de_posicoes(ordem[inicio:inicio + contagem], len(df))
+                inicio += contagem
+        return cls(bitmaps, len(df))
+
+    def valores(self, coluna: str) -> set:
+        """
+        Valores presentes em `coluna`.
+        """
+        return set(self.bitmaps[coluna])
+
+    def igual(self, coluna: str, valor) -> Bitmap:
+        """
+        Linhas em que `coluna` é igual a `valor`.
+        """
+        return self.bitmaps[coluna].get(valor, Bitmap({}, self.tamanho))
+
+    def em(self, coluna: str, valores: list) -> Bitmap:
+        """
+        Linhas em que `coluna` está em `valores`.
+        """
+        resultado = Bitmap({}, self.tamanho)
+        for valor in valores:
+            resultado = resultado | self.igual(coluna, valor)
+        return resultado
+
+    def selecionar(self, df: pd.DataFrame, bitmap: Bitmap) -> pd.DataFrame:
+        """
+        Linhas de `df` marcadas em `bitmap`, na ordem original.
+
+        Raises
+        ------
+        ValueError
+            Se `df` não for o DataFrame indexado (a quantidade de linhas não bate).
+        """
+        if len(df) != self.tamanho:
+            raise ValueError("O índice não corresponde ao DataFrame fornecido.")
+        return df.iloc[bitmap.posicoes()]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bitmap.nbytes for valores in self.bitmaps.values() for bitmap in valores.values())
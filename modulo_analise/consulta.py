@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+# Filtros por valor nestas colunas viram os argumentos `anos` e `ufs` do leitor, que no dataset
+# Parquet são resolvidos pelos nomes dos diretórios das partições
+ARGUMENTOS_PARTICAO = {'NU_ANO': 'anos', 'SG_UF_PROVA': 'ufs'}
+
+def ler_dataframe(df: pd.DataFrame):
+    """
+    Cria um leitor para `Consulta` a partir de um DataFrame já carregado.
+
+    O leitor aplica os mesmos filtros que o leitor do dataset Parquet, mas com máscaras sobre
+    `df`. Sem filtros e sem projeção, retorna o próprio `df`, sem copiá-lo.
+    """
+    def leitor(colunas: list = None, anos: list = None, ufs: list = None, notas: dict = None) -> pd.DataFrame:
+        mascara = np.ones(len(df), dtype=bool)
+        if anos is not None:
+            mascara &= df['NU_ANO'].isin(anos).to_numpy()
+        if ufs is not None:
+            mascara &= df['SG_UF_PROVA'].isin(ufs).to_numpy()
+        for coluna, (minimo, maximo) in (notas or {}).items():
+            if minimo is not None:
+                mascara &= (df[coluna] >= minimo).to_numpy(dtype=bool, na_value=False)
+            if maximo is not None:
+                mascara &= (df[coluna] <= maximo).to_numpy(dtype=bool, na_value=False)
+        dados = df if colunas is None else df[colunas]
+        return dados if mascara.all() else dados[mascara]
+    return leitor
+
+class Consulta:
+    """
+    Consulta preguiçosa sobre os dados filtrados: cada passo só acrescenta ao plano, que é
+    otimizado e executado de uma vez por `coletar`.
+
+    Ao executar, os filtros por ano, UF e faixa de nota são passados ao leitor, que no dataset
+    Parquet nem abre as partições e grupos de linhas descartados; só as colunas usadas pelo
+    resultado, pelos filtros restantes e pelas colunas derivadas são lidas; os demais filtros
+    sobre colunas lidas são aplicados antes de qualquer coluna derivada, que só é calculada para
+    as linhas que sobraram; e derivadas que o resultado não usa não são calculadas.
+
+    Como os filtros e as derivações mudam de ordem, a função de cada derivação deve calcular
+    cada linha só a partir dela mesma.
+
+    Parâmetros
+    ----------
+    leitor : callable
+        Função `leitor(colunas=None, anos=None, ufs=None, notas=None)` que retorna um DataFrame,
+        como `armazenamento.ler_dataset` (do filter) com a raiz fixada, ou `ler_dataframe(df)`.
+    catalogo : dict, opcional
+        Catálogo dos dados do leitor, usado pelas funções de `analise` para validar UFs e anos.
+
+    Exemplo
+    -------
+    >>> import pandas as pd
+    >>> df = pd.DataFrame({'SG_UF_PROVA': ['SP', 'RJ', 'SP'], 'NU_ANO': [2020, 2020, 2021],
+    ...                    'NU_NOTA_MT': [500.0, 600.0, 700.0]})
+    >>> consulta = (Consulta.de_dataframe(df).filtrar('SG_UF_PROVA', ['SP'])
+    ...             .derivar('dobro', lambda d: d['NU_NOTA_MT'] * 2, ['NU_NOTA_MT']))
+    >>> consulta.selecionar(['NU_ANO', 'dobro']).coletar()
+       NU_ANO   dobro
+    0    2020  1000.0
+    2    2021  1400.0
+    """
+
+    def __init__(self, leitor, catalogo: dict = None):
+        self.leitor = leitor
+        self.catalogo = catalogo
+        self._passos = ()
+        self._colunas = None
+        self._agrupamento = None
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, catalogo: dict = None) -> 'Consulta':
+        """
+        Cria uma consulta sobre um DataFrame já carregado. Veja `ler_dataframe`.
+        """
+        return cls(ler_dataframe(df), catalogo)
+
+    def _com(self, passo: tuple = None, colunas: list = None, agrupamento: tuple = None) -> 'Consulta':
+        # Cada passo retorna uma nova consulta, e a original pode continuar sendo usada
+        if self._agrupamento is not None:
+            raise ValueError("A consulta já foi agrupada; o agrupamento deve ser o último passo.")
+        nova = Consulta(self.leitor, self.catalogo)
+        nova._passos = self._passos + ((passo,) if passo is not None else ())
+        nova._colunas = self._colunas if colunas is None else list(colunas)
+        nova._agrupamento = agrupamento
+        return nova
+
+    def filtrar(self, coluna: str, valores: list) -> 'Consulta':
+        """
+        Mantém as linhas com `coluna` em `valores`.
+        """
+        valores = list(valores)
+        if coluna == 'SG_UF_PROVA':
+            valores = [uf.upper() for uf in valores]
+        return self._com(('valores', coluna, valores))
+
+    def filtrar_faixa(self, coluna: str, minimo: float = None, maximo: float = None) -> 'Consulta':
+        """
+        Mantém as linhas com `coluna` entre `minimo` e `maximo`, inclusivos; None deixa o lado aberto.
+        Linhas com `coluna` ausente são descartadas.
+        """
+        return self._com(('faixa', coluna, (minimo, maximo)))
+
+    def derivar(self, nome: str, funcao, colunas: list) -> 'Consulta':
+        """
+        Acrescenta a coluna `nome`, calculada por `funcao(df)` a partir das `colunas`.
+        """
+        return self._com(('derivar', nome, (funcao, list(colunas))))
+
+    def selecionar(self, colunas: list) -> 'Consulta':
+        """
+        Restringe o resultado às `colunas`, lidas ou derivadas.
+        """
+        return self._com(colunas=colunas)
+
+    def agrupar(self, por: list, **agregacoes) -> 'Consulta':
+        """
+        Agrupa o resultado por `por` com agregações nomeadas, como em `DataFrame.agg`.
+
+        Exemplo
+        -------
+        >>> consulta.agrupar(['SG_UF_PROVA'], media_mt=('NU_NOTA_MT', 'mean'))  # doctest: +SKIP
+        """
+        return self._com(agrupamento=(list(por), agregacoes))
+
+    def plano(self) -> dict:
+        """
+        Monta o plano otimizado que `coletar` executa.
+
+        Retorna
+        -------
+        dict
+            'leitura': argumentos do leitor (colunas, anos, ufs e notas); 'filtros': filtros
+            aplicados logo após a leitura; 'derivados': lista de (nome, filtros aplicados logo
+            depois dele), na ordem de cálculo; 'colunas' e 'agrupamento': o passo final.
+        """
+        # Ida: cada filtro fica logo após a última derivação da sua coluna que o precede, ou
+        # vira um filtro da leitura se a coluna não foi derivada antes dele
+        leitura = {'anos': None, 'ufs': None, 'notas': {}}
+        filtros = []
+        derivados = []
+        ultima_derivacao = {}
+        for tipo, coluna, argumento in self._passos:
+            if tipo == 'derivar':
+                ultima_derivacao[coluna] = len(derivados)
+                derivados.append((coluna, argumento[0], argumento[1], []))
+            elif coluna in ultima_derivacao:
+                derivados[ultima_derivacao[coluna]][3].append((tipo, coluna, argumento))
+            elif tipo == 'valores' and coluna in ARGUMENTOS_PARTICAO:
+                chave = ARGUMENTOS_PARTICAO[coluna]
+                anteriores = leitura[chave]
+                leitura[chave] = argumento if anteriores is None else [v for v in anteriores if v in argumento]
+            elif tipo == 'faixa':
+                minimo, maximo = leitura['notas'].get(coluna, (None, None))
+                novo_minimo, novo_maximo = argumento
+                if novo_minimo is not None:
+                    minimo = novo_minimo if minimo is None else max(minimo, novo_minimo)
+                if novo_maximo is not None:
+                    maximo = novo_maximo if maximo is None else min(maximo, novo_maximo)
+                leitura['notas'][coluna] = (minimo, maximo)
+            else:
+                filtros.append((tipo, coluna, argumento))
+
+        if self._agrupamento is not None:
+            por, agregacoes = self._agrupamento
+            saida = list(dict.fromkeys(por + [coluna for coluna, _ in agregacoes.values()]))
+        else:
+            saida = self._colunas
+
+        # Volta: descarta as derivações que ninguém usa e acumula as colunas a ler
+        necessarias = None if saida is None else set(saida)
+        mantidos = []
+        for nome, funcao, entradas, filtros_derivado in reversed(derivados):
+            if necessarias is not None and nome not in necessarias and not filtros_derivado:
+                continue
+            mantidos.append((nome, funcao, entradas, filtros_derivado))
+            if necessarias is not None:
+                necessarias.discard(nome)
+                necessarias.update(entradas)
+                necessarias.update(coluna for _, coluna, _ in filtros_derivado if coluna != nome)
+        mantidos.reverse()
+        if necessarias is not None:
+            necessarias.update(coluna for _, coluna, _ in filtros)
+            # Ordem estável: a da saída, seguida das entradas na ordem em que aparecem
+            ordem = list(saida) + [c for _, _, entradas, _ in mantidos for c in entradas] + [c for _, c, _ in filtros]
+            necessarias = [coluna for coluna in dict.fromkeys(ordem) if coluna in necessarias]
+
+        leitura['colunas'] = necessarias
+        leitura['notas'] = leitura['notas'] or None
+        return {'leitura': leitura, 'filtros': filtros, 'derivados': mantidos,
+                'colunas': self._colunas, 'agrupamento': self._agrupamento}
+
+    def coletar(self) -> pd.DataFrame:
+        """
+        Executa o plano de `plano` e retorna o resultado.
+        """
+        plano = self.plano()
+        df = self.leitor(**plano['leitura'])
+        df = _aplicar_filtros(df, plano['filtros'])
+        for nome, funcao, _, filtros in plano['derivados']:
+            df = _aplicar_filtros(df.assign(**{nome: funcao(df)}), filtros)
+
+        if plano['agrupamento'] is not None:
+            por, agregacoes = plano['agrupamento']
+            return df.groupby(por, observed=True).agg(**agregacoes).reset_index()
+        if plano['colunas'] is not None:
+            return df[plano['colunas']]
+        return df
+
+def _aplicar_filtros(df: pd.DataFrame, filtros: list) -> pd.DataFrame:
+    if not filtros:
+        return df
+    mascara = np.ones(len(df), dtype=bool)
+    for tipo, coluna, argumento in filtros:
+        if tipo == 'valores':
+            mascara &= df[coluna].isin(argumento).to_numpy()
+        else:
+            minimo, maximo = argumento
+            if minimo is not None:
+                mascara &= (df[coluna] >= minimo).to_numpy(dtype=bool, na_value=False)
+            if maximo is not None:
+                mascara &= (df[coluna] <= maximo).to_numpy(dtype=bool, na_value=False)
+    return df[mascara]
@@ -0,0 +1,283 @@
+import numpy as np
+import pandas as pd
+
+# Regiões da coluna 'Região' e de analise.calcular_medias_regiao_ano, que ao contrário de particoes.REGIOES incluem o DF
+MAPEAMENTO_REGIOES = {
+    'Norte': ['AC', 'AM', 'AP', 'PA', 'RO', 'RR', 'TO'],
+    'Nordeste': ['AL', 'BA', 'CE', 'MA', 'PB', 'PE', 'PI', 'RN', 'SE'],
+    'Sudeste': ['ES', 'MG', 'RJ', 'SP'],
+    'Sul': ['PR', 'RS', 'SC'],
+    'Centro-Oeste': ['DF', 'GO', 'MT', 'MS']
+}
+REGIAO_DA_UF = {estado: regiao for regiao, estados in MAPEAMENTO_REGIOES.items() for estado in estados}
+
+NOTAS = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
+
+# Versão da fórmula de cada coluna derivada. Este módulo é o único lugar das fórmulas: a filtragem
+# (filter_main) grava as colunas com estas versões em `df.attrs['versoes_derivadas']`, e analise só
+# reaproveita as gravadas com a versão atual. Ao mudar uma fórmula, incremente a versão dela aqui
+VERSOES = {'media': 1, 'Renda_Per_Capita': 2, 'Região': 1}
+
+# Salário mínimo de cada edição do ENEM. As faixas de renda da Q006 são múltiplos dele, então os
+# limites de cada faixa mudam de um ano para o outro. Para um ano novo, acrescente o salário aqui
+SALARIO_MINIMO = {2019: 998.00, 2020: 1045.00, 2021: 1100.00, 2022: 1212.00}
+# Ano cujas faixas valem para os dados sem a coluna NU_ANO
+ANO_PADRAO_RENDA = 2019
+
+LETRAS_Q006 = list('ABCDEFGHIJKLMNOPQ')
+# Limites das faixas B a P, em salários mínimos. A faixa A é "nenhuma renda", e a Q vai de
+# 20 salários mais R$ 1,00 até R$ 50.000,00
+LIMITES_Q006 = [0, 1, 1.5, 2, 2.5, 3, 4, 5, 6, 7, 8, 9, 10, 12, 15, 20]
+
+# Linhas processadas de cada vez por `media_por_participante`: os temporários de um bloco cabem
+# no cache do processador, e nenhum tem o tamanho do DataFrame
+LINHAS_POR_BLOCO = 64 * 1024
+
+def _codigos_q006(q006: pd.Series) -> np.ndarray:
+    # Posição de cada resposta em LETRAS_Q006, ou -1 se ausente ou desconhecida. Com a Q006 como
+    # categoria, basta traduzir as categorias, sem olhar as linhas
+    if isinstance(q006.dtype, pd.CategoricalDtype):
+        posicoes = pd.Index(LETRAS_Q006).get_indexer(q006.cat.categories)
+        return np.append(posicoes, -1)[q006.cat.codes.to_numpy()]
+    return pd.Categorical(q006, categories=LETRAS_Q006).codes
+
+def _indices_de_ano(df: pd.DataFrame, anos: np.ndarray) -> np.ndarray:
+    # Linha da tabela de faixas de cada participante, pela posição do seu NU_ANO em `anos`
+    if 'NU_ANO' not in df.columns:
+        return np.full(len(df), np.searchsorted(anos, ANO_PADRAO_RENDA))
+    coluna = df['NU_ANO']
+    if isinstance(coluna.dtype, np.dtype) and coluna.dtype.kind in 'iu' and len(coluna):
+        # Com o ano inteiro, como no esquema, a linha sai de uma tabela indexada pela distância
+        # ao primeiro ano, sem busca. Anos fora da tabela seguem pelo caminho geral, que os aponta
+        ano = coluna.to_numpy()
+        if anos[0] <= ano.min() and ano.max() <= anos[-1]:
+            linha_do_ano = np.full(anos[-1] - anos[0] + 1, -1)
+            linha_do_ano[anos - anos[0]] = np.arange(len(anos))
+            indices = linha_do_ano[ano - anos[0]]
+            if (indices >= 0).all():
+                return indices
+    ano = _como_float(coluna)
+    indices = np.minimum(np.searchsorted(anos, ano), len(anos) - 1)
+    desconhecidos = anos[indices] != ano
+    if desconhecidos.any():
+        raise ValueError(f"Sem salário mínimo em SALARIO_MINIMO para os anos {sorted(set(ano[desconhecidos].tolist()))}.")
+    return indices
+
+def _como_float(serie: pd.Series) -> np.ndarray:
+    # Colunas float do NumPy (as notas float32 do esquema) são lidas sem cópia
+    if isinstance(serie.dtype, np.dtype) and serie.dtype.kind == 'f':
+        return serie.to_numpy()
+    return serie.to_numpy(dtype='float64', na_value=np.nan)
+
+def _checar_saida(out: np.ndarray, linhas: int):
+    if out.shape != (linhas,):
+        raise ValueError(f"O buffer de saída deve ter uma posição por linha ({linhas}), e não o formato {out.shape}.")
+
+def media_por_participante(df: pd.DataFrame, out: np.ndarray = None) -> pd.Series:
+    """
+    Calcula a média das cinco notas de cada participante, ignorando as ausentes, sem modificar nem copiar `df`.
+
+    As notas são lidas direto dos arrays do DataFrame e somadas em blocos de `LINHAS_POR_BLOCO`
+    linhas, sem montar uma matriz com as cinco colunas.
+
+    Parâmetros
+    ----------
+    df : pd.DataFrame
+        DataFrame com as colunas NU_NOTA_*.
+    out : np.ndarray, opcional
+        Buffer pré-alocado, com uma posição por linha, onde as médias são escritas. Se omitido,
+        um novo array é criado, float32 se todas as notas forem float32 e float64 caso contrário.
+
+    Retorna
+    -------
+    pd.Series
+        As médias, com o índice de `df` e o nome 'media'. Com `out`, a Series usa o próprio buffer.
+
+    Raises
+    ------
+    ValueError
+        Se faltar alguma coluna de nota ou se `out` não tiver uma posição por linha.
+
+    Exemplo
+    -------
+    >>> df = pd.DataFrame({'NU_NOTA_CN': [500.0, None], 'NU_NOTA_CH': 600.0, 'NU_NOTA_LC': 700.0,
+    ...                    'NU_NOTA_MT': 800.0, 'NU_NOTA_REDACAO': 900.0})
+    >>> media_por_participante(df).tolist()
+    [700.0, 750.0]
+    """
+    if not set(NOTAS).issubset(df.columns):
+        raise ValueError("O DataFrame deve conter as colunas necessárias para o cálculo da média.")
+    notas = [_como_float(df[coluna]) for coluna in NOTAS]
+    linhas = len(df)
+    if out is None:
+        tipo = np.float32 if all(valores.dtype == np.float32 for valores in notas) else np.float64
+        out = np.empty(linhas, dtype=tipo)
+    _checar_saida(out, linhas)
+
+    for inicio in range(0, linhas, LINHAS_POR_BLOCO):
+        fim = min(inicio + LINHAS_POR_BLOCO, linhas)
+        soma = np.zeros(fim - inicio)
+        presentes = np.zeros(fim - inicio)
+        for valores in notas:
+            bloco = valores[inicio:fim]
+            presente = ~np.isnan(bloco)
+            soma += np.where(presente, bloco, 0.0)
+            presentes += presente
+        # Sem nenhuma nota, 0/0 dá NaN, como em DataFrame.mean
+        with np.errstate(invalid='ignore'):
+            out[inicio:fim] = soma / presentes
+    return pd.Series(out, index=df.index, name='media', copy=False)
+
+def faixas_de_renda(ano: int) -> dict:
+    """
+    Retorna os limites, em reais, de cada faixa de renda familiar da Q006 no ano dado.
+
+    Parâmetros
+    ----------
+    ano : int
+        Ano do ENEM, uma das chaves de `SALARIO_MINIMO`.
+
+    Retorna
+    -------
+    dict
+        (mínimo, máximo) de cada letra de `LETRAS_Q006`.
+
+    Raises
+    ------
+    ValueError
+        Se não houver salário mínimo registrado para o ano.
+
+    Exemplo
+    -------
+    >>> faixas_de_renda(2019)['C'], faixas_de_renda(2022)['C']
+    ((998.0, 1497.0), (1212.0, 1818.0))
+    """
+    if ano not in SALARIO_MINIMO:
+        raise ValueError(f"Sem salário mínimo em SALARIO_MINIMO para o ano {ano}.")
+    limites = [multiplo * SALARIO_MINIMO[ano] for multiplo in LIMITES_Q006]
+    faixas = {'A': (0.0, 0.0)}
+    faixas.update({letra: (minimo, maximo) for letra, minimo, maximo in zip(LETRAS_Q006[1:-1], limites[:-1], limites[1:])})
+    faixas['Q'] = (limites[-1] + 1, 50000.00)
+    return faixas
+
+def tabela_de_renda() -> tuple:
+    """
+    Retorna a tabela dos valores médios das faixas da Q006, com uma linha por ano de `SALARIO_MINIMO`.
+
+    Retorna
+    -------
+    tuple
+        Os anos, em ordem, e um array com uma linha por ano e uma coluna por letra de `LETRAS_Q006`,
+        mais uma última coluna NaN para as respostas ausentes ou desconhecidas.
+    """
+    anos = np.array(sorted(SALARIO_MINIMO))
+    tabela = np.array([[sum(faixa) / 2 for faixa in faixas_de_renda(ano).values()] + [np.nan] for ano in anos])
+    return anos, tabela
+
+def renda_familiar(df: pd.DataFrame) -> np.ndarray:
+    """
+    Decodifica a Q006 de cada participante no valor médio da sua faixa de renda, no ano da linha.
+
+    A renda de todas as linhas sai de uma única indexação de `tabela_de_renda()` pelos anos e pelos
+    códigos das letras; com a Q006 como categoria, sem converter os rótulos. Sem a coluna NU_ANO,
+    valem as faixas de `ANO_PADRAO_RENDA`.
+
+    Raises
+    ------
+    ValueError
+        Se algum ano não estiver em `SALARIO_MINIMO`.
+
+    Exemplo
+    -------
+    >>> renda_familiar(pd.DataFrame({'NU_ANO': [2019, 2022], 'Q006': ['C', 'C']})).tolist()
+    [1247.5, 1515.0]
+    """
+    anos, tabela = tabela_de_renda()
+    return tabela[_indices_de_ano(df, anos), _codigos_q006(df['Q006'])]
+
+def renda_per_capita(df: pd.DataFrame, out: np.ndarray = None) -> pd.Series:
+    """
+    Calcula a renda per capita familiar de cada participante, sem modificar `df`.
+
+    A renda familiar é o valor médio da faixa de renda respondida na Q006, dividido pela
+    quantidade de moradores da Q005. As faixas são as do ano de cada linha, decodificadas por
+    `renda_familiar`, ou as de `ANO_PADRAO_RENDA` se `df` não tiver a coluna NU_ANO.
+
+    Parâmetros
+    ----------
+    df : pd.DataFrame
+        DataFrame com as colunas "Q006" (letras) e "Q005" (números), e opcionalmente "NU_ANO".
+    out : np.ndarray, opcional
+        Buffer float64 pré-alocado, com uma posição por linha, onde as rendas são escritas.
+
+    Retorna
+    -------
+    pd.Series
+        As rendas, com o índice de `df` e o nome 'Renda_Per_Capita'; NaN onde a Q006 não é uma
+        faixa conhecida ou a Q005 está ausente.
+
+    Raises
+    ------
+    ValueError
+        Se o DataFrame não contiver as colunas "Q006" e "Q005", se algum ano não estiver em
+        `SALARIO_MINIMO`, ou se `out` não tiver uma posição por linha.
+    TypeError
+        Se a Q005 não for numérica.
+    """
+    if 'Q006' not in df.columns or 'Q005' not in df.columns:
+        raise ValueError("O DataFrame deve conter as colunas 'Q006' e 'Q005'.")
+    if not pd.api.types.is_numeric_dtype(df['Q005']):
+        raise TypeError("A coluna 'Q005' deve ser numérica.")
+
+    if out is None:
+        out = np.empty(len(df), dtype=np.float64)
+    _checar_saida(out, len(df))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(renda_familiar(df), _como_float(df['Q005']), out=out)
+    return pd.Series(out, index=df.index, name='Renda_Per_Capita', copy=False)
+
+def regiao(df: pd.DataFrame) -> pd.Series:
+    """
+    Retorna a região da UF da prova de cada participante, com o nome 'Região'; NaN para UFs desconhecidas.
+    """
+    if 'SG_UF_PROVA' not in df.columns:
+        raise ValueError("O DataFrame deve conter a coluna 'SG_UF_PROVA'.")
+    return df['SG_UF_PROVA'].astype(str).map(REGIAO_DA_UF).rename('Região')
+
+# Coluna derivada -> (função que a calcula, colunas de que ela depende)
+DERIVADAS = {'media': (media_por_participante, NOTAS),
+             'Renda_Per_Capita': (renda_per_capita, ['Q006', 'Q005']),
+             'Região': (regiao, ['SG_UF_PROVA'])}
+
+def adicionar_derivadas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Acrescenta a `df` as colunas derivadas cujas entradas ele tem, sem modificá-lo.
+
+    As versões das fórmulas usadas ficam em `attrs['versoes_derivadas']` do resultado. É assim que
+    a filtragem grava as colunas, e que analise sabe se pode reaproveitá-las.
+
+    Parâmetros
+    ----------
+    df : pd.DataFrame
+        Os participantes.
+
+    Retorna
+    -------
+    pd.DataFrame
+        Um novo DataFrame com as colunas de `df` seguidas das derivadas.
+
+    Exemplo
+    -------
+    >>> df = pd.DataFrame({'SG_UF_PROVA': ['SP', 'AM'], 'Q006': ['B', 'C'], 'Q005': [1, 2]})
+    >>> derivado = adicionar_derivadas(df)
+    >>> derivado[['Renda_Per_Capita', 'Região']]
+       Renda_Per_Capita   Região
+    0            499.00  Sudeste
+    1            623.75    Norte
+    >>> derivado.attrs['versoes_derivadas']
+    {'Renda_Per_Capita': 2, 'Região': 1}
+    """
+    colunas = {nome: funcao(df) for nome, (funcao, entradas) in DERIVADAS.items() if set(entradas).issubset(df.columns)}
+    derivado = df.assign(**colunas)
+    derivado.attrs['versoes_derivadas'] = {nome: VERSOES[nome] for nome in colunas}
+    return derivado
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+# As notas do ENEM vão de 0 a 1000 com uma casa decimal: uma posição por décimo
+DECIMOS_POR_PONTO = 10
+POSICOES = 1000 * DECIMOS_POR_PONTO + 1
+
+def _posicao(nota: float, arredondar) -> int:
+    # Posição do histograma de uma nota, arredondada com `arredondar` (np.ceil para um mínimo,
+    # np.floor para um máximo). O round desfaz o erro de representar décimos em binário
+    return int(arredondar(round(nota * DECIMOS_POR_PONTO, 6)))
+
+class Histogramas:
+    """
+    Histogramas exatos de notas, um por grupo e por coluna de nota, acumulados bloco a bloco.
+
+    Cada nota é contada na posição do seu décimo (0 a 10000), sem arredondamento: as notas do
+    ENEM têm no máximo uma casa decimal, e cada uma é exatamente um décimo. As notas fora da
+    escala de 0 a 1000 não entram nos histogramas e são contadas à parte, em `fora`. A contagem
+    é feita com uma única passada de `np.bincount` por coluna, para todos os grupos de uma vez.
+    Depois disso, qualquer contagem por faixa de nota ("redações 1000", "MT a partir de 900")
+    sai das somas acumuladas do histograma, sem voltar aos dados. Como em `agregadores`, dois
+    resumos se juntam com `combinar`, em qualquer ordem.
+
+    Parâmetros
+    ----------
+    indice : pd.Index, opcional
+        Os grupos, na ordem das linhas de `contagens`.
+    notas : list, opcional
+        As colunas de nota, na ordem da segunda dimensão de `contagens`.
+    contagens : np.ndarray, opcional
+        Array int64 de forma (grupos, notas, POSICOES).
+    fora : np.ndarray, opcional
+        Array int64 de forma (grupos, notas) com as notas fora da escala de cada grupo (e, com
+        `exatas=False`, também as que não são um décimo exato).
+
+    Exemplo
+    -------
+    >>> df = pd.DataFrame({'NU_ANO': [2019, 2019, 2020], 'NU_NOTA_MT': [900.0, 512.3, 950.5]})
+    >>> Histogramas.de_dataframe(df, ['NU_ANO'], ['NU_NOTA_MT']).contar('NU_NOTA_MT', minimo=900)
+    NU_ANO
+    2019    1
+    2020    1
+    Name: NU_NOTA_MT, dtype: int64
+    """
+
+    def __init__(self, indice: pd.Index = None, notas: list = None, contagens: np.ndarray = None,
+                 fora: np.ndarray = None):
+        self.indice = indice
+        self.notas = notas
+        self.contagens = contagens
+        if fora is None and contagens is not None:
+            fora = np.zeros(contagens.shape[:2], dtype=np.int64)
+        self.fora = fora
+        self._acumulado = None
+
+    @classmethod
+    def de_dataframe(cls, df: pd.DataFrame, por: list, notas: list, exatas: bool = True) -> 'Histogramas':
+        """
+        Conta as `notas` de `df` em cada grupo de `por`. Notas ausentes e linhas com algum valor de
+        `por` ausente não são contadas, e as notas fora da escala vão para `fora`. Com
+        `exatas=False`, as notas com mais de uma casa decimal também vão para `fora`.
+
+        Raises
+        ------
+        ValueError
+            Se `exatas` e alguma nota tiver mais de uma casa decimal, e portanto não couber
+            exatamente num décimo.
+        """
+        agrupado = df.groupby(list(por), observed=True, sort=True)
+        indice = agrupado.size().index
+        grupos = agrupado.ngroup().to_numpy(dtype='float64', na_value=np.nan)
+        com_grupo = ~np.isnan(grupos)
+        grupos = grupos.astype(np.int64)
+
+        contagens = np.empty((len(indice), len(notas), POSICOES), dtype=np.int64)
+        fora = np.empty((len(indice), len(notas)), dtype=np.int64)
+        for k, nota in enumerate(notas):
+            valores = df[nota].to_numpy()
+            if not (isinstance(valores.dtype, np.dtype) and valores.dtype.kind == 'f'):
+                valores = df[nota].to_numpy(dtype='float64', na_value=np.nan)
+            presentes = com_grupo & ~np.isnan(valores)
+            valores = valores[presentes]
+            posicoes = np.rint(valores * DECIMOS_POR_PONTO)
+            # Comparado no tipo da coluna: 512.3 em float32 é o float32 mais próximo de 5123 / 10
+            nos_decimos = (posicoes / DECIMOS_POR_PONTO).astype(valores.dtype) == valores
+            if exatas and not nos_decimos.all():
+                raise ValueError(f"A coluna '{nota}' tem notas com mais de uma casa decimal.")
+            posicoes = posicoes.astype(np.int64)
+            na_escala = nos_decimos & (posicoes >= 0) & (posicoes < POSICOES)
+            grupos_nota = grupos[presentes]
+            fora[:, k] = np.bincount(grupos_nota[~na_escala], minlength=len(indice))
+            # O grupo e a posição formam um único índice, e uma passada conta todos os grupos
+            contagens[:, k, :] = np.bincount(grupos_nota[na_escala] * POSICOES + posicoes[na_escala],
+                                             minlength=len(indice) * POSICOES).reshape(len(indice), POSICOES)
+        return cls(indice, list(notas), contagens, fora)
+
+    def combinar(self, outro: 'Histogramas') -> 'Histogramas':
+        """
+        Retorna os histogramas da união dos dois resumos, grupo a grupo.
+
+        Raises
+        ------
+        ValueError
+            Se os dois resumos não tiverem as mesmas colunas de nota.
+        """
+        if self.indice is None or outro.indice is None:
+            return outro if self.indice is None else self
+        if self.notas != outro.notas:
+            raise ValueError(f"Os histogramas devem ter as mesmas notas: {self.notas} e {outro.notas}.")
+        indice = self.indice.union(outro.indice)
+        contagens = np.zeros((len(indice), len(self.notas), POSICOES), dtype=np.int64)
+        fora = np.zeros((len(indice), len(self.notas)), dtype=np.int64)
+        for resumo in (self, outro):
+            linhas = indice.get_indexer(resumo.indice)
+            contagens[linhas] += resumo.contagens
+            fora[linhas] += resumo.fora
+        return Histogramas(indice, self.notas, contagens, fora)
+
+    def atualizar(self, df: pd.DataFrame, por: list, notas: list, exatas: bool = True) -> 'Histogramas':
+        """
+        Acrescenta um bloco a este resumo e o retorna. Veja `de_dataframe`.
+        """
+        combinado = self.combinar(Histogramas.de_dataframe(df, por, notas, exatas))
+        self.indice, self.notas, self.contagens, self.fora = combinado.indice, combinado.notas, combinado.contagens, combinado.fora
+        self._acumulado = None
+        return self
+
+    def contar(self, nota: str, minimo: float = None, maximo: float = None) -> pd.Series:
+        """
+        Quantidade de notas entre `minimo` e `maximo`, inclusive, em cada grupo.
+
+        As somas acumuladas são calculadas na primeira consulta e reaproveitadas nas seguintes, e
+        cada contagem é a diferença de duas posições delas, qualquer que seja a faixa.
+
+        Parâmetros
+        ----------
+        nota : str
+            Uma das colunas de nota do resumo.
+        minimo, maximo : float, opcional
+            Limites da faixa; sem eles, a faixa começa em 0 ou vai até 1000.
+
+        Retorna
+        -------
+        pd.Series
+            As contagens, indexadas pelos grupos e com o nome da nota.
+
+        Raises
+        ------
+        KeyError
+            Se `nota` não for uma das colunas do resumo.
+        """
+        if self.indice is None:
+            return pd.Series(dtype=np.int64, name=nota)
+        if nota not in self.notas:
+            raise KeyError(f"A nota '{nota}' não está nos histogramas: {self.notas}.")
+        if self._acumulado is None:
+            # Um zero à esquerda faz a contagem até a posição p ser acumulado[..., p + 1]
+            self._acumulado = np.zeros(self.contagens.shape[:2] + (POSICOES + 1,), dtype=np.int64)
+            np.cumsum(self.contagens, axis=-1, out=self._acumulado[..., 1:])
+        inicio = 0 if minimo is None else max(_posicao(minimo, np.ceil), 0)
+        fim = POSICOES - 1 if maximo is None else min(_posicao(maximo, np.floor), POSICOES - 1)
+        acumulado = self._acumulado[:, self.notas.index(nota)]
+        if fim < inicio:
+            contagens = np.zeros(len(self.indice), dtype=np.int64)
+        else:
+            contagens = acumulado[:, fim + 1] - acumulado[:, inicio]
+        return pd.Series(contagens, index=self.indice, name=nota)
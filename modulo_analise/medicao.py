@@ -0,0 +1,36 @@
+import time
+
+def medir(descricao: str, funcao, linhas: int = None, repeticoes: int = 1, largura: int = 32) -> float:
+    """
+    Executa `funcao` `repeticoes` vezes, imprime o tempo médio de uma execução e o retorna.
+
+    Usado pelos scripts benchmark_*.py da filtragem e da análise.
+
+    Parâmetros
+    ----------
+    descricao : str
+        Rótulo da linha impressa.
+    funcao : callable
+        Função sem argumentos a medir.
+    linhas : int, opcional
+        Linhas processadas por execução. Com ele, imprime segundos e linhas por segundo; sem
+        ele, milissegundos e a quantidade de linhas do resultado da última execução.
+    repeticoes : int
+        Quantidade de execuções, das quais é tirada a média.
+    largura : int
+        Largura da coluna do rótulo.
+
+    Retorna
+    -------
+    float
+        Duração média de uma execução, em segundos.
+    """
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    duracao = (time.perf_counter() - inicio) / repeticoes
+    if linhas is not None:
+        print(f"{descricao:<{largura}} {duracao:8.2f} s {linhas / duracao:14,.0f} linhas/s")
+    else:
+        print(f"{descricao:<{largura}} {duracao * 1000:10.2f} ms {len(resultado):>10,} linhas")
+    return duracao
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# Estados de cada região, na ordem em que os dados são agrupados por `ordenar`
+REGIOES = {"norte": ["AM", "RR", "AP", "PA", "TO", "RO", "AC"],
+           "nordeste": ["MA", "PI", "CE", "RN", "PE", "PB", "SE", "AL", "BA"],
+           "centro_oeste": ["MT", "MS", "GO"],
+           "sudeste": ["SP", "RJ", "ES", "MG"],
+           "sul": ["PR", "SC", "RS"]}
+
+# Ordem das UFs nos dados ordenados: cada região fica contígua. O DF não está em nenhuma
+# das regiões acima e fica entre o Centro-Oeste e o Sudeste
+ORDEM_UFS = (REGIOES["norte"] + REGIOES["nordeste"] + REGIOES["centro_oeste"] + ["DF"]
+             + REGIOES["sudeste"] + REGIOES["sul"])
+
+def _chaves(df: pd.DataFrame) -> np.ndarray:
+    # Posição da UF em ORDEM_UFS (-1 se ausente) e ano, numa só chave inteira ordenável
+    codigos = pd.Categorical(df['SG_UF_PROVA'], categories=ORDEM_UFS).codes.astype(np.int64)
+    return codigos * 100_000 + df['NU_ANO'].to_numpy(dtype=np.int64)
+
+class IndiceParticoes:
+    """
+    Início e fim das linhas de cada par (UF, ano) num DataFrame agrupado por `ordenar`.
+
+    Com os dados agrupados por UF (na ordem das regiões) e, dentro de cada UF, por ano, uma UF
+    em todos os anos e uma região inteira são intervalos contíguos de linhas. Filtrar vira
+    fatiar, e o custo depende do tamanho do resultado, não do DataFrame.
+
+    Parâmetros
+    ----------
+    limites : dict
+        (UF, ano) -> (início, fim), em posições de linha.
+    total : int
+        Quantidade de linhas do DataFrame indexado.
+    """
+
+    def __init__(self, limites: dict, total: int):
+        self.limites = limites
+        self.total = total
+        self.ufs = {uf for uf, _ in limites}
+        self.anos = {ano for _, ano in limites}
+
+    @classmethod
+    def construir(cls, df: pd.DataFrame) -> 'IndiceParticoes':
+        """
+        Indexa um DataFrame já agrupado por `ordenar`.
+
+        Raises
+        ------
+        ValueError
+            Se as linhas não estiverem agrupadas por UF e ano na ordem de `ORDEM_UFS`.
+        """
+        chaves = _chaves(df)
+        if len(chaves) and np.any(np.diff(chaves) < 0):
+            raise ValueError("O DataFrame não está agrupado por UF e ano. Use particoes.ordenar.")
+        fronteiras = np.flatnonzero(np.diff(chaves)) + 1
+        inicios = np.r_[0, fronteiras] if len(chaves) else np.array([], dtype=np.int64)
+        fins = np.r_[fronteiras, len(chaves)] if len(chaves) else np.array([], dtype=np.int64)
+
+        limites = {}
+        for inicio, fim, chave in zip(inicios.tolist(), fins.tolist(), chaves[inicios].tolist()):
+            codigo, ano = divmod(chave, 100_000)
+            if codigo >= 0:
+                limites[(ORDEM_UFS[codigo], ano)] = (inicio, fim)
+        return cls(limites, len(df))
+
+    def intervalos(self, ufs: list, anos: list = None) -> list:
+        """
+        Intervalos de linhas dos pares (UF, ano) pedidos, em ordem e com os vizinhos unidos.
+        """
+        anos = self.anos if anos is None else set(anos)
+        pedidos = sorted(self.limites[(uf, ano)] for uf in set(ufs) for ano in anos if (uf, ano) in self.limites)
+        unidos = []
+        for inicio, fim in pedidos:
+            if unidos and unidos[-1][1] == inicio:
+                unidos[-1] = (unidos[-1][0], fim)
+            else:
+                unidos.append((inicio, fim))
+        return unidos
+
+    def fatiar(self, df: pd.DataFrame, ufs: list, anos: list = None) -> pd.DataFrame:
+        """
+        Linhas de `df` das UFs e anos pedidos. Um só intervalo é devolvido como fatia, sem cópia.
+
+        Raises
+        ------
+        ValueError
+            Se `df` não for o DataFrame indexado (a quantidade de linhas não bate).
+        """
+        if len(df) != self.total:
+            raise ValueError("O índice não corresponde ao DataFrame fornecido.")
+        intervalos = self.intervalos(ufs, anos)
+        if not intervalos:
+            return df.iloc[0:0]
+        if len(intervalos) == 1:
+            return df.iloc[intervalos[0][0]:intervalos[0][1]]
+        return pd.concat([df.iloc[inicio:fim] for inicio, fim in intervalos])
+
+def ordenar(df: pd.DataFrame) -> tuple:
+    """
+    Agrupa as linhas de `df` por UF, na ordem das regiões, e por ano, e constrói o índice delas.
+
+    A ordenação é estável e copia os dados uma única vez, no carregamento. Os rótulos do índice
+    do DataFrame são mantidos.
+
+    Retorna
+    -------
+    tuple
+        O DataFrame agrupado e o `IndiceParticoes` dele.
+
+    Exemplo
+    -------
+    >>> df = pd.DataFrame({'SG_UF_PROVA': ['SP', 'AM', 'SP', 'RS'], 'NU_ANO': [2020, 2019, 2019, 2019]})
+    >>> df_ordenado, indice = ordenar(df)
+    >>> df_ordenado.index.tolist()
+    [1, 2, 0, 3]
+    >>> indice.fatiar(df_ordenado, ['SP'])
+      SG_UF_PROVA  NU_ANO
+    2          SP    2019
+    0          SP    2020
+    """
+    ordem = np.argsort(_chaves(df), kind='stable')
+    df_ordenado = df.iloc[ordem]
+    return df_ordenado, IndiceParticoes.construir(df_ordenado)
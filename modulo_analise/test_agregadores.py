@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+import pandas as pd
+import analise
+import agregadores
+from test_analise import participantes
+
+def fatias(df, partes):
+    limites = np.linspace(0, len(df), partes + 1).astype(int)
+    return [df.iloc[inicio:fim] for inicio, fim in zip(limites[:-1], limites[1:])]
+
+class TestAgregadores(unittest.TestCase):
+
+    def test_momentos_estaveis_com_media_grande(self):
+        # Desvio pequeno perto da média: somar x e x² perderia todos os dígitos da variância
+        gerador = np.random.default_rng(0)
+        valores = 1e9 + gerador.normal(0, 1, 10000)
+        momentos = agregadores.Momentos()
+        for bloco in np.array_split(valores, 7):
+            momentos.atualizar(bloco)
+        self.assertEqual(momentos.n, len(valores))
+        self.assertAlmostEqual(momentos.media, valores.mean(), delta=1e-6)
+        self.assertAlmostEqual(momentos.variancia, valores.var(ddof=1), places=6)
+
+    def test_momentos_por_grupo_em_qualquer_ordem(self):
+        df = participantes()
+        blocos = [agregadores.MomentosPorGrupo.de_dataframe(bloco, ['SG_UF_PROVA'], 'NU_NOTA_MT')
+                  for bloco in fatias(df, 5)]
+        ida = agregadores.MomentosPorGrupo()
+        for bloco in blocos:
+            ida = ida.combinar(bloco)
+        volta = agregadores.MomentosPorGrupo()
+        for bloco in reversed(blocos):
+            volta = volta.combinar(bloco)
+        esperado = df.groupby('SG_UF_PROVA')['NU_NOTA_MT'].agg(['count', 'mean', 'var'])
+        for resumo in (ida, volta):
+            resultado = resumo.resultado()
+            np.testing.assert_array_equal(resultado['n'], esperado['count'])
+            np.testing.assert_allclose(resultado['media'], esperado['mean'])
+            np.testing.assert_allclose(resultado['variancia'], esperado['var'])
+
+    def test_contagem(self):
+        df = participantes()
+        contagem = agregadores.Contagem()
+        for bloco in fatias(df, 3):
+            contagem.atualizar(bloco['Q006'])
+        self.assertEqual(contagem.resultado().to_dict(), df['Q006'].value_counts().to_dict())
+
+    def test_analise_sobre_blocos(self):
+        df = analise.media(participantes())
+        blocos = lambda: (bloco for bloco in fatias(df, 4))
+        pd.testing.assert_frame_equal(analise.nota_unificada_por_estado_e_ano(blocos()),
+                                      analise.nota_unificada_por_estado_e_ano(df))
+        pd.testing.assert_frame_equal(analise.media_internet(blocos()), analise.media_internet(df))
+        pd.testing.assert_frame_equal(analise.media_por_area_de_conhecimento(blocos()),
+                                      analise.media_por_area_de_conhecimento(df))
+        pd.testing.assert_frame_equal(analise.nota_1000_ano(blocos(), [2019, 2021, 2022]),
+                                      analise.nota_1000_ano(df, [2019, 2021, 2022]))
+        pd.testing.assert_frame_equal(analise.calcular_medias_regiao_ano(blocos()),
+                                      analise.calcular_medias_regiao_ano(df))
+        renda = analise.renda_media_per_capita_familiar(df, ['SG_UF_PROVA'])
+        pd.testing.assert_frame_equal(analise.renda_unificada_por_estado(fatias(renda, 3)),
+                                      analise.renda_unificada_por_estado(renda))
+
+    def test_bloco_sem_colunas(self):
+        with self.assertRaises(ValueError):
+            analise.nota_unificada_por_estado_e_ano([pd.DataFrame({'SG_UF_PROVA': ['SP']})])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,32 @@
 import unittest
 import analise
+import numpy as np
 import pandas as pd
 
+NOTAS = ["NU_NOTA_CN", "NU_NOTA_CH", "NU_NOTA_LC", "NU_NOTA_MT", "NU_NOTA_REDACAO"]
+
+def participantes(n=4000, semente=0):
+    gerador = np.random.default_rng(semente)
+    # Notas com uma casa decimal, como as do ENEM
+    notas = {coluna: np.where(gerador.random(n) < 0.05, np.nan, gerador.uniform(300, 900, n).round(1)) for coluna in NOTAS}
+    notas['NU_NOTA_REDACAO'] = np.where(gerador.random(n) < 0.02, 1000.0, notas['NU_NOTA_REDACAO'])
+    return pd.DataFrame({'NU_ANO': gerador.choice([2019, 2020, 2021], n),
+                         'SG_UF_PROVA': gerador.choice(['SP', 'RJ', 'BA', 'AM', 'RS', 'DF'], n),
+                         'TP_COR_RACA': gerador.integers(0, 6, n),
+                         'Q005': pd.array(gerador.integers(1, 8, n), dtype='UInt8'),
+                         'Q006': gerador.choice(list('ABCDEFGHIJKLMNOPQ'), n),
+                         'Q025': gerador.choice(['A', 'B'], n), **notas})
+
+def cubo_de(df):
+    # Monta o cubo com a mesma definição de cubo.construir_cubo (filter), por agregações do pandas
+    dimensoes = ['NU_ANO', 'SG_UF_PROVA', 'TP_COR_RACA', 'Q005', 'Q006', 'Q025']
+    valores = df.assign(media=df[NOTAS].mean(axis=1), redacao_1000=df['NU_NOTA_REDACAO'] == 1000)
+    agregacoes = {'linhas': ('NU_ANO', 'size'), 'n_redacao_1000': ('redacao_1000', 'sum')}
+    for medida in NOTAS + ['media']:
+        agregacoes[f'n_{medida}'] = (medida, 'count')
+        agregacoes[f'soma_{medida}'] = (medida, 'sum')
+    return valores.groupby(dimensoes, dropna=False).agg(**agregacoes).reset_index()
+
 class TestAnalise(unittest.TestCase):
 
 #   Função separar_ufs_e_anos
@@ -19,6 +44,18 @@ class TestAnalise(unittest.TestCase):
         with self.assertRaises(ValueError):
             analise.separar_ufs_e_anos(df, [], anos_para_filtrar)
 
+    def test_valida_pelo_catalogo(self):
+        data = {'SG_UF_PROVA': ['SP', 'RJ'], 'NU_ANO': [2021, 2021], 'Nota': [70, 80]}
+        df = pd.DataFrame(data)
+        catalogo = {'colunas': {'SG_UF_PROVA': {'distintos': ['RJ', 'SP']}, 'NU_ANO': {'distintos': [2020, 2021]}}}
+        resultado = analise.separar_ufs_e_anos(df, ['sp'], [2021], catalogo=catalogo)
+        self.assertEqual(resultado['Nota'].tolist(), [70])
+        with self.assertRaises(ValueError):
+            analise.separar_ufs_e_anos(df, ['SP'], [2019], catalogo=catalogo)
+        with self.assertRaises(ValueError):
+            analise.separar_regiao(df, 'norte', catalogo=catalogo)
+        self.assertEqual(len(analise.separar_regiao(df, 'sudeste', catalogo=catalogo)), 2)
+
 
 #   Função separar_região
     def test_raises_regiao_invalida(self):
@@ -65,6 +102,18 @@ class TestAnalise(unittest.TestCase):
         with self.assertRaises(ValueError):
             analise.renda_media_per_capita_familiar(df, colunas_extras)
 
+    def test_faixas_de_renda_do_ano(self):
+        df = participantes()
+        renda = analise.renda_per_capita(df)
+        for (ano, letra), linhas in df.groupby(['NU_ANO', 'Q006']).groups.items():
+            esperado = sum(analise.faixas_de_renda(ano)[letra]) / 2 / df.loc[linhas, 'Q005'].astype(float)
+            np.testing.assert_allclose(renda[linhas], esperado)
+        # Sem NU_ANO valem as faixas de ANO_PADRAO_RENDA
+        np.testing.assert_allclose(analise.renda_per_capita(df.drop(columns=['NU_ANO'])),
+                                   analise.renda_per_capita(df.assign(NU_ANO=analise.ANO_PADRAO_RENDA)))
+        with self.assertRaises(ValueError):
+            analise.renda_per_capita(df.assign(NU_ANO=2018))
+
 
 #   função nota_unificada_por_estado_e_ano
     def test_raises_tipo_errado_de_valores(self):
@@ -158,5 +207,98 @@ class TestAnalise(unittest.TestCase):
         with self.assertRaises(ValueError):
             analise.media_por_area_de_conhecimento("invalid_input")
             
+#   Colunas derivadas sem modificar a entrada
+    def test_derivadas_nao_modificam_a_entrada(self):
+        df = participantes().astype({coluna: 'float32' for coluna in NOTAS})
+        df['Q006'] = df['Q006'].astype('category')
+        original = df.copy()
+        com_media = analise.media(df)
+        renda = analise.renda_media_per_capita_familiar(df, ['SG_UF_PROVA'])
+        analise.renda_media_per_capita_familiar(df, ['SG_UF_PROVA'])
+        analise.media_internet(df)
+        analise.calcular_medias_regiao_ano(com_media)
+        pd.testing.assert_frame_equal(df, original)
+
+        esperado = original[NOTAS].mean(axis=1)
+        self.assertEqual(com_media['media'].dtype, np.float32)
+        np.testing.assert_allclose(com_media['media'], esperado, rtol=1e-6)
+        # A Q006 como categoria dá o mesmo que como texto
+        np.testing.assert_allclose(renda['Renda_Per_Capita'],
+                                   analise.renda_per_capita(original.astype({'Q006': str})), equal_nan=True)
+
+    def test_reaproveita_derivadas_na_versao_atual(self):
+        df = participantes()
+        gravado = df.assign(media=-1.0, Renda_Per_Capita=-2.0, Região='Norte')
+        gravado.attrs['versoes_derivadas'] = dict(analise.VERSOES_DERIVADAS)
+        self.assertIs(analise.media(gravado), gravado)
+        self.assertTrue((analise.renda_media_per_capita_familiar(gravado, [])['Renda_Per_Capita'] == -2.0).all())
+        self.assertEqual(analise.media_internet(gravado).iloc[0].tolist(), [-1.0, -1.0])
+        self.assertEqual(list(analise.calcular_medias_regiao_ano(gravado).columns), ['Norte', 'Média Brasil'])
+
+        # Com outra versão, ou sem versão, tudo é recalculado
+        gravado.attrs['versoes_derivadas'] = {nome: 0 for nome in analise.VERSOES_DERIVADAS}
+        pd.testing.assert_series_equal(analise.media(gravado)['media'], analise.media(df)['media'])
+        self.assertEqual(analise.media(df).attrs['versoes_derivadas'], {'media': analise.VERSOES_DERIVADAS['media']})
+
+    def test_buffer_de_saida(self):
+        df = participantes(n=100)
+        buffer = np.full(len(df), -1.0)
+        medias = analise.media_por_participante(df, out=buffer)
+        self.assertTrue(np.shares_memory(medias.to_numpy(), buffer))
+        np.testing.assert_allclose(buffer, df[NOTAS].mean(axis=1))
+        with self.assertRaises(ValueError):
+            analise.renda_per_capita(df, out=np.empty(10))
+
+#   Agrupamento com `por`
+    def test_agrupamento_igual_a_uma_chamada_por_grupo(self):
+        df = participantes()
+        anos = [2019, 2020, 2021]
+        por_ano = lambda funcao: pd.concat([funcao(df[df['NU_ANO'] == ano].copy()).assign(NU_ANO=ano) for ano in anos],
+                                           ignore_index=True)
+        for funcao in (analise.media_internet, analise.media_por_area_de_conhecimento):
+            agrupado = funcao(df.copy(), por='NU_ANO')
+            esperado = por_ano(funcao)
+            pd.testing.assert_frame_equal(agrupado, esperado[agrupado.columns])
+            # Sobre o cubo e sobre blocos, o mesmo resultado
+            pd.testing.assert_frame_equal(getattr(analise, f'{funcao.__name__}_cubo')(cubo_de(df), por=['NU_ANO']), agrupado)
+            pd.testing.assert_frame_equal(funcao([df.iloc[:1000], df.iloc[1000:]], por=['NU_ANO']), agrupado)
+
+        renda = analise.renda_media_per_capita_familiar(df.copy(), ['SG_UF_PROVA', 'NU_ANO'])
+        agrupado = analise.renda_unificada_por_estado(renda, por='NU_ANO')
+        esperado = pd.concat([analise.renda_unificada_por_estado(renda[renda['NU_ANO'] == ano]).assign(NU_ANO=ano)
+                              for ano in anos]).sort_values(['SG_UF_PROVA', 'NU_ANO'], ignore_index=True)
+        pd.testing.assert_frame_equal(agrupado, esperado[agrupado.columns])
+
+        cor = analise.nota_unificada_por_estado_e_ano(analise.media(df.copy()), por=['TP_COR_RACA'])
+        self.assertEqual(list(cor.columns), ['SG_UF_PROVA', 'NU_ANO', 'TP_COR_RACA', 'Nota_unificada'])
+        pd.testing.assert_frame_equal(analise.nota_unificada_por_estado_e_ano_cubo(cubo_de(df), por=['TP_COR_RACA']), cor)
+
+#   Variantes sobre o cubo de agregados
+    def test_variantes_do_cubo_dao_o_mesmo_resultado(self):
+        df = participantes()
+        cubo = cubo_de(df)
+        self.assertLess(len(cubo), len(df))
+
+        pd.testing.assert_frame_equal(analise.nota_unificada_por_estado_e_ano_cubo(cubo),
+                                      analise.nota_unificada_por_estado_e_ano(analise.media(df.copy())))
+        pd.testing.assert_frame_equal(analise.renda_unificada_por_estado_cubo(cubo),
+                                      analise.renda_unificada_por_estado(analise.renda_media_per_capita_familiar(df.copy(), ['SG_UF_PROVA'])))
+        pd.testing.assert_frame_equal(analise.media_internet_cubo(cubo), analise.media_internet(df.copy()))
+        pd.testing.assert_frame_equal(analise.calcular_medias_regiao_ano_cubo(cubo),
+                                      analise.calcular_medias_regiao_ano(analise.media(df.copy())))
+        pd.testing.assert_frame_equal(analise.media_por_area_de_conhecimento_cubo(cubo),
+                                      analise.media_por_area_de_conhecimento(df))
+        pd.testing.assert_frame_equal(analise.nota_1000_ano_cubo(cubo, [2019, 2020, 2022]),
+                                      analise.nota_1000_ano(df, [2019, 2020, 2022]))
+
+        # O cubo é filtrado pelas mesmas funções que os participantes
+        pd.testing.assert_frame_equal(
+            analise.nota_unificada_por_estado_e_ano_cubo(analise.separar_ufs_e_anos(cubo, ['SP', 'BA'], [2020])),
+            analise.nota_unificada_por_estado_e_ano(analise.media(analise.separar_ufs_e_anos(df, ['SP', 'BA'], [2020]).copy())))
+
+    def test_cubo_sem_colunas(self):
+        with self.assertRaises(ValueError):
+            analise.media_internet_cubo(pd.DataFrame({'Q025': ['A'], 'linhas': [1]}))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,60 @@
+import itertools
+import unittest
+import numpy as np
+import pandas as pd
+import analise
+import bitmap
+import particoes
+
+class TestBitmap(unittest.TestCase):
+
+    def setUp(self):
+        gerador = np.random.default_rng(0)
+        n = 150_000
+        self.df = pd.DataFrame({'SG_UF_PROVA': pd.Categorical(gerador.choice(particoes.ORDEM_UFS, n)),
+                                'NU_ANO': gerador.choice([2019, 2020, 2021, 2022], n),
+                                'Q025': gerador.choice(['A', 'B'], n, p=[0.1, 0.9]),
+                                'NU_NOTA_CN': gerador.uniform(300, 900, n), 'NU_NOTA_CH': gerador.uniform(300, 900, n),
+                                'NU_NOTA_LC': gerador.uniform(300, 900, n), 'NU_NOTA_MT': gerador.uniform(300, 900, n),
+                                'NU_NOTA_REDACAO': gerador.uniform(0, 1000, n)})
+        self.bitmaps = bitmap.IndiceBitmap.construir(self.df)
+
+    def test_operacoes_iguais_as_mascaras(self):
+        n = 200_000
+        gerador = np.random.default_rng(1)
+        mascaras = [gerador.random(n) < densidade for densidade in (0.01, 0.3, 0.9)]
+        mascaras += [np.arange(n) < 140_000, np.ones(n, dtype=bool), np.zeros(n, dtype=bool)]
+        bitmaps = [bitmap.Bitmap.de_mascara(mascara) for mascara in mascaras]
+        for (a, ma), (b, mb) in itertools.product(zip(bitmaps, mascaras), repeat=2):
+            np.testing.assert_array_equal((a & b).mascara(), ma & mb)
+            np.testing.assert_array_equal((a | b).mascara(), ma | mb)
+            self.assertEqual((a & b).contar(), int((ma & mb).sum()))
+        for a, ma in zip(bitmaps, mascaras):
+            np.testing.assert_array_equal((~a).mascara(), ~ma)
+
+    def test_analise_com_bitmaps(self):
+        esperado = analise.separar_ufs_e_anos(self.df, ['SP', 'AC'], [2020])
+        resultado = analise.separar_ufs_e_anos(self.df, ['SP', 'AC'], [2020], bitmaps=self.bitmaps)
+        pd.testing.assert_frame_equal(resultado, esperado)
+
+        esperado = analise.separar_regiao(self.df, 'sul')
+        pd.testing.assert_frame_equal(analise.separar_regiao(self.df, 'sul', bitmaps=self.bitmaps), esperado)
+
+        resultado = analise.media_internet(self.df, bitmaps=self.bitmaps)
+        self.assertNotIn('media_A', self.df.columns)
+        pd.testing.assert_frame_equal(resultado, analise.media_internet(self.df.copy()))
+
+    def test_memoria_do_indice(self):
+        # Bem menor que uma máscara booleana por valor indexado
+        valores = sum(len(self.bitmaps.valores(coluna)) for coluna in self.bitmaps.bitmaps)
+        self.assertLess(self.bitmaps.nbytes, valores * len(self.df) / 4)
+
+        # Em dados agrupados por particoes.ordenar, contêineres inteiros de uma só UF não ocupam memória
+        agrupado = pd.DataFrame({'SG_UF_PROVA': ['SP'] * 300_000 + ['RJ'] * 300_000})
+        indice_agrupado = bitmap.IndiceBitmap.construir(agrupado)
+        # Só os contêineres da fronteira entre as UFs (um em cada bitmap) e o último, incompleto, têm mapas de bits
+        self.assertLessEqual(indice_agrupado.nbytes, 3 * bitmap.TAMANHO_CONTEINER // 8)
+        self.assertEqual(indice_agrupado.igual('SG_UF_PROVA', 'RJ').contar(), 300_000)
+
+if __name__ == '__main__':
+    unittest.main()
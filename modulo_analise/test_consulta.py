@@ -0,0 +1,100 @@
+import unittest
+import numpy as np
+import pandas as pd
+import analise
+import consulta
+
+class TestConsulta(unittest.TestCase):
+
+    def setUp(self):
+        gerador = np.random.default_rng(0)
+        n = 3000
+        self.df = pd.DataFrame({'SG_UF_PROVA': gerador.choice(['SP', 'RJ', 'MG', 'BA', 'AM'], n),
+                                'NU_ANO': gerador.choice([2019, 2020, 2021], n),
+                                'NU_NOTA_CN': gerador.uniform(300, 900, n),
+                                'NU_NOTA_CH': gerador.uniform(300, 900, n),
+                                'NU_NOTA_LC': gerador.uniform(300, 900, n),
+                                'NU_NOTA_MT': gerador.uniform(300, 900, n),
+                                'NU_NOTA_REDACAO': gerador.choice([0.0, 600.0, 1000.0], n),
+                                'Q005': gerador.integers(1, 6, n),
+                                'Q006': gerador.choice(list('ABCDEFGHIJKLMNOPQ'), n),
+                                'Q025': gerador.choice(['A', 'B'], n)})
+        # Leitor que registra os argumentos recebidos e quantas linhas retornou
+        self.leituras = []
+        leitor = consulta.ler_dataframe(self.df)
+        def leitor_registrado(**argumentos):
+            resultado = leitor(**argumentos)
+            self.leituras.append((argumentos, len(resultado)))
+            return resultado
+        self.consulta = consulta.Consulta(leitor_registrado)
+
+    def test_filtros_e_projecao_vao_para_o_leitor(self):
+        resultado = (self.consulta.filtrar('SG_UF_PROVA', ['sp', 'rj']).filtrar('NU_ANO', [2020, 2021])
+                     .filtrar('NU_ANO', [2021]).filtrar_faixa('NU_NOTA_MT', 500)
+                     .selecionar(['SG_UF_PROVA', 'NU_NOTA_MT']).coletar())
+        argumentos, linhas = self.leituras[0]
+        self.assertEqual(argumentos, {'colunas': ['SG_UF_PROVA', 'NU_NOTA_MT'], 'anos': [2021],
+                                      'ufs': ['SP', 'RJ'], 'notas': {'NU_NOTA_MT': (500, None)}})
+        esperado = self.df[self.df['SG_UF_PROVA'].isin(['SP', 'RJ']) & (self.df['NU_ANO'] == 2021)
+                           & (self.df['NU_NOTA_MT'] >= 500)][['SG_UF_PROVA', 'NU_NOTA_MT']]
+        pd.testing.assert_frame_equal(resultado, esperado)
+        self.assertEqual(linhas, len(esperado))
+
+    def test_derivadas_so_para_as_linhas_restantes(self):
+        vistas = []
+        def dobro(dados):
+            vistas.append(len(dados))
+            return dados['NU_NOTA_MT'] * 2
+        # O filtro da Q025 vem depois da derivação, mas é aplicado antes dela
+        plano = (self.consulta.derivar('dobro', dobro, ['NU_NOTA_MT']).filtrar('Q025', ['A'])
+                 .filtrar_faixa('dobro', 1500).derivar('nao_usada', dobro, ['NU_NOTA_MT'])
+                 .selecionar(['dobro']))
+        self.assertEqual([nome for nome, *_ in plano.plano()['derivados']], ['dobro'])
+        resultado = plano.coletar()
+
+        restantes = self.df['Q025'] == 'A'
+        self.assertEqual(vistas, [restantes.sum()])
+        esperado = (self.df.loc[restantes, 'NU_NOTA_MT'] * 2).rename('dobro')
+        pd.testing.assert_series_equal(resultado['dobro'], esperado[esperado >= 1500])
+        self.assertEqual(self.leituras[0][0]['colunas'], ['NU_NOTA_MT', 'Q025'])
+
+    def test_funcoes_da_analise_aceitam_consultas(self):
+        lazy = analise.nota_unificada_por_estado_e_ano(
+            analise.media(analise.separar_ufs_e_anos(self.consulta, ['SP', 'BA'], [2019, 2021])))
+        eager = analise.nota_unificada_por_estado_e_ano(
+            analise.media(analise.separar_ufs_e_anos(self.df.copy(), ['SP', 'BA'], [2019, 2021])))
+        pd.testing.assert_frame_equal(lazy, eager)
+        # Uma leitura para validar UFs, uma para anos e a da consulta, que só lê as notas
+        argumentos = self.leituras[-1][0]
+        self.assertEqual(argumentos['ufs'], ['SP', 'BA'])
+        self.assertEqual(set(argumentos['colunas']),
+                         {'SG_UF_PROVA', 'NU_ANO', 'NU_NOTA_CN', 'NU_NOTA_CH', 'NU_NOTA_LC', 'NU_NOTA_MT', 'NU_NOTA_REDACAO'})
+
+        pd.testing.assert_frame_equal(analise.nota_1000_ano(self.consulta, [2019, 2020]),
+                                      analise.nota_1000_ano(self.df, [2019, 2020]))
+        self.assertEqual(self.leituras[-1][0]['notas'], {'NU_NOTA_REDACAO': (1000, 1000)})
+
+        pd.testing.assert_frame_equal(analise.media_internet(self.consulta), analise.media_internet(self.df.copy()))
+        pd.testing.assert_frame_equal(analise.media_por_area_de_conhecimento(self.consulta),
+                                      analise.media_por_area_de_conhecimento(self.df))
+        renda_lazy = analise.renda_unificada_por_estado(analise.renda_media_per_capita_familiar(self.consulta, ['SG_UF_PROVA']))
+        renda_eager = analise.renda_unificada_por_estado(analise.renda_media_per_capita_familiar(self.df.copy(), ['SG_UF_PROVA']))
+        pd.testing.assert_frame_equal(renda_lazy, renda_eager)
+
+    def test_valida_pelo_catalogo_da_consulta(self):
+        catalogo = {'colunas': {'SG_UF_PROVA': {'distintos': ['SP']}, 'NU_ANO': {'distintos': [2019]}}}
+        com_catalogo = consulta.Consulta.de_dataframe(self.df, catalogo)
+        with self.assertRaises(ValueError):
+            analise.separar_ufs_e_anos(com_catalogo, ['RJ'], [2019])
+        with self.assertRaises(ValueError):
+            analise.separar_ufs_e_anos(self.consulta, ['SP'], [2018])
+        self.assertEqual(len(analise.separar_regiao(self.consulta, 'norte').coletar()), (self.df['SG_UF_PROVA'] == 'AM').sum())
+
+    def test_agrupamento_e_o_ultimo_passo(self):
+        agrupada = self.consulta.agrupar(['NU_ANO'], n=('NU_NOTA_MT', 'size'))
+        self.assertEqual(agrupada.coletar()['n'].sum(), len(self.df))
+        with self.assertRaises(ValueError):
+            agrupada.filtrar('NU_ANO', [2019])
+
+if __name__ == '__main__':
+    unittest.main()
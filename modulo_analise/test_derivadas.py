@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+import pandas as pd
+import derivadas
+from test_analise import participantes, NOTAS
+
+class TestDerivadas(unittest.TestCase):
+
+    def test_colunas_e_versoes(self):
+        df = participantes()
+        derivado = derivadas.adicionar_derivadas(df)
+        self.assertEqual(list(derivado.columns), list(df.columns) + ['media', 'Renda_Per_Capita', 'Região'])
+        self.assertEqual(derivado.attrs['versoes_derivadas'], derivadas.VERSOES)
+        np.testing.assert_allclose(derivado['media'], df[NOTAS].mean(axis=1))
+        pd.testing.assert_series_equal(derivado['Renda_Per_Capita'], derivadas.renda_per_capita(df))
+        self.assertEqual(derivado.loc[df['SG_UF_PROVA'] == 'DF', 'Região'].unique().tolist(), ['Centro-Oeste'])
+        self.assertNotIn('versoes_derivadas', df.attrs)
+
+        # Sem as entradas de uma coluna, ela não é acrescentada
+        sem_q006 = derivadas.adicionar_derivadas(df.drop(columns=['Q006']))
+        self.assertNotIn('Renda_Per_Capita', sem_q006.columns)
+        self.assertNotIn('Renda_Per_Capita', sem_q006.attrs['versoes_derivadas'])
+
+    def test_renda_familiar_do_ano(self):
+        df = participantes()
+        anos, tabela = derivadas.tabela_de_renda()
+        self.assertEqual(anos.tolist(), sorted(derivadas.SALARIO_MINIMO))
+        self.assertTrue(np.isnan(tabela[:, -1]).all())
+        esperado = [sum(derivadas.faixas_de_renda(ano)[letra]) / 2 for ano, letra in zip(df['NU_ANO'], df['Q006'])]
+        np.testing.assert_array_equal(derivadas.renda_familiar(df), esperado)
+        # A Q006 como categoria, como no esquema da filtragem, é decodificada pelos códigos
+        np.testing.assert_array_equal(derivadas.renda_familiar(df.astype({'Q006': 'category', 'NU_ANO': 'int16'})), esperado)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+import pandas as pd
+import analise
+import histogramas
+from test_analise import participantes, NOTAS
+from test_agregadores import fatias
+
+def com_uma_casa(df):
+    # As notas do ENEM têm uma casa decimal
+    return df.assign(**{coluna: df[coluna].round(1).astype('float32') for coluna in NOTAS})
+
+class TestHistogramas(unittest.TestCase):
+
+    def test_contagens_iguais_as_do_pandas(self):
+        df = com_uma_casa(participantes())
+        resumo = analise.histogramas_de_notas(df)
+        for nota, minimo, maximo in [('NU_NOTA_MT', 900, None), ('NU_NOTA_CN', 512.3, 640.1),
+                                     ('NU_NOTA_REDACAO', 1000, None), ('NU_NOTA_LC', None, 450.5)]:
+            dentro = df[nota].between(-np.inf if minimo is None else minimo, np.inf if maximo is None else maximo)
+            esperado = dentro.groupby([df['NU_ANO'], df['SG_UF_PROVA']]).sum()
+            np.testing.assert_array_equal(resumo.contar(nota, minimo, maximo), esperado)
+        self.assertTrue((resumo.contar('NU_NOTA_MT', 700, 600) == 0).all())
+        self.assertTrue((resumo.contar('NU_NOTA_MT', 1000.5) == 0).all())
+
+    def test_blocos_em_qualquer_ordem(self):
+        df = com_uma_casa(participantes())
+        blocos = [histogramas.Histogramas.de_dataframe(bloco, ['SG_UF_PROVA'], NOTAS) for bloco in fatias(df, 4)]
+        ida = histogramas.Histogramas()
+        for bloco in blocos:
+            ida = ida.combinar(bloco)
+        volta = histogramas.Histogramas()
+        for bloco in reversed(blocos):
+            volta = volta.combinar(bloco)
+        inteiro = analise.histogramas_de_notas(df, por='SG_UF_PROVA')
+        for resumo in (ida, volta, analise.histogramas_de_notas(fatias(df, 3), por='SG_UF_PROVA')):
+            pd.testing.assert_index_equal(resumo.indice, inteiro.indice)
+            np.testing.assert_array_equal(resumo.contagens, inteiro.contagens)
+
+    def test_nota_fora_da_escala(self):
+        df = pd.DataFrame({'NU_ANO': [2019, 2019, 2019, 2020], 'SG_UF_PROVA': ['SP', 'SP', 'SP', 'SP'],
+                           'NU_NOTA_MT': [1200.0, -0.1, 900.0, 1000.1]})
+        resumo = analise.histogramas_de_notas(df, notas=['NU_NOTA_MT'])
+        self.assertEqual(resumo.contar('NU_NOTA_MT').tolist(), [1, 0])
+        self.assertEqual(resumo.fora[:, 0].tolist(), [2, 1])
+        self.assertEqual(resumo.combinar(resumo).fora[:, 0].tolist(), [4, 2])
+        # Uma nota com mais de uma casa decimal não cabe num décimo
+        fora_dos_decimos = df.assign(NU_NOTA_MT=[999.96, 1000.0, 950.55, 900.0])
+        with self.assertRaises(ValueError):
+            analise.histogramas_de_notas(fora_dos_decimos, notas=['NU_NOTA_MT'])
+        resumo = analise.histogramas_de_notas(fora_dos_decimos, notas=['NU_NOTA_MT'], exatas=False)
+        self.assertEqual(resumo.contar('NU_NOTA_MT', minimo=1000).tolist(), [1, 0])
+        self.assertEqual(resumo.fora[:, 0].tolist(), [2, 0])
+        with self.assertRaises(KeyError):
+            analise.histogramas_de_notas(df.assign(NU_NOTA_MT=900.0), notas=['NU_NOTA_MT']).contar('NU_NOTA_CN')
+
+    def test_nota_1000_ano_igual_a_contagem_direta(self):
+        # Valores na fronteira: 999.9 e 1000.1 ao lado de 1000, fora da escala, fora dos décimos
+        # (999.96, 950.55), ausentes, e um ano sem linhas
+        redacoes = [1000.0, 999.9, 1000.1, 0.0, -20.0, np.nan, 1000.0, 999.96, 1000.0, 950.55]
+        df = pd.DataFrame({'NU_ANO': [2019, 2019, 2019, 2019, 2020, 2020, 2020, 2021, 2021, 2021],
+                           'NU_NOTA_REDACAO': redacoes})
+        anos = [2019, 2020, 2021, 2022]
+        for tipo in ('float64', 'float32'):
+            com_tipo = df.astype({'NU_NOTA_REDACAO': tipo})
+            # A contagem de nota_1000_ano antes dos histogramas, um ano de cada vez
+            esperado = pd.DataFrame([{'NU_ANO': ano, 'Quantidade de notas 1000':
+                                      (com_tipo[com_tipo['NU_ANO'] == ano]['NU_NOTA_REDACAO'] == 1000).sum()}
+                                     for ano in anos])
+            pd.testing.assert_frame_equal(analise.nota_1000_ano(com_tipo, anos), esperado)
+            self.assertEqual(analise.nota_1000_ano(com_tipo, anos)['Quantidade de notas 1000'].tolist(), [1, 1, 1, 0])
+
+if __name__ == '__main__':
+    unittest.main()
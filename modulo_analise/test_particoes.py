@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+import pandas as pd
+import analise
+import particoes
+
+class TestParticoes(unittest.TestCase):
+
+    def setUp(self):
+        gerador = np.random.default_rng(0)
+        n = 2000
+        self.df = pd.DataFrame({'SG_UF_PROVA': gerador.choice(particoes.ORDEM_UFS, n),
+                                'NU_ANO': gerador.choice([2019, 2020, 2021, 2022], n),
+                                'NU_NOTA_MT': gerador.uniform(300, 900, n)})
+        self.df_ordenado, self.indice = particoes.ordenar(self.df)
+
+    def test_fatias_iguais_as_mascaras(self):
+        for ufs, anos in [(['SP'], [2019, 2020, 2021, 2022]), (['SP', 'AM'], [2020]), (['RS'], [2019, 2022])]:
+            esperado = analise.separar_ufs_e_anos(self.df_ordenado, ufs, anos)
+            resultado = analise.separar_ufs_e_anos(self.df_ordenado, ufs, anos, indice=self.indice)
+            pd.testing.assert_frame_equal(resultado, esperado)
+
+        for regiao in particoes.REGIOES:
+            esperado = analise.separar_regiao(self.df_ordenado, regiao)
+            resultado = analise.separar_regiao(self.df_ordenado, regiao, indice=self.indice)
+            pd.testing.assert_frame_equal(resultado, esperado)
+            self.assertEqual(len(self.indice.intervalos(particoes.REGIOES[regiao])), 1)
+
+    def test_fatia_sem_copia(self):
+        resultado = analise.separar_ufs_e_anos(self.df_ordenado, ['BA'], [2019, 2020, 2021, 2022], indice=self.indice)
+        self.assertTrue(np.shares_memory(resultado['NU_NOTA_MT'].to_numpy(), self.df_ordenado['NU_NOTA_MT'].to_numpy()))
+
+    def test_validacao_pelo_indice(self):
+        with self.assertRaises(ValueError):
+            analise.separar_ufs_e_anos(self.df_ordenado, ['SP'], [2018], indice=self.indice)
+        with self.assertRaises(ValueError):
+            particoes.IndiceParticoes.construir(self.df)
+        with self.assertRaises(ValueError):
+            self.indice.fatiar(self.df_ordenado.iloc[:10], ['SP'])
+
+if __name__ == '__main__':
+    unittest.main()
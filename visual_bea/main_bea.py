@@ -1,12 +1,13 @@
 import pandas as pd 
 import visual_bea as visual
 import analise as analise 
+import cache_colunar
 
 
-df_2019 = pd.read_csv("2019_filtrado.csv", encoding = "unicode_escape", engine = "python")
-df_2020 = pd.read_csv("2020_filtrado.csv", encoding = "unicode_escape", engine = "python")
-df_2021 = pd.read_csv("2021_filtrado.csv", encoding = "unicode_escape", engine = "python")
-df_2022 = pd.read_csv("2022_filtrado.csv", encoding = "unicode_escape", engine = "python")
+df_2019 = cache_colunar.carregar_ano(2019, "cache_enem")
+df_2020 = cache_colunar.carregar_ano(2020, "cache_enem")
+df_2021 = cache_colunar.carregar_ano(2021, "cache_enem")
+df_2022 = cache_colunar.carregar_ano(2022, "cache_enem")
 
 todos_anos = pd.concat([df_2019, df_2020, df_2021, df_2022], axis=0)
 
@@ -24,7 +25,8 @@ visual_medias_notas_do_Brasil_por_ano = visual.grafico_barra(media_nota_Brasil_a
 
 
 
-df_internet_concatenado = pd.DataFrame()
+# Médias com e sem internet de todos os anos, num só agrupamento por ano
+df_internet_concatenado = analise.media_internet(todos_anos, por='NU_ANO').rename(columns={'NU_ANO': 'anos'})
 lista_dfs = [df_2019, df_2020, df_2021, df_2022]
 
 for index, df in enumerate(lista_dfs):
@@ -33,22 +35,22 @@ for index, df in enumerate(lista_dfs):
 
     # INTERNET
     # proporção dos participantes que tem acesso à internet 
-    df_media = analise.media_internet(df)
-    df_media['anos'] = 2019 + index
-    df_internet_concatenado = pd.concat([df_internet_concatenado, df_media], axis=0)
     visual.grafico_pizza(df, 'Q025', f'Proporção de pessoas à internet - {2019 + index}')
 
 
 # proporção dos participantes com as maiores e menores notas que tem acesso à internet 
 for index, df in enumerate(lista_dfs):
+    # O cache já traz a média gravada pela filtragem, e analise.media só a recalcula se a fórmula mudou
+    df_media_ano = analise.media(df)
+
     # maiores
-    df_maiores_ano = analise.media(df).sort_values(by='media', ascending=False)
+    df_maiores_ano = df_media_ano.sort_values(by='media', ascending=False)
     top_ano = df_maiores_ano.head(1000)
     visual.frequencia_estado(top_ano, 'SG_UF_PROVA', f"melhores participantes - Estado, {2019 + index}")
     visual.grafico_pizza(top_ano, 'Q025', f' Participantes com melhores desempenhos com ou sem internet - {2019 + index}')
     
     # menores 
-    df_menores_ano = analise.media(df).sort_values(by='media', ascending=True)
+    df_menores_ano = df_media_ano.sort_values(by='media', ascending=True)
     piores_ano = df_menores_ano.head(1000)
     visual.frequencia_estado(piores_ano, 'SG_UF_PROVA', f"piores participantes - Estado, {2019 + index}")
     visual.grafico_pizza(piores_ano, 'Q025', f'Participantes com piores desempenhos com ou sem internet - {2019 + index}')
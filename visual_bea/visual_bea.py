@@ -21,8 +21,9 @@ def frequencia_estado(df, coluna_estado, titulo):
 
     '''
     
-    # Contagem da frequência dos estados
-    frequencia_estados = df[coluna_estado].value_counts()
+    # Contagem da frequência dos estados. Com a UF como categoria, value_counts lista também os
+    # estados sem participantes, que ficam de fora como antes
+    frequencia_estados = df[coluna_estado].value_counts()[lambda contagem: contagem > 0]
 
     # Crie o gráfico de barras
     plt.figure(figsize=(10, 6))
@@ -217,8 +218,8 @@ def grafico_pizza(df, coluna, titulo):
         if coluna not in df.columns:
             raise KeyError("A coluna não foi encontrada no DataFrame.")
 
-        # Conta as frequências dos estados na coluna
-        frequencias = df[coluna].value_counts()
+        # Conta as frequências dos estados na coluna, sem as categorias que não aparecem
+        frequencias = df[coluna].value_counts()[lambda contagem: contagem > 0]
 
         # Cria um gráfico de pizza com base nas frequências
         plt.figure(figsize=(6, 6))
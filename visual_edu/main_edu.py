@@ -1,50 +1,59 @@
 import sys
+import functools
 sys.path.append('/path/to/directory')
 import pandas as pd
 import analise
+import particoes
+import cache_colunar
+import catalogo
+import cubo
+import armazenamento
+import consulta
 import visual_edu as visual
 
-df_2019 = pd.read_csv("2019_filtrado.csv", encoding="unicode_escape", engine="python")
-df_2020 = pd.read_csv("2020_filtrado.csv", encoding="unicode_escape", engine="python")
-df_2021 = pd.read_csv("2021_filtrado.csv", encoding="unicode_escape", engine="python")
-df_2022 = pd.read_csv("2022_filtrado.csv", encoding="unicode_escape", engine="python")
-
-df = pd.concat([df_2019, df_2020, df_2021, df_2022], axis=0)
+df_2019 = cache_colunar.carregar_ano(2019, "cache_enem")
+df_2020 = cache_colunar.carregar_ano(2020, "cache_enem")
+df_2021 = cache_colunar.carregar_ano(2021, "cache_enem")
+df_2022 = cache_colunar.carregar_ano(2022, "cache_enem")
 
 
 
 #   RELAÇÃO ENTRE OS ESTADOS DURANTE OS ANOS
 
+catalogo_enem = catalogo.carregar_catalogo("enem_filtrado")
+
+# Consulta preguiçosa sobre o dataset Parquet: cada ano lê só a sua partição e as notas usadas pela média
+dataset_enem = consulta.Consulta(functools.partial(armazenamento.ler_dataset, "enem_filtrado"), catalogo_enem)
+
+# Os quatro anos numa só leitura e num só agrupamento por estado e ano
 anos = [2019, 2020, 2021, 2022]
-for ano in anos:
-    df_ano = globals()[f'df_{ano}']
-    df_media_ano = analise.media(df_ano)
-    df_media_estados_ano = analise.nota_unificada_por_estado_e_ano(df_media_ano)
+df_media_estados = analise.nota_unificada_por_estado_e_ano(analise.media(dataset_enem.filtrar('NU_ANO', anos)))
+for ano, df_media_estados_ano in df_media_estados.groupby('NU_ANO'):
     df_media_estados_ano = df_media_estados_ano.sort_values(by='Nota_unificada')
     visual.graf_bar_par(df_media_estados_ano, 'SG_UF_PROVA', ['Nota_unificada'], f'Comparação das médias entre os estados {ano} ', '', '')
     
 
 #   ANÁLISE DA EVOLUÇÃO DAS MÉDIAS DE CADA ESTADO
 
-def evolucao_UF(df, UF):
-    df_UF = analise.separar_ufs_e_anos(df, [f'{UF}'], [2019,2020,2021,2022])
+# Os quatro anos juntos, agrupados por UF e ano uma única vez: cada estado é uma fatia contígua
+df_todos, indice_todos = particoes.ordenar(pd.concat([df_2019, df_2020, df_2021, df_2022], ignore_index=True))
+
+def evolucao_UF(UF):
+    # A validação consulta o catálogo e a separação fatia pelo índice, sem percorrer os dados
+    df_UF = analise.separar_ufs_e_anos(df_todos, [f'{UF}'], [2019,2020,2021,2022], catalogo=catalogo_enem,
+                                       indice=indice_todos)
     df_UF_media = analise.media(df_UF)
     df_UF_final = analise.nota_unificada_por_estado_e_ano(df_UF_media)
     visual.graf_curvas(df_UF_final, 'NU_ANO', ['Nota_unificada'], f'Evolução das Médias do ENEM, {UF}', '', '')
 
 UFS = ['RO', 'AC', 'AM', 'RR', 'PA', 'AP', 'TO', 'MA', 'PI', 'CE', 'RN', 'PB', 'PE', 'AL', 'SE', 'BA', 'MG', 'ES', 'RJ', 'SP', 'PR', 'SC', 'RS', 'MS', 'MT', 'GO', 'DF']
 for uf in UFS:
-    evolucao_UF(df, uf)
+    evolucao_UF(uf)
 #   ANÁLISE DO IMPACTO DA FALTA DE INTERNET
 
-anos = ['2019', '2020', '2021', '2022']
-df_internet_concatenado = pd.DataFrame()
-
-for ano in anos:
-    # Substitua df_XXXX pelo seu DataFrame real para cada ano
-    df_ano = analise.media_internet(globals()[f"df_{ano}"])
-    df_ano['anos'] = ano
-    df_internet_concatenado = pd.concat([df_internet_concatenado, df_ano], axis=0)
+# Uma linha por ano, agrupando os quatro DataFrames de uma vez em vez de concatenar os resultados
+df_internet_concatenado = analise.media_internet([df_2019, df_2020, df_2021, df_2022], por='NU_ANO')
+df_internet_concatenado = df_internet_concatenado.rename(columns={'NU_ANO': 'anos'})
 
 print(df_internet_concatenado)
 visual.graf_bar_par(df_internet_concatenado, 'anos', ['media_sem_internet', 'media_com_internet'], 'Diferença das Médias dos participantes com e sem acesso à internet', '', '')
@@ -61,17 +70,17 @@ for ano in anos:
 #   ANÁLISE DO IMPACTO NA QUANTIDADE DE NOTAS 1000 NO ENEM
 
 
-df_1000= analise.nota_1000_ano(df, [2019,2020,2021,2022])
+# As contagens de notas 1000 já estão no cubo de agregados gravado pela filtragem
+cubo_enem = cubo.carregar_cubo("enem_filtrado")
+df_1000= analise.nota_1000_ano_cubo(cubo_enem, [2019,2020,2021,2022])
 
 visual.graf_bar_par(df_1000, 'NU_ANO', ['Quantidade de notas 1000'], 'Notas 1000', '', '')
 
 
 #   RENDA POR ESTADO
-anos = [2019, 2020, 2021, 2022]
-for ano in anos:
-    df_ano = globals()[f'df_{ano}']
-    df_renda_familiar_ano = analise.renda_media_per_capita_familiar(df_ano, ['SG_UF_PROVA'])
-    df_renda_ano = analise.renda_unificada_por_estado(df_renda_familiar_ano)
+df_renda_familiar = analise.renda_media_per_capita_familiar(dataset_enem, ['SG_UF_PROVA', 'NU_ANO'])
+df_renda = analise.renda_unificada_por_estado(df_renda_familiar, por='NU_ANO')
+for ano, df_renda_ano in df_renda.groupby('NU_ANO'):
     df_renda_ano = df_renda_ano.sort_values(by='Renda_unificada')
     visual.graf_bar_par(df_renda_ano, 'SG_UF_PROVA', ['Renda_unificada'], f'Renda dos participantes em comparação com os estados, {ano}', '', '')
 
@@ -24,7 +24,8 @@ def graf_pizza(df : pd.DataFrame, coluna : str, titulo : str):
         if coluna not in df.columns:
             raise KeyError(f"A coluna '{coluna}' não foi encontrada no DataFrame dado.")
 
-        values = df[coluna].value_counts()
+        # Sem as categorias que não aparecem, que seriam fatias vazias
+        values = df[coluna].value_counts()[lambda contagem: contagem > 0]
 
         plt.figure(figsize=(8, 8))
         plt.pie(values, labels=values.index, autopct='%1.1f%%', startangle=140)
@@ -3,29 +3,27 @@ import matplotlib.pyplot as plt
 import visual_gab as visual
 import sys
 sys.path.append(r'\modulo_analise')
+sys.path.append(r'\filter')
 import analise
+import cache_colunar
 
-df_2019 = pd.read_csv(r"\PandENEM\2019_filtrado.csv", encoding='unicode_escape', engine='python')
-df_2020 = pd.read_csv(r"\PandENEM\2020_filtrado.csv", encoding='unicode_escape', engine='python')
-df_2021 = pd.read_csv(r"\PandENEM\2021_filtrado.csv", encoding='unicode_escape', engine='python')
-df_2022 = pd.read_csv(r"\PandENEM\2022_filtrado.csv", encoding='unicode_escape', engine='python')
+df_2019 = cache_colunar.carregar_ano(2019, r"\PandENEM\cache_enem")
+df_2020 = cache_colunar.carregar_ano(2020, r"\PandENEM\cache_enem")
+df_2021 = cache_colunar.carregar_ano(2021, r"\PandENEM\cache_enem")
+df_2022 = cache_colunar.carregar_ano(2022, r"\PandENEM\cache_enem")
 
 lista_dfs = [df_2019, df_2020, df_2021, df_2022]
 
 # Visualização que ilustra média de participantes com e sem internet
-for index, df in enumerate(lista_dfs):
-    df_pizza = analise.media_internet(df)
-    visual.plot_grafico_de_pizza(df_pizza, ['media_sem_internet', 'media_com_internet'], f'Relação acesso a internet {2019 + index}')
+# Os quatro anos numa só chamada, agrupados por ano, sem concatenar os DataFrames
+df_internet = analise.media_internet(lista_dfs, por='NU_ANO')
+for ano, df_pizza in df_internet.groupby('NU_ANO'):
+    visual.plot_grafico_de_pizza(df_pizza, ['media_sem_internet', 'media_com_internet'], f'Relação acesso a internet {ano}')
 
 
 # Visualização média x matéria nos quatro anos
 colunas = ['CN', 'CH', 'LC', 'MT', 'RD']
-df_concat = pd.DataFrame()
-for index, df in enumerate(lista_dfs):
-    df = analise.media_por_area_de_conhecimento(df)
-    df_concat = pd.concat([df_concat, df])
-
-df_concat['anos'] = [2019, 2020, 2021, 2022]
+df_concat = analise.media_por_area_de_conhecimento(lista_dfs, por='NU_ANO').rename(columns={'NU_ANO': 'anos'})
 visual.plot_grafico_de_linha(df_concat, colunas, 'anos', 'notas', "Média por matéria em cada ano")
 
 # Visualização renda per capita x média
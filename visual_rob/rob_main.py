@@ -2,17 +2,16 @@ import pandas as pd
 import geopandas as gpd
 import matplotlib.pyplot as plt
 import analise
+import cache_colunar
 import visual_rob as visual
 
-df_2019 = pd.read_csv('C:/Users/rober/Downloads/Dados PandENEM/csv certos/2019_filtrado.csv')
-df_2020 = pd.read_csv('C:/Users/rober/Downloads/Dados PandENEM/csv certos/2020_filtrado.csv')
-df_2021 = pd.read_csv('C:/Users/rober/Downloads/Dados PandENEM/csv certos/2021_filtrado.csv')
-df_2022 = pd.read_csv('C:/Users/rober/Downloads/Dados PandENEM/csv certos/2022_filtrado.csv')
+df_2019 = cache_colunar.carregar_ano(2019, 'C:/Users/rober/Downloads/Dados PandENEM/cache_enem')
+df_2020 = cache_colunar.carregar_ano(2020, 'C:/Users/rober/Downloads/Dados PandENEM/cache_enem')
+df_2021 = cache_colunar.carregar_ano(2021, 'C:/Users/rober/Downloads/Dados PandENEM/cache_enem')
+df_2022 = cache_colunar.carregar_ano(2022, 'C:/Users/rober/Downloads/Dados PandENEM/cache_enem')
 
 lista_df = [df_2019, df_2020, df_2021, df_2022]
 
-df_concat = pd.concat([df_2019, df_2020, df_2021, df_2022])
-
 # Plotando gráfico de mapa da média dos estados em 2019, 2020, 2021 e 2022
 for df in lista_df:
     df_media = analise.media(df)
@@ -29,8 +28,9 @@ df_med_2022 = analise.media_por_area_de_conhecimento(df_2022)
 visual.plot_multi_grafico_linha(df_med_2019, df_med_2020, df_med_2021, df_med_2022)
 
 # Plotando gráfico de linhas da média por área de conhecimento
+# Os anos são contados um a um, sem concatená-los
 years = [2019, 2020, 2021, 2022]
-df_notas_mil = analise.nota_1000_ano(df_concat, years)
+df_notas_mil = analise.nota_1000_ano(lista_df, years)
 
 visual.plot_grafico_linhas(df_notas_mil, 'NU_ANO', 'Quantidade de notas 1000', 'Quantidade de notas 1000 por ano')
 
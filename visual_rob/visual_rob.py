@@ -67,7 +67,8 @@ def plot_notas_por_estado(df):
         'TO': 'Tocantins'
     }
 
-    df['SG_UF_PROVA'] = df['SG_UF_PROVA'].replace(replacements)
+    # A UF vem como categoria do cache; como texto, a troca pelos nomes funciona como antes
+    df['SG_UF_PROVA'] = df['SG_UF_PROVA'].astype(str).replace(replacements)
 
     estados_brasileiros = replacements.values()
     